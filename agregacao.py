@@ -0,0 +1,222 @@
+"""
+Agregação incremental das horas por dia, semana e mês.
+
+Cada arquivo enviado contribui com contagens, somas e somas dos quadrados por
+semana e por mês. Adicionar ou remover um arquivo só soma ou subtrai a
+contribuição dele nos grupos afetados; média, desvio padrão e moda saem
+desses acumuladores sem reprocessar as linhas dos outros arquivos.
+
+As estatísticas por pessoa (person_stats, person_period_totals) saem de
+agrupamentos vetorizados sobre o DataFrame consolidado, sem laço por pessoa.
+Semanas e meses são agrupados por números inteiros calculados da coluna Dia
+das linhas compactas; só os períodos resultantes viram Period.
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from diagnostico import timed
+
+_STAT_COLUMNS = ['count', 'sum', 'sumsq']
+
+
+def _period_codes(df, freq):
+    """
+    Número inteiro do período ('W' ou 'M') de cada linha.
+
+    Usa a coluna Dia (dias desde 1970-01-01) quando existe e, se não, a Data.
+    As semanas vão de segunda a domingo, como o 'W' do pandas.
+    """
+    if 'Dia' in df.columns:
+        days = df['Dia'].to_numpy().astype(np.int64)
+    else:
+        days = df['Data'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    if freq == 'W':
+        # 1970-01-01 foi uma quinta-feira: +3 alinha as semanas na segunda
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def _code_periods(codes, freq):
+    """Converte os números de _period_codes em um PeriodIndex."""
+    codes = np.asarray(codes, dtype=np.int64)
+    if freq == 'W':
+        starts = (codes * 7 - 3).astype('datetime64[D]')
+    else:
+        starts = codes.astype('datetime64[M]').astype('datetime64[D]')
+    return pd.DatetimeIndex(starts).to_period(freq)
+
+
+def _group_stats(df, freq):
+    """Contagem, soma e soma dos quadrados de Horas/Dia por período (freq 'W' ou 'M')."""
+    horas = df['Horas/Dia'].astype(float)
+    grouped = pd.DataFrame({'count': 1, 'sum': horas, 'sumsq': horas * horas}).groupby(_period_codes(df, freq))
+    stats = grouped.sum()
+    stats.index = _code_periods(stats.index, freq)
+    return stats
+
+
+def _mean_std(count, total, sumsq):
+    """Média e desvio padrão amostral (ddof=1, como o pandas) a partir dos acumuladores."""
+    if count == 0:
+        return np.nan, np.nan
+    mean = total / count
+    if count < 2:
+        return mean, np.nan
+    var = max(sumsq - total * total / count, 0.0) / (count - 1)
+    return mean, var ** 0.5
+
+
+def mode_of(counts):
+    """Moda de um Counter de valores: o mais frequente, e o menor em caso de empate."""
+    if not counts:
+        return 0
+    top = max(counts.values())
+    return min(value for value, n in counts.items() if n == top)
+
+
+class IncrementalAggregator:
+    """Acumula as estatísticas diárias, semanais e mensais arquivo a arquivo."""
+
+    def __init__(self):
+        self._parts = {}
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._values = Counter()
+        self._weekly = pd.DataFrame(columns=_STAT_COLUMNS, dtype=float)
+        self._monthly = pd.DataFrame(columns=_STAT_COLUMNS, dtype=float)
+
+    def __contains__(self, key):
+        return key in self._parts
+
+    def keys(self):
+        return list(self._parts)
+
+    def add(self, key, df):
+        """
+        Soma a contribuição de um arquivo.
+
+        df precisa ter 'Data' já convertida para datetime (linhas com data
+        inválida devem ter sido removidas) e a coluna 'Horas/Dia'.
+        """
+        if key in self._parts:
+            return
+        horas = df['Horas/Dia'].astype(float)
+        part = {
+            'count': len(horas),
+            'sum': float(horas.sum()),
+            'sumsq': float((horas * horas).sum()),
+            'values': Counter(horas.value_counts().to_dict()),
+            'weekly': _group_stats(df, 'W'),
+            'monthly': _group_stats(df, 'M'),
+        }
+        self._parts[key] = part
+        self._apply(part, 1)
+
+    def remove(self, key):
+        """Subtrai a contribuição de um arquivo que saiu do upload."""
+        part = self._parts.pop(key, None)
+        if part is not None:
+            self._apply(part, -1)
+
+    @timed('agregacao.sincronizacao')
+    def sync(self, frames):
+        """Deixa o agregador com exatamente os arquivos de frames (dict chave -> DataFrame)."""
+        for key in [k for k in self._parts if k not in frames]:
+            self.remove(key)
+        for key, df in frames.items():
+            self.add(key, df)
+
+    def _apply(self, part, sign):
+        self._count += sign * part['count']
+        self._sum += sign * part['sum']
+        self._sumsq += sign * part['sumsq']
+        if sign > 0:
+            self._values.update(part['values'])
+        else:
+            self._values.subtract(part['values'])
+            self._values = +self._values  # descarta contagens zeradas
+        self._weekly = self._merge(self._weekly, part['weekly'], sign)
+        self._monthly = self._merge(self._monthly, part['monthly'], sign)
+
+    @staticmethod
+    def _merge(totals, part, sign):
+        """Atualiza só os períodos presentes em part."""
+        if part.empty:
+            return totals
+        merged = totals.add(part * sign, fill_value=0)
+        return merged[merged['count'] > 0].sort_index()
+
+    def daily_stats(self):
+        """(média, desvio padrão, moda) das horas diárias."""
+        mean, std = _mean_std(self._count, self._sum, self._sumsq)
+        return mean, std, mode_of(self._values)
+
+    def weekly_totals(self):
+        """Total de horas por semana (Series indexada por Period semanal)."""
+        return self._weekly['sum'].rename('Horas/Dia')
+
+    def monthly_totals(self):
+        """Total de horas por mês (Series indexada por Period mensal)."""
+        return self._monthly['sum'].rename('Horas/Dia')
+
+    def weekly_stats(self):
+        """(média, desvio padrão) dos totais semanais."""
+        totals = self.weekly_totals()
+        return totals.mean(), totals.std()
+
+
+def person_period_totals(df, freq):
+    """Total de horas por pessoa e período (Series com índice (Pessoa, Period))."""
+    horas = df['Horas/Dia'].astype(float)
+    pessoa = df['Pessoa'].astype(object)
+    totals = horas.groupby([pessoa.to_numpy(), _period_codes(df, freq)]).sum()
+    totals.index = pd.MultiIndex.from_arrays(
+        [totals.index.get_level_values(0), _code_periods(totals.index.get_level_values(1), freq)],
+        names=['Pessoa', 'Período']
+    )
+    return totals
+
+
+def _person_modes(df):
+    """Moda das horas diárias de cada pessoa (a menor, em caso de empate)."""
+    counts = df.groupby(['Pessoa', 'Horas/Dia']).size().reset_index(name='n')
+    counts = counts.sort_values(['Pessoa', 'n', 'Horas/Dia'], ascending=[True, False, True], kind='stable')
+    return counts.drop_duplicates('Pessoa').set_index('Pessoa')['Horas/Dia']
+
+
+@timed('agregacao.pessoas')
+def person_stats(df):
+    """
+    Estatísticas diárias e semanais de cada pessoa, uma linha por pessoa.
+
+    df é o consolidado (Data em datetime, Horas/Dia e Pessoa). Média e desvio
+    padrão usam ddof=1, como as estatísticas gerais.
+    """
+    horas = df['Horas/Dia'].astype(float)
+    daily = horas.groupby(df['Pessoa']).agg(['count', 'sum', 'mean', 'std'])
+    period = df['Data'].groupby(df['Pessoa']).agg(['min', 'max'])
+    weekly = person_period_totals(df, 'W').groupby(level='Pessoa').agg(['count', 'mean', 'std'])
+    stats = pd.DataFrame({
+        'Dias': daily['count'],
+        'Total Horas': daily['sum'],
+        'Média Diária': daily['mean'],
+        'Moda Diária': _person_modes(df),
+        'Desvio Padrão Diário': daily['std'],
+        'Semanas': weekly['count'],
+        'Média Semanal': weekly['mean'],
+        'Desvio Padrão Semanal': weekly['std'],
+        'Primeiro Dia': period['min'],
+        'Último Dia': period['max'],
+    })
+    stats.index.name = 'Pessoa'
+    return stats
+
+
+def person_monthly_pivot(df):
+    """Tabela pessoa x mês com o total de horas (meses sem registro valem 0)."""
+    pivot = person_period_totals(df, 'M').unstack('Período', fill_value=0.0)
+    pivot.columns = [str(col) for col in pivot.columns]
+    return pivot
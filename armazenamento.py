@@ -0,0 +1,283 @@
+"""
+Base local (SQLite) com as folhas de ponto já processadas.
+
+Cada arquivo enviado é guardado uma vez, endereçado pelo SHA-256 do seu
+conteúdo (o mesmo de cache_ocr.content_key): as linhas compactas dos leitores
+de Excel e OCR (registros.py) e as Horas/Dia já calculadas. Reenviar o mesmo
+formulário, ou consultar períodos antigos, lê essas linhas em vez de refazer
+o OCR ou a leitura da planilha. As linhas têm índice por dia, por arquivo de
+origem e por pessoa.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from calculo_horas import dated_frame, default_person
+from diagnostico import timed
+from registros import (
+    HOLIDAY, MISSING_DAY, RECORD_COLUMNS, STATUS_DTYPE, TIME_COLUMNS, days_to_datetime, make_records
+)
+
+DB_FILENAME = 'horas_psc.sqlite3'
+
+# Colunas de horário (minutos), na ordem da tabela registros
+_SQL_TIMES = ['entrada', 'inicio_intervalo', 'fim_intervalo', 'saida']
+
+FILES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    hash TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    modelo TEXT,
+    assinatura TEXT,
+    colunas TEXT NOT NULL,
+    descartados TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    total_horas REAL NOT NULL,
+    processado_em TEXT NOT NULL
+);
+"""
+RECORDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    arquivo TEXT NOT NULL REFERENCES arquivos(hash) ON DELETE CASCADE,
+    linha INTEGER NOT NULL,
+    dia INTEGER,
+    entrada INTEGER NOT NULL,
+    inicio_intervalo INTEGER NOT NULL,
+    fim_intervalo INTEGER NOT NULL,
+    saida INTEGER NOT NULL,
+    situacao INTEGER NOT NULL,
+    horas REAL NOT NULL,
+    pessoa TEXT,
+    PRIMARY KEY (arquivo, linha)
+) WITHOUT ROWID
+"""
+SCHEMA = FILES_SCHEMA + RECORDS_SCHEMA + ';'
+# A chave primária (arquivo, linha) já serve de índice por arquivo de origem.
+# 'dia' são os dias desde 1970-01-01, NULL quando a data do arquivo é inválida;
+# os horários são minutos desde a meia-noite (-1 quando ausentes) e 'situacao'
+# o código da categoria em registros.STATUS_DTYPE. 'pessoa' é NULL nas linhas
+# gravadas antes da coluna existir (vale o nome do arquivo).
+
+# Código de registros.HOLIDAY em 'situacao'
+_HOLIDAY_CODE = STATUS_DTYPE.categories.get_loc(HOLIDAY)
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS registros_dia ON registros (dia);
+CREATE INDEX IF NOT EXISTS registros_pessoa ON registros (pessoa, dia);
+"""
+
+
+class TimesheetStore:
+    """Linhas processadas por arquivo, com deduplicação pelo hash do conteúdo."""
+
+    def __init__(self, path=DB_FILENAME):
+        self.path = path
+        self._lock = threading.Lock()
+        # O Streamlit roda cada rerun em uma thread; o lock serializa o acesso
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(INDEXES)
+
+    def _migrate(self):
+        """Converte bases criadas por versões anteriores (linhas em texto) para o formato atual."""
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(registros)')}
+        if 'data' not in columns:
+            return
+        legacy = 'pessoa' if 'pessoa' in columns else 'NULL'
+        # Uma transação só: se a conversão falhar, a base continua no formato antigo
+        self._conn.execute('BEGIN')
+        try:
+            rows = self._conn.execute(
+                f"SELECT arquivo, linha, data, entrada, inicio_intervalo, fim_intervalo, saida, horas, {legacy} "
+                'FROM registros ORDER BY arquivo, linha'
+            ).fetchall()
+            self._conn.execute('ALTER TABLE registros RENAME TO registros_texto')
+            self._conn.execute(RECORDS_SCHEMA)
+            if rows:
+                arquivo, linha, data, entrada, inicio, fim, saida, horas, pessoa = zip(*rows)
+                records = make_records(data, entrada, inicio, fim, saida)
+                self._conn.executemany(
+                    'INSERT INTO registros VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    zip(arquivo, linha, *_record_values(records), horas, pessoa)
+                )
+            self._conn.execute('DROP TABLE registros_texto')
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM arquivos WHERE hash = ?', (key,)).fetchone()
+        return row is not None
+
+    @timed('base.gravacao')
+    def save(self, key, name, source, df, malformed=()):
+        """
+        Guarda as linhas de um arquivo (df como devolvido por hours_frames).
+
+        source é 'excel' ou 'ocr'; malformed são os dias descartados pelo
+        leitor de OCR. Um arquivo já guardado não é regravado.
+        """
+        horas = df['Horas/Dia'].astype(float)
+        pessoa = df['Pessoa'].astype(object).where(df['Pessoa'].notna(), '').astype(str).tolist()
+        rows = zip([key] * len(df), range(len(df)), *_record_values(df), horas.tolist(), pessoa)
+
+        file_row = (
+            key, name, source, df.attrs.get('modelo'), df.attrs.get('assinatura'),
+            json.dumps(RECORD_COLUMNS + ['Horas/Dia'], ensure_ascii=False),
+            json.dumps(list(malformed), ensure_ascii=False),
+            len(df), float(horas.sum()), datetime.now().isoformat(timespec='seconds'),
+        )
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', file_row
+            )
+            if cursor.rowcount:
+                self._conn.executemany('INSERT INTO registros VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    @timed('base.leitura')
+    def load(self, key):
+        """
+        Linhas guardadas de um arquivo, como (df, dated, malformed), ou None.
+
+        df e dated têm o mesmo formato de hours_frames: dated com 'Data' em
+        datetime e só com as linhas que entram nas estatísticas.
+        """
+        with self._lock:
+            meta = self._conn.execute(
+                'SELECT nome, modelo, assinatura, descartados FROM arquivos WHERE hash = ?', (key,)
+            ).fetchone()
+            if meta is None:
+                return None
+            rows = self._conn.execute(
+                f"SELECT dia, {', '.join(_SQL_TIMES)}, situacao, horas, pessoa "
+                'FROM registros WHERE arquivo = ? ORDER BY linha',
+                (key,)
+            ).fetchall()
+        nome, modelo, assinatura, descartados = meta
+
+        df = _frame_from_rows(rows, default_person(nome))
+        if modelo is not None:
+            df.attrs.update(modelo=modelo, assinatura=assinatura)
+        return df, dated_frame(df), json.loads(descartados)
+
+    @timed('base.consulta')
+    def query(self, start=None, end=None, source_file=None, person=None):
+        """
+        Linhas de todos os arquivos com data entre start e end (inclusive).
+
+        São as mesmas linhas que entram nas estatísticas (data válida, sem
+        feriados). Usa o índice por dia; source_file restringe a um arquivo
+        (hash) e person a uma pessoa. Retorna 'Data' em datetime, as colunas
+        compactas, 'Horas/Dia' e 'Arquivo' (nome enviado).
+        """
+        where = ['r.dia IS NOT NULL', f"r.situacao != {_HOLIDAY_CODE}"]
+        params = []
+        if start is not None:
+            where.append('r.dia >= ?')
+            params.append(_day_number(start))
+        if end is not None:
+            where.append('r.dia <= ?')
+            params.append(_day_number(end))
+        if source_file is not None:
+            where.append('r.arquivo = ?')
+            params.append(source_file)
+        if person is not None:
+            where.append('r.pessoa = ?')
+            params.append(person)
+        sql = (
+            f"SELECT r.dia, {', '.join('r.' + c for c in _SQL_TIMES)}, r.situacao, r.horas, r.pessoa, a.nome "
+            'FROM registros r JOIN arquivos a ON a.hash = r.arquivo '
+            f"WHERE {' AND '.join(where)} ORDER BY r.dia, r.arquivo, r.linha"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        names = [row[-1] for row in rows]
+        df = _frame_from_rows([row[:-1] for row in rows], [default_person(name) for name in names])
+        df.insert(0, 'Data', days_to_datetime(df['Dia'].to_numpy()))
+        df['Arquivo'] = names
+        return df
+
+    def date_range(self):
+        """(primeira, última) data válida guardada, ou (None, None) se a base está vazia."""
+        with self._lock:
+            first, last = self._conn.execute('SELECT MIN(dia), MAX(dia) FROM registros').fetchone()
+        if first is None:
+            return None, None
+        first, last = days_to_datetime([first, last])
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def files(self):
+        """Arquivos guardados, do mais recente para o mais antigo."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT hash, nome, origem, modelo, linhas, total_horas, processado_em '
+                'FROM arquivos ORDER BY processado_em DESC'
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['Hash', 'Nome', 'Origem', 'Modelo', 'Linhas', 'Total Horas', 'Processado Em'])
+
+    def remove(self, key):
+        """Apaga um arquivo e suas linhas."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM arquivos WHERE hash = ?', (key,))
+
+
+def _day_number(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+def _record_values(records):
+    """Colunas das linhas compactas como listas de valores do SQLite (dia, horários, situação)."""
+    days = records['Dia'].to_numpy()
+    dia = np.where(days == MISSING_DAY, None, days.astype(object)).tolist()
+    times = [records[col].to_numpy().tolist() for col in TIME_COLUMNS]
+    return [dia, *times, records['Situação'].cat.codes.tolist()]
+
+
+def _frame_from_rows(rows, person):
+    """
+    Linhas compactas + Horas/Dia a partir das tuplas (dia, horários, situação,
+    horas, pessoa) lidas da base; pessoa preenche as linhas sem nome gravado.
+    Minutos vem das horas gravadas (arredondadas em 0,01 h, menos de um minuto).
+    """
+    columns = list(zip(*rows)) or [()] * 8
+    dia, entrada, inicio, fim, saida, situacao, horas, pessoa = columns
+    df = pd.DataFrame({
+        'Dia': np.array([MISSING_DAY if d is None else d for d in dia], dtype=np.int32),
+        **{col: np.array(values, dtype=np.int16) for col, values in zip(TIME_COLUMNS, (entrada, inicio, fim, saida))},
+        'Minutos': np.round(np.array(horas, dtype=float) * 60).astype(np.int16),
+        'Situação': pd.Categorical.from_codes(np.array(situacao, dtype=np.int8), dtype=STATUS_DTYPE),
+    })
+    names = pd.Series(pessoa, dtype=object)
+    if names.isna().any():
+        fallback = person if isinstance(person, list) else [person] * len(names)
+        names = names.where(names.notna(), pd.Series(fallback, dtype=object))
+    df['Pessoa'] = pd.Categorical(names)
+    df['Horas/Dia'] = np.array(horas, dtype=float)
+    return df
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DB_FILENAME):
+    """Base compartilhada pelo processo (sobrevive aos reruns do Streamlit)."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = TimesheetStore(path)
+        return _store
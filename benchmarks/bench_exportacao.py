@@ -0,0 +1,107 @@
+"""
+Benchmark da exportação do relatório: tempo de gravação e pico de memória.
+
+Compara a gravação anterior (cópia do DataFrame + strftime nas datas +
+pd.ExcelWriter em BytesIO) com o xlsxwriter em modo constant_memory e com as
+saídas CSV e Parquet. O pico de memória é medido com tracemalloc numa segunda
+execução, para não distorcer o tempo; as abas já montadas (report_sheets)
+ficam de fora, só conta o que a gravação aloca.
+
+Em 100 mil linhas (VM de 1 núcleo): pd.ExcelWriter ~100 MB de pico e
+write_excel ~2 MB gravando em arquivo (~4 MB em BytesIO, que guarda o próprio
+.xlsx), já que as colunas viram valores Python em trechos de
+exportacao.WRITE_CHUNK_ROWS linhas.
+
+Uso:
+    python benchmarks/bench_exportacao.py --linhas 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregacao import IncrementalAggregator
+from exportacao import report_sheets, write_excel, write_tables
+
+
+def gerar_full_df(n, seed=42):
+    """full_df como o app monta: datas em datetime, horários em texto, Horas/Dia e Semana."""
+    rng = np.random.default_rng(seed)
+    datas = pd.Timestamp('2020-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365, n)), unit='D')
+    entrada = rng.integers(7 * 60, 9 * 60, n)
+    horarios = {
+        'Entrada': entrada,
+        'Início Intervalo': entrada + 240,
+        'Fim Intervalo': entrada + 300,
+        'Saída': entrada + 540,
+    }
+    df = pd.DataFrame({'Data': datas})
+    for col, minutos in horarios.items():
+        df[col] = pd.Series([f"{m // 60:02d}:{m % 60:02d}" for m in minutos], dtype=object)
+    df['Horas/Dia'] = 8.0
+    df['Semana'] = df['Data'].dt.to_period('W')
+    return df
+
+
+def exportar_antigo(sheets, output):
+    """Gravação anterior, mantida aqui só como referência."""
+    excel_df = sheets['Detalhes'].copy()
+    excel_df['Data'] = excel_df['Data'].dt.strftime('%d/%m/%Y')
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        excel_df.to_excel(writer, sheet_name='Detalhes', index=False)
+        for name, df in sheets.items():
+            if name != 'Detalhes':
+                df.to_excel(writer, sheet_name=name, index=False)
+
+
+def medir(func):
+    inicio = time.perf_counter()
+    func()
+    tempo = time.perf_counter() - inicio
+    tracemalloc.start()
+    func()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tempo, pico / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    print(f"{'linhas':>8} {'saída':<30} {'tempo (s)':>10} {'pico (MB)':>10}")
+    for n in args.linhas:
+        full_df = gerar_full_df(n)
+        aggregator = IncrementalAggregator()
+        aggregator.add('bench', full_df)
+        sheets = report_sheets(full_df, full_df['Horas/Dia'].sum(), aggregator)
+
+        casos = {
+            'xlsx antigo (BytesIO)': lambda: exportar_antigo(sheets, BytesIO()),
+            'xlsx constant_memory (BytesIO)': lambda: write_excel(sheets, BytesIO()),
+            'xlsx constant_memory (arquivo)': lambda: write_excel(sheets, os.path.join(pasta, 'r.xlsx')),
+            'csv': lambda: write_tables(sheets, os.path.join(pasta, 'r'), 'csv'),
+        }
+        try:
+            import pyarrow  # noqa: F401
+            casos['parquet'] = lambda: write_tables(sheets, os.path.join(pasta, 'r'), 'parquet')
+        except ImportError:
+            pass
+
+        for nome, func in casos.items():
+            tempo, pico = medir(func)
+            print(f"{n:>8} {nome:<30} {tempo:>10.3f} {pico:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark dos gráficos: tamanho da figura serializada e tempo de montagem.
+
+Compara as figuras anteriores (uma barra por dia em SVG, linhas de média e
+moda repetindo o mesmo valor em todos os dias, histograma com todos os
+valores brutos) com as de graficos.py. O tamanho é o JSON que o Streamlit
+envia ao navegador (fig.to_json()).
+
+Uso:
+    python benchmarks/bench_graficos.py --dias 30 365 1000 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graficos import daily_hours_figure, hours_histogram_figure, weekly_totals_figure
+
+
+def gerar_dados(n, seed=42):
+    """Datas consecutivas e horas diárias em torno de 6h."""
+    rng = np.random.default_rng(seed)
+    datas = pd.Series(pd.date_range('2020-01-01', periods=n, freq='D'))
+    horas = pd.Series(np.round(rng.normal(6, 1.5, n).clip(0, 12) * 4) / 4, name='Horas/Dia')
+    semanais = horas.groupby(datas.dt.to_period('W').values).sum()
+    return datas, horas, semanais
+
+
+def figuras_antigas(datas, horas, semanais, media, moda, desvio, media_semanal):
+    """Figuras como eram montadas inline no main.py, mantidas aqui só como referência."""
+    dates_str = datas.dt.strftime('%d/%m/%Y')
+    fig1 = go.Figure()
+    fig1.add_trace(go.Bar(x=dates_str, y=horas, name='Horas Trabalhadas', marker_color='#00ffea',
+                          hovertemplate='<b>%{x}</b><br>Horas: %{y:.2f}h<extra></extra>'))
+    fig1.add_trace(go.Scatter(x=dates_str, y=[media] * len(dates_str), mode='lines',
+                              name=f'Média Diária ({media:.2f}h)',
+                              line=dict(color='magenta', dash='dash', width=2)))
+    fig1.add_trace(go.Scatter(x=dates_str, y=[moda] * len(dates_str), mode='lines',
+                              name=f'Moda ({moda:.2f}h)',
+                              line=dict(color='yellow', dash='dot', width=2)))
+    fig1.update_layout(template="plotly_dark", height=500)
+
+    fig2 = go.Figure()
+    fig2.add_trace(go.Histogram(x=horas, nbinsx=15, marker_color='lime', opacity=0.7))
+    fig2.add_vline(x=media, line_dash="dash", line_color="cyan")
+    fig2.add_vline(x=moda, line_dash="dot", line_color="yellow")
+    fig2.add_vrect(x0=media - desvio, x1=media + desvio, fillcolor="orange", opacity=0.2)
+    fig2.update_layout(template="plotly_dark", height=500)
+
+    week_labels = [str(w) for w in semanais.index]
+    fig3 = go.Figure()
+    fig3.add_trace(go.Bar(x=week_labels, y=semanais.values, marker_color='#ffaa00'))
+    fig3.add_trace(go.Scatter(x=week_labels, y=[media_semanal] * len(week_labels), mode='lines',
+                              line=dict(color='cyan', dash='dash', width=2)))
+    fig3.update_layout(template="plotly_dark", height=500)
+    return [fig1, fig2, fig3]
+
+
+def figuras_novas(datas, horas, semanais, media, moda, desvio, media_semanal):
+    return [
+        daily_hours_figure(datas, horas, media, moda),
+        hours_histogram_figure(horas, media, moda, desvio),
+        weekly_totals_figure(semanais, media_semanal),
+    ]
+
+
+def medir(montar, args, repeticoes):
+    """(melhor tempo em ms de montagem + serialização, bytes por figura)."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanhos = [len(fig.to_json()) for fig in montar(*args)]
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000, tamanhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, nargs='+', default=[30, 365, 1000, 5000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dias':>6} {'versão':>7} {'tempo ms':>9} {'diário':>9} {'histograma':>11} {'semanal':>9} {'total':>9}")
+    for n in args.dias:
+        datas, horas, semanais = gerar_dados(n)
+        stats = (horas.mean(), float(horas.mode().min()), horas.std(), semanais.mean())
+        dados = (datas, horas, semanais) + stats
+        totais = {}
+        for nome, montar in (('antiga', figuras_antigas), ('nova', figuras_novas)):
+            ms, tamanhos = medir(montar, dados, args.repeticoes)
+            totais[nome] = sum(tamanhos)
+            print(f"{n:>6} {nome:>7} {ms:9.1f} {tamanhos[0]:9d} {tamanhos[1]:11d} {tamanhos[2]:9d} {totais[nome]:9d}")
+        print(f"{'':>6} {'':>7} redução do JSON: {1 - totais['nova'] / totais['antiga']:.0%}")
+
+
+if __name__ == '__main__':
+    main()
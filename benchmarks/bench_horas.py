@@ -0,0 +1,80 @@
+"""
+Benchmark do cálculo de horas: versão linha a linha (df.apply) x versão vetorizada.
+
+Uso:
+    python benchmarks/bench_horas.py
+    python benchmarks/bench_horas.py --tamanhos 10000 100000 1000000 --limite-linha 20000
+
+A versão linha a linha é muito lenta em 1M de linhas; acima de --limite-linha
+ela é medida em uma amostra e o tempo é extrapolado (marcado com '*').
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculo_horas import calculate_hours, calculate_hours_vectorized
+
+
+def gerar_linhas(n, seed=42):
+    """Gera n linhas de horários no formato usado pelo app (strings 'HH:MM')."""
+    rng = np.random.default_rng(seed)
+    entrada = rng.integers(7 * 60, 9 * 60, n)
+    ini = entrada + rng.integers(3 * 60, 4 * 60, n)
+    fim = ini + rng.integers(30, 90, n)
+    saida = fim + rng.integers(3 * 60, 5 * 60, n)
+
+    def fmt(minutos):
+        return pd.Series([f"{m // 60:02d}:{m % 60:02d}" for m in minutos], dtype=object)
+
+    df = pd.DataFrame({
+        'Entrada': fmt(entrada),
+        'Início Intervalo': fmt(ini),
+        'Fim Intervalo': fmt(fim),
+        'Saída': fmt(saida),
+    })
+    # Alguns dias sem intervalo
+    sem_intervalo = rng.random(n) < 0.1
+    df.loc[sem_intervalo, ['Início Intervalo', 'Fim Intervalo']] = ''
+    return df
+
+
+def medir(func, *args):
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--limite-linha', type=int, default=20_000,
+                        help='Máximo de linhas medidas com a versão linha a linha')
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'linha a linha (s)':>18} {'vetorizado (s)':>15} {'speedup':>9}")
+    for n in args.tamanhos:
+        df = gerar_linhas(n)
+
+        t_vet, horas_vet = medir(calculate_hours_vectorized, df)
+
+        amostra = df.iloc[:min(n, args.limite_linha)]
+        t_linha, horas_linha = medir(lambda d: d.apply(calculate_hours, axis=1), amostra)
+        extrapolado = len(amostra) < n
+        if extrapolado:
+            t_linha *= n / len(amostra)
+
+        # Confere que as duas versões concordam na parte medida
+        assert np.allclose(horas_linha.astype(float), horas_vet.iloc[:len(amostra)])
+
+        marca = '*' if extrapolado else ' '
+        print(f"{n:>10} {t_linha:>17.3f}{marca} {t_vet:>15.4f} {t_linha / t_vet:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
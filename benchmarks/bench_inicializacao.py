@@ -0,0 +1,102 @@
+"""
+Orçamento de tempo de inicialização do app Streamlit.
+
+Mede, em processos novos (cache de import frio):
+  - o tempo até a primeira tela: import do main.py + main() sem uploads,
+    em modo "bare" do Streamlit;
+  - os módulos mais caros do import, via `python -X importtime`.
+
+Falha (código de saída 1) se a mediana passar de --orcamento-ms ou se algum
+módulo pesado que deveria ser carregado sob demanda aparecer no import.
+
+Uso:
+    python benchmarks/bench_inicializacao.py
+    python benchmarks/bench_inicializacao.py --orcamento-ms 2500 --repeticoes 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependências que só devem ser importadas quando o usuário envia arquivos.
+# (plotly.graph_objects fica de fora: o próprio Streamlit o importa, de forma preguiçosa.)
+MODULOS_SOB_DEMANDA = (
+    'matplotlib', 'seaborn', 'scipy', 'plotly.express',
+    'openpyxl', 'xlsxwriter', 'requests', 'PIL.Image',
+)
+
+ORCAMENTO_MS = 2500
+
+PRIMEIRA_TELA = (
+    "import time; t = time.perf_counter(); import main; main.main(); "
+    "print(f'TEMPO {(time.perf_counter() - t) * 1000:.1f}')"
+)
+
+
+def medir_primeira_tela():
+    """Tempo (ms) do import do main.py + main() sem uploads, em um processo novo."""
+    result = subprocess.run(
+        [sys.executable, '-c', PRIMEIRA_TELA], cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    linha = next(l for l in result.stdout.splitlines() if l.startswith('TEMPO '))
+    return float(linha.split()[1])
+
+
+def importtime():
+    """Lista (cumulativo_us, módulo) de `python -X importtime -c 'import main'`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    modulos = []
+    for linha in result.stderr.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, cumulativo, nome = linha[len('import time:'):].split('|')
+        modulos.append((int(cumulativo), nome.rstrip()))
+    return modulos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_MS)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='Módulos de primeiro nível mais caros a listar')
+    args = parser.parse_args()
+
+    tempos = [medir_primeira_tela() for _ in range(args.repeticoes)]
+    mediana = statistics.median(tempos)
+
+    modulos = importtime()
+    carregados = {nome.strip() for _, nome in modulos}
+    indevidos = [m for m in MODULOS_SOB_DEMANDA if m in carregados]
+
+    # Dependências importadas diretamente pelo main (um nível de indentação abaixo dele)
+    diretos = sorted(
+        ((us, nome.strip()) for us, nome in modulos if nome.startswith('   ') and not nome.startswith('    ')),
+        reverse=True
+    )
+    print(f"Import mais caros de main ({len(modulos)} módulos carregados):")
+    for us, nome in diretos[:args.top]:
+        print(f"  {us / 1000:9.1f} ms  {nome}")
+
+    print(f"\nPrimeira tela: mediana {mediana:.0f} ms ({', '.join(f'{t:.0f}' for t in tempos)}), "
+          f"orçamento {args.orcamento_ms:.0f} ms")
+
+    falhou = False
+    if mediana > args.orcamento_ms:
+        print(f"❌ Inicialização acima do orçamento em {mediana - args.orcamento_ms:.0f} ms")
+        falhou = True
+    if indevidos:
+        print(f"❌ Módulos pesados carregados na inicialização: {', '.join(indevidos)}")
+        falhou = True
+    if not falhou:
+        print("✅ Dentro do orçamento")
+    return 1 if falhou else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Benchmark do tokenizador de texto do OCR em textos sintéticos grandes.
+
+Compara parse_time_data (uma passada, pré-compilado) com a versão anterior,
+que fazia dois re.findall e pareava quatro horários por data.
+
+Uso:
+    python benchmarks/bench_leitura_ocr.py --dias 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leitura_ocr import parse_time_data
+from registros import format_days, format_minutes
+
+
+def parse_time_data_antigo(text):
+    """Implementação anterior, mantida aqui só como referência de desempenho."""
+    dates = re.findall(r'\d{1,2}/\d{1,2}/\d{4}', text)
+    times = re.findall(r'\d{1,2}:\d{2}', text)
+    data = []
+    for i in range(0, len(dates)):
+        if i * 4 + 3 < len(times):
+            data.append({
+                'Data': dates[i],
+                'Entrada': times[i*4],
+                'Início Intervalo': times[i*4+1],
+                'Fim Intervalo': times[i*4+2],
+                'Saída': times[i*4+3]
+            })
+    return data
+
+
+def pares_data_entrada(resultado):
+    """(data, entrada) em texto dos dias lidos: lista de dicts (antigo) ou linhas compactas (novo)."""
+    if isinstance(resultado, list):
+        return [(dia['Data'], dia['Entrada']) for dia in resultado]
+    return zip(format_days(resultado['Dia'].to_numpy()), format_minutes(resultado['Entrada'].to_numpy()))
+
+
+def gerar_texto(dias, seed=42):
+    """
+    Texto no estilo do OCR, com ruído entre os campos e alguns 'Feriado'.
+
+    Retorna (texto, esperado), onde esperado mapeia cada data trabalhada à sua Entrada.
+    """
+    rng = random.Random(seed)
+    inicio = date(2020, 1, 1)
+    esperado = {}
+    linhas = ["FORMULÁRIO DE PRESTAÇÃO DE SERVIÇOS À COMUNIDADE", "Nome: ________  Processo nº 0000000-00"]
+    for i in range(dias):
+        dia = (inicio + timedelta(days=i)).strftime('%d/%m/%Y')
+        if rng.random() < 0.03:
+            linhas.append(f"{dia} Feriado")
+            continue
+        e = rng.randint(7 * 60, 9 * 60)
+        horarios = [e, e + 240, e + 300, e + 540]
+        texto = ' '.join(f"{m // 60:02d}:{m % 60:02d}" for m in horarios)
+        esperado[dia] = texto[:5]
+        linhas.append(f"{dia} | {texto} | assinatura ____")
+    return '\n'.join(linhas), esperado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dias':>8} {'MB':>6} {'antigo (MB/s)':>14} {'novo (MB/s)':>12} {'dias corretos (antigo/novo)':>28}")
+    for dias in args.dias:
+        texto, esperado = gerar_texto(dias)
+        mb = len(texto.encode('utf-8')) / 1e6
+        resultados = {}
+        for nome, func in (('antigo', parse_time_data_antigo), ('novo', parse_time_data)):
+            melhor = float('inf')
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                resultado = func(texto)
+                melhor = min(melhor, time.perf_counter() - inicio)
+            corretos = sum(1 for data, entrada in pares_data_entrada(resultado) if esperado.get(data) == entrada)
+            resultados[nome] = (mb / melhor, corretos)
+        print(f"{dias:>8} {mb:>6.2f} {resultados['antigo'][0]:>14.1f} {resultados['novo'][0]:>12.1f} "
+              f"{resultados['antigo'][1]:>13}/{resultados['novo'][1]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark do estágio de OCR contra um servidor local que imita o OCR.space.
+
+O servidor responde no mesmo formato JSON da API real, depois de esperar
+--latencia segundos, e pode falhar uma fração das requisições com 503 para
+exercitar as novas tentativas.
+
+Uso:
+    python benchmarks/bench_ocr.py --imagens 50 --latencia 0.2 --workers 1 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr
+
+
+def criar_servidor(latencia, taxa_falha):
+    """Sobe um servidor HTTP local em uma porta livre e retorna (servidor, url)."""
+    contador = {'n': 0}
+    lock = threading.Lock()
+
+    class FakeOCRHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latencia)
+            with lock:
+                contador['n'] += 1
+                falhar = taxa_falha and contador['n'] % round(1 / taxa_falha) == 0
+            if falhar:
+                self.send_response(503)
+                self.end_headers()
+                return
+            # Devolve o tamanho do corpo para conferir a ordem dos resultados
+            resposta = json.dumps({
+                'IsErroredOnProcessing': False,
+                'ParsedResults': [{'ParsedText': f"{len(corpo)}"}],
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(resposta)))
+            self.end_headers()
+            self.wfile.write(resposta)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), FakeOCRHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}/parse/image"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--imagens', type=int, default=50)
+    parser.add_argument('--latencia', type=float, default=0.2, help='Latência simulada por requisição (s)')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='Fração de respostas 503')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    ocr.BACKOFF_FACTOR = 0.05
+    servidor, url = criar_servidor(args.latencia, args.taxa_falha)
+    # Corpos de tamanhos diferentes para verificar a ordem de retorno
+    imagens = [b'x' * (1000 + i) for i in range(args.imagens)]
+
+    print(f"{'workers':>8} {'tempo (s)':>10} {'erros':>6}")
+    try:
+        for workers in args.workers:
+            inicio = time.perf_counter()
+            resultados = ocr.ocr_many(imagens, 'chave-falsa', max_workers=workers, url=url)
+            tempo = time.perf_counter() - inicio
+            erros = sum(1 for _, erro in resultados if erro is not None)
+            ok = [texto for texto, erro in resultados if erro is None]
+            assert all(int(t) > 1000 for t in ok)
+            ordem = [int(texto) - 1000 for texto, erro in resultados if erro is None]
+            assert ordem == sorted(ordem), 'resultados fora da ordem do upload'
+            print(f"{workers:>8} {tempo:>10.2f} {erros:>6}")
+    finally:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
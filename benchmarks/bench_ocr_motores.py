@@ -0,0 +1,165 @@
+"""
+Compara os motores de OCR (ocr.BACKENDS) em tempo e acerto sobre as mesmas imagens.
+
+As imagens são formulários sintéticos (dados_sinteticos.to_form_image) cujo
+texto é conhecido, ou as imagens de --pasta acompanhadas de um .txt com o
+texto esperado (formulario.jpg + formulario.txt). O acerto é a fração dos
+dias do texto esperado que saem iguais (data e os quatro horários) do texto
+reconhecido, depois de passar pelo mesmo leitor do app (leitura_ocr).
+
+Para cada motor são medidos a latência de uma imagem por vez e a vazão com
+ocr_many no paralelismo do motor. Motores indisponíveis (Tesseract não
+instalado, OCR.space sem chave) são pulados.
+
+Com --recorte, cada motor é medido também com a tabela recortada ou célula a
+célula (grade.py); os formulários sintéticos passam a ter a tabela em grade,
+com datas soltas no cabeçalho e no rodapé (to_ruled_form_image). Os bytes
+enviados ao OCR por imagem aparecem na coluna 'KB'.
+
+Uso:
+    python benchmarks/bench_ocr_motores.py
+    python benchmarks/bench_ocr_motores.py --motores tesseract --imagens 40 --desfoque 1.0
+    python benchmarks/bench_ocr_motores.py --pasta fixtures/formularios --api-key CHAVE
+    python benchmarks/bench_ocr_motores.py --motores tesseract --recorte imagem grade celulas
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados_sinteticos import generate_days, to_form_image, to_ocr_text, to_ruled_form_image
+
+import grade
+import imagens
+import ocr
+from leitura_ocr import parse_time_data_report
+from registros import TIME_COLUMNS
+
+
+def fixtures_sinteticas(quantidade, dias, desfoque, semente=42, em_grade=False):
+    """
+    Lista de (nome, bytes PNG, texto esperado) com formulários de `dias` dias
+    cada; em_grade desenha a tabela com régua (to_ruled_form_image).
+    """
+    fixtures = []
+    for i in range(quantidade):
+        df = generate_days(dias, seed=semente + i, start=f"2024-{i % 12 + 1:02d}-01")
+        texto = to_ocr_text(df, swap_rate=0.0, seed=semente + i)
+        imagem = to_ruled_form_image(df, blur=desfoque) if em_grade else to_form_image(texto, blur=desfoque)
+        fixtures.append((f"sintetico_{i:03d}.png", imagem, texto))
+    return fixtures
+
+
+def fixtures_da_pasta(pasta):
+    """Imagens da pasta que têm um .txt com o mesmo nome (o texto esperado)."""
+    fixtures = []
+    for caminho in sorted(glob.glob(os.path.join(pasta, '*'))):
+        base, ext = os.path.splitext(caminho)
+        if ext.lower() not in ('.jpg', '.jpeg', '.png') or not os.path.exists(base + '.txt'):
+            continue
+        with open(caminho, 'rb') as f, open(base + '.txt', encoding='utf-8') as g:
+            fixtures.append((os.path.basename(caminho), f.read(), g.read()))
+    return fixtures
+
+
+def dias_lidos(texto):
+    """Dias do texto pelo leitor do app, como tuplas (Dia, quatro horários em minutos)."""
+    records, _ = parse_time_data_report(texto)
+    return Counter(zip(records['Dia'], *(records[col] for col in TIME_COLUMNS)))
+
+
+def acerto(esperado, reconhecido):
+    """(dias esperados, dias certos, dias a mais) do texto reconhecido."""
+    certos = sum((esperado & reconhecido).values())
+    return sum(esperado.values()), certos, sum(reconhecido.values()) - certos
+
+
+def bytes_enviados(dados, recorte):
+    """Bytes que vão ao OCR de uma imagem no recorte pedido (soma das células no modo 'celulas')."""
+    if recorte == 'celulas':
+        linhas = grade.grid_cells(dados)
+        if linhas is not None:
+            return sum(len(celula) for linha in linhas for celula in linha)
+    elif recorte == 'grade':
+        dados = grade.crop_to_grid(dados)
+    return len(imagens.prepare_image_bytes(dados)[0])
+
+
+def medir_motor(motor, fixtures, recorte='imagem'):
+    lista = [dados for _, dados, _ in fixtures]
+    nomes = [nome for nome, _, _ in fixtures]
+
+    latencias = []
+    textos = []
+    for nome, dados in zip(nomes, lista):
+        inicio = time.perf_counter()
+        texto, erro = grade.recognize_many([dados], motor, recorte)[0]
+        if erro is not None:
+            print(f"  {motor.name}: erro em {nome}: {erro}", file=sys.stderr)
+        textos.append(texto)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    grade.recognize_many(lista, motor, recorte)
+    paralelo = time.perf_counter() - inicio
+
+    esperados = certos = a_mais = 0
+    for (_, _, texto_esperado), texto in zip(fixtures, textos):
+        e, c, m = acerto(dias_lidos(texto_esperado), dias_lidos(texto))
+        esperados += e
+        certos += c
+        a_mais += m
+    return {
+        'latencia_ms': statistics.median(latencias) * 1000,
+        'vazao': len(lista) / paralelo,
+        'kb': statistics.mean(bytes_enviados(dados, recorte) for dados in lista) / 1024,
+        'workers': motor.max_workers,
+        'acerto': certos / esperados if esperados else 0.0,
+        'a_mais': a_mais,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--motores', nargs='+', choices=list(ocr.BACKENDS), default=list(ocr.BACKENDS))
+    parser.add_argument('--imagens', type=int, default=8, help='Formulários sintéticos')
+    parser.add_argument('--dias', type=int, default=20, help='Dias por formulário sintético')
+    parser.add_argument('--desfoque', type=float, default=0.0, help='Desfoque das imagens sintéticas (px)')
+    parser.add_argument('--pasta', help='Usa as imagens desta pasta (com .txt do texto esperado) em vez das sintéticas')
+    parser.add_argument('--api-key', default=os.environ.get('OCR_SPACE_API_KEY', ''))
+    parser.add_argument('--recorte', nargs='+', choices=grade.MODES, default=['imagem'],
+                        help='Partes da imagem enviadas ao OCR a comparar (padrão: imagem inteira)')
+    args = parser.parse_args()
+
+    if args.pasta:
+        fixtures = fixtures_da_pasta(args.pasta)
+        if not fixtures:
+            parser.error(f"nenhuma imagem com .txt em {args.pasta}")
+    else:
+        em_grade = args.recorte != ['imagem']
+        fixtures = fixtures_sinteticas(args.imagens, args.dias, args.desfoque, em_grade=em_grade)
+    print(f"{len(fixtures)} imagem(ns)")
+
+    print(f"{'motor':>10} {'recorte':>8} {'ms/imagem':>10} {'imagens/s':>10} {'KB':>7} {'workers':>8} "
+          f"{'acerto':>8} {'dias a mais':>12}")
+    for nome in args.motores:
+        if nome == 'ocrspace' and not args.api_key:
+            print(f"{nome:>10}  pulado (sem --api-key)")
+            continue
+        motor = ocr.get_backend(nome, args.api_key)
+        if not motor.available():
+            print(f"{nome:>10}  pulado (indisponível nesta máquina)")
+            continue
+        for recorte in args.recorte:
+            r = medir_motor(motor, fixtures, recorte)
+            print(f"{nome:>10} {recorte:>8} {r['latencia_ms']:>10.1f} {r['vazao']:>10.1f} {r['kb']:>7.1f} "
+                  f"{r['workers']:>8} {r['acerto']:>8.1%} {r['a_mais']:>12}")
+
+
+if __name__ == '__main__':
+    main()
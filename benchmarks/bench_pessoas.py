@@ -0,0 +1,87 @@
+"""
+Benchmark das estatísticas por pessoa.
+
+Compara agregacao.person_stats (agrupamentos vetorizados sobre o consolidado)
+com um laço que filtra o DataFrame e calcula as estatísticas de uma pessoa por
+vez, e confere que os dois dão o mesmo resultado.
+
+Uso:
+    python benchmarks/bench_pessoas.py --pessoas 10 100 1000 --dias 250
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregacao import person_stats
+
+
+def gerar_consolidado(pessoas, dias, seed=42):
+    """Consolidado com `dias` dias de registro para cada uma das `pessoas`."""
+    rng = np.random.default_rng(seed)
+    n = pessoas * dias
+    return pd.DataFrame({
+        'Data': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        'Horas/Dia': np.round(rng.normal(6, 1.5, n).clip(0, 12) * 4) / 4,
+        'Pessoa': np.repeat([f"pessoa_{i:04d}" for i in range(pessoas)], dias),
+    })
+
+
+def estatisticas_em_laco(df):
+    """Uma pessoa por vez, como seria feito reaproveitando o cálculo global."""
+    linhas = {}
+    for pessoa in df['Pessoa'].unique():
+        sub = df[df['Pessoa'] == pessoa]
+        horas = sub['Horas/Dia']
+        contagens = horas.value_counts()
+        semanais = horas.groupby(sub['Data'].dt.to_period('W')).sum()
+        linhas[pessoa] = {
+            'Dias': len(horas),
+            'Total Horas': horas.sum(),
+            'Média Diária': horas.mean(),
+            'Moda Diária': contagens[contagens == contagens.max()].index.min(),
+            'Desvio Padrão Diário': horas.std(),
+            'Semanas': len(semanais),
+            'Média Semanal': semanais.mean(),
+            'Desvio Padrão Semanal': semanais.std(),
+        }
+    return pd.DataFrame.from_dict(linhas, orient='index')
+
+
+def medir(func, df, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func(df)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pessoas', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--dias', type=int, default=250, help='Dias de registro por pessoa')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pessoas':>8} {'linhas':>9} {'laço ms':>10} {'agrupado ms':>12} {'ganho':>7}  iguais")
+    for pessoas in args.pessoas:
+        df = gerar_consolidado(pessoas, args.dias)
+        ms_laco, esperado = medir(estatisticas_em_laco, df, args.repeticoes)
+        ms_agrupado, resultado = medir(person_stats, df, args.repeticoes)
+        colunas = list(esperado.columns)
+        iguais = np.allclose(
+            resultado.loc[esperado.index, colunas].to_numpy(dtype=float),
+            esperado.to_numpy(dtype=float), equal_nan=True
+        )
+        print(f"{pessoas:>8} {len(df):>9} {ms_laco:>10.1f} {ms_agrupado:>12.1f} "
+              f"{ms_laco / ms_agrupado:>6.1f}x  {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
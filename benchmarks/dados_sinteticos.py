@@ -0,0 +1,261 @@
+"""
+Gerador de folhas de ponto sintéticas para benchmarks.
+
+Gera dias úteis com horários plausíveis (Entrada, Início Intervalo, Fim
+Intervalo, Saída) e aplica ruído configurável: horários faltando, dias sem
+intervalo, linhas de "Feriado" e datas inválidas. A partir desses dias grava:
+
+  - planilha tradicional (Data, Entrada, Início Intervalo, Fim Intervalo, Saída);
+  - planilha separada (Horário de entrada 1, Horário de saída 1, ...);
+  - texto no formato devolvido pelo OCR, linha a linha ou coluna a coluna,
+    com trocas de caracteres típicas do OCR ('0' lido como 'O');
+  - imagem do formulário (PNG) com esse texto, para comparar motores de OCR;
+  - imagem do formulário com a tabela em grade e datas soltas no cabeçalho e
+    no rodapé, para medir o recorte da grade (grade.py).
+
+Tudo é determinístico para a mesma semente.
+
+Uso:
+    python benchmarks/dados_sinteticos.py --dias 5000 --modelo tradicional -o sintetico.xlsx
+    python benchmarks/dados_sinteticos.py --dias 300 --modelo ocr -o sintetico.txt --feriado 0.05
+    python benchmarks/dados_sinteticos.py --dias 20 --modelo imagem -o formulario.png
+    python benchmarks/dados_sinteticos.py --dias 20 --modelo imagem-grade -o formulario.png
+"""
+import argparse
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# Probabilidades por dia de cada tipo de ruído
+DEFAULT_NOISE = {
+    'faltando': 0.02,       # um dos quatro horários em branco
+    'sem_intervalo': 0.10,  # dia sem intervalo registrado
+    'feriado': 0.03,        # linha "Feriado" sem horários
+    'data_invalida': 0.01,  # data que não existe ou fora do formato
+}
+
+# Probabilidade de cada caractere '0' de um horário sair como 'O' no texto do OCR
+DEFAULT_OCR_SWAP = 0.0
+
+INVALID_DATES = np.array(['31/02/2024', '32/01/2024', '15/13/2024', '2024-13-45', '//'])
+
+TIME_COLUMNS = ['Entrada', 'Início Intervalo', 'Fim Intervalo', 'Saída']
+
+SEPARATED_COLUMNS = {
+    'Entrada': 'Horário de entrada 1',
+    'Início Intervalo': 'Horário de saída 1',
+    'Fim Intervalo': 'Horário de entrada 2',
+    'Saída': 'Horário de saída 2',
+}
+
+
+def _hhmm(minutes):
+    minutes = np.asarray(minutes)
+    return np.char.add(np.char.add(np.char.zfill((minutes // 60).astype(str), 2), ':'),
+                       np.char.zfill((minutes % 60).astype(str), 2))
+
+
+def generate_days(n, seed=42, start='2024-01-01', noise=None, people=1):
+    """
+    DataFrame com n dias por pessoa nas colunas do app (Data, horários como
+    texto 'HH:MM' e Pessoa), já com o ruído aplicado.
+
+    noise substitui as taxas de DEFAULT_NOISE informadas (ex.: {'feriado': 0}
+    para nenhum feriado).
+    """
+    rates = dict(DEFAULT_NOISE, **(noise or {}))
+    rng = np.random.default_rng(seed)
+    total = n * people
+
+    workdays = pd.bdate_range(start, periods=n)
+    dates = np.tile(workdays.strftime('%d/%m/%Y').to_numpy(dtype=object), people)
+
+    entrada = rng.integers(7 * 60, 9 * 60 + 30, total)
+    inicio = entrada + rng.integers(180, 300, total)
+    fim = inicio + rng.integers(30, 90, total)
+    saida = np.minimum(fim + rng.integers(180, 300, total), 23 * 60 + 59)
+    times = {col: _hhmm(m).astype(object) for col, m in zip(TIME_COLUMNS, (entrada, inicio, fim, saida))}
+
+    df = pd.DataFrame({'Data': dates, **times})
+    df['Pessoa'] = np.repeat([f"Pessoa {i + 1:04d}" for i in range(people)], n)
+
+    no_break = rng.random(total) < rates['sem_intervalo']
+    df.loc[no_break, ['Início Intervalo', 'Fim Intervalo']] = ''
+
+    missing = rng.random(total) < rates['faltando']
+    missing_col = rng.integers(0, len(TIME_COLUMNS), total)
+    for i, col in enumerate(TIME_COLUMNS):
+        df.loc[missing & (missing_col == i), col] = ''
+
+    holiday = rng.random(total) < rates['feriado']
+    df.loc[holiday, TIME_COLUMNS] = ''
+    df.loc[holiday, 'Entrada'] = 'Feriado'
+
+    bad_date = rng.random(total) < rates['data_invalida']
+    df.loc[bad_date, 'Data'] = rng.choice(INVALID_DATES, bad_date.sum())
+    return df
+
+
+def _native_cells(df):
+    """Datas e horários como células nativas do Excel (datetime/time) em vez de texto."""
+    native = df.copy()
+    parsed = pd.to_datetime(native['Data'], format='%d/%m/%Y', errors='coerce')
+    native['Data'] = parsed.astype(object).where(parsed.notna(), native['Data'])
+    for col in TIME_COLUMNS:
+        parsed = pd.to_datetime(native[col], format='%H:%M', errors='coerce')
+        times = pd.Series([t.time() if pd.notna(t) else None for t in parsed], index=native.index, dtype=object)
+        native[col] = times.where(parsed.notna(), native[col])
+    return native
+
+
+def to_traditional_excel(df, output, native=False, with_person=False):
+    """Grava no modelo tradicional (Data, Entrada, Início Intervalo, Fim Intervalo, Saída)."""
+    columns = ['Data'] + TIME_COLUMNS + (['Pessoa'] if with_person else [])
+    sheet = _native_cells(df) if native else df
+    sheet[columns].to_excel(output, index=False, engine='xlsxwriter')
+
+
+def to_separated_excel(df, output, native=False, with_date=True):
+    """Grava no modelo separado (Horário de entrada 1, Horário de saída 1, ...)."""
+    sheet = (_native_cells(df) if native else df).rename(columns=SEPARATED_COLUMNS)
+    columns = (['Data'] if with_date else []) + list(SEPARATED_COLUMNS.values())
+    sheet[columns].to_excel(output, index=False, engine='xlsxwriter')
+
+
+def to_ocr_text(df, layout='linhas', swap_rate=DEFAULT_OCR_SWAP, seed=42, header=True):
+    """
+    Texto como o OCR devolve o formulário: 'linhas' (cada dia com seus
+    horários) ou 'colunas' (todas as datas e depois todos os horários).
+    """
+    rng = np.random.default_rng(seed)
+    lines = []
+    if header and 'Pessoa' in df.columns and len(df):
+        lines += ['FOLHA DE FREQUÊNCIA - PRESTAÇÃO DE SERVIÇOS À COMUNIDADE', f"Nome: {df['Pessoa'].iloc[0]}", '']
+
+    times = df[TIME_COLUMNS].to_numpy(dtype=str)
+    if swap_rate:
+        swap = np.char.replace(times, '0', 'O')
+        times = np.where(rng.random(times.shape) < swap_rate, swap, times)
+
+    if layout == 'linhas':
+        for date, day in zip(df['Data'], times):
+            lines.append('  '.join([date] + [t for t in day if t]))
+    elif layout == 'colunas':
+        lines += list(df['Data'])
+        lines += [t for day in times for t in day if t]
+    else:
+        raise ValueError(f"Layout de OCR desconhecido: {layout}")
+    lines += ['', 'Assinatura do responsável: ____________________']
+    return '\n'.join(lines)
+
+
+def to_form_image(text, font_size=28, margin=40, blur=0.0):
+    """
+    PNG com o texto desenhado em preto sobre branco, como a foto de um
+    formulário bem enquadrada; blur > 0 desfoca a imagem (raio em pixels).
+    """
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    font = ImageFont.load_default(size=font_size)
+    lines = text.split('\n')
+    line_height = int(font_size * 1.5)
+    width = max(int(font.getlength(line)) for line in lines) + 2 * margin
+    image = Image.new('L', (width, line_height * len(lines) + 2 * margin), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * line_height), line, fill=0, font=font)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+# Cabeçalho da tabela do formulário em grade e larguras das colunas (em caracteres)
+RULED_HEADER = ['Data', 'Entrada', 'Início', 'Fim', 'Saída']
+RULED_WIDTHS = [12, 8, 8, 8, 8]
+
+
+def to_ruled_form_image(df, font_size=28, margin=40, blur=0.0):
+    """
+    PNG do formulário com os dias em uma tabela com régua (linhas e colunas
+    desenhadas), como a folha de frequência impressa. Cabeçalho e rodapé têm
+    datas e horários fora da tabela (emissão, prazo de entrega), que o OCR da
+    imagem inteira lê junto com os dias.
+    """
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    font = ImageFont.load_default(size=font_size)
+    line_height = int(font_size * 1.8)
+    char_width = font.getlength('0')
+    columns = np.cumsum([0] + [int(w * char_width) + 2 * font_size for w in RULED_WIDTHS])
+    header = ['FOLHA DE FREQUÊNCIA - PRESTAÇÃO DE SERVIÇOS À COMUNIDADE', 'Emitido em 01/06/2025 às 10:15']
+    if 'Pessoa' in df.columns and len(df):
+        header.append(f"Nome: {df['Pessoa'].iloc[0]}")
+    footer = ['Entregar até 05/07/2025 às 18:00', 'Assinatura do responsável: ____________________']
+
+    rows = [RULED_HEADER] + [[date, *day] for date, day in zip(df['Data'], df[TIME_COLUMNS].to_numpy(dtype=str))]
+    table_top = margin + (len(header) + 1) * line_height
+    table_bottom = table_top + len(rows) * line_height
+    width = max(int(columns[-1]), *(int(font.getlength(line)) for line in header + footer)) + 2 * margin
+    height = table_bottom + (len(footer) + 1) * line_height + margin
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(header):
+        draw.text((margin, margin + i * line_height), line, fill=0, font=font)
+    for i, line in enumerate(footer):
+        draw.text((margin, table_bottom + (i + 1) * line_height), line, fill=0, font=font)
+    for i, row in enumerate(rows):
+        top = table_top + i * line_height
+        for left, cell in zip(columns[:-1], row):
+            draw.text((margin + left + font_size, top + (line_height - font_size) // 2), cell, fill=0, font=font)
+    for i in range(len(rows) + 1):
+        y = table_top + i * line_height
+        draw.line([(margin, y), (margin + columns[-1], y)], fill=0, width=2)
+    for x in columns:
+        draw.line([(margin + x, table_top), (margin + x, table_bottom)], fill=0, width=2)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, default=1000, help='Dias por pessoa')
+    parser.add_argument('--pessoas', type=int, default=1)
+    parser.add_argument('--modelo', choices=['tradicional', 'separado', 'ocr', 'ocr-colunas', 'imagem', 'imagem-grade'],
+                        default='tradicional')
+    parser.add_argument('--nativo', action='store_true', help='Datas e horários como células de data/hora do Excel')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--troca-ocr', type=float, default=DEFAULT_OCR_SWAP,
+                        help="Probabilidade de '0' virar 'O' em cada horário do texto OCR")
+    for key, rate in DEFAULT_NOISE.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float, default=rate, help=f'Ruído (padrão {rate})')
+    parser.add_argument('-o', '--saida', required=True)
+    args = parser.parse_args()
+
+    noise = {key: getattr(args, key) for key in DEFAULT_NOISE}
+    df = generate_days(args.dias, args.semente, noise=noise, people=args.pessoas)
+    if args.modelo == 'tradicional':
+        to_traditional_excel(df, args.saida, native=args.nativo, with_person=args.pessoas > 1)
+    elif args.modelo == 'separado':
+        to_separated_excel(df, args.saida, native=args.nativo)
+    elif args.modelo == 'imagem':
+        with open(args.saida, 'wb') as f:
+            f.write(to_form_image(to_ocr_text(df, swap_rate=0.0, seed=args.semente)))
+    elif args.modelo == 'imagem-grade':
+        with open(args.saida, 'wb') as f:
+            f.write(to_ruled_form_image(df))
+    else:
+        layout = 'colunas' if args.modelo == 'ocr-colunas' else 'linhas'
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(to_ocr_text(df, layout, args.troca_ocr, args.semente))
+    print(f"{len(df)} dia(s) gravados em {args.saida} ({os.path.getsize(args.saida)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
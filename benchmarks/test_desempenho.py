@@ -0,0 +1,122 @@
+"""
+Suíte de regressão de desempenho (pytest-benchmark): leitura, cálculo,
+agregação, acompanhamento da PSC e exportação.
+
+Cada caso roda sobre folhas sintéticas de benchmarks/dados_sinteticos.py
+(mesma semente, mesmo tamanho) e é medido em REPETICOES rodadas depois de
+uma de aquecimento. A comparação com a base usa a mediana das rodadas, menos
+sensível a uma rodada atrasada pela máquina que a média ou o mínimo.
+
+A base fica em .benchmarks/, na pasta da plataforma e versão do Python em
+que foi gravada; o JSON traz a CPU, o Python e as versões de pandas, numpy e
+openpyxl. A base do repositório foi gravada com as versões do uv.lock
+(Python 3.11.7, pandas 2.2.3, numpy 2.2.6, openpyxl 3.1.5, xlsxwriter 3.2.3)
+em uma VM Linux de 1 núcleo (Intel Xeon, 2,0 GHz). Nessa VM a mediana de um
+caso varia até ~25% entre execuções, por isso a tolerância sugerida é de 40%.
+Ela só vale nessa máquina: ao trocar de máquina ou de versões, grave uma base
+nova antes de comparar.
+
+Uso (na raiz do projeto, com pytest e pytest-benchmark instalados):
+    pytest benchmarks/test_desempenho.py
+    pytest benchmarks/test_desempenho.py --benchmark-compare=0001 --benchmark-compare-fail=median:40%
+    pytest benchmarks/test_desempenho.py -k "calculo or agregacao"
+    pytest benchmarks/test_desempenho.py --benchmark-save=base
+"""
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from dados_sinteticos import generate_days, to_ocr_text, to_separated_excel, to_traditional_excel
+
+from agregacao import IncrementalAggregator, person_stats
+from calculo_horas import hours_frames
+from cumprimento import track_progress
+from exportacao import report_sheets, write_excel
+from leitura_excel import process_excel_file
+from leitura_ocr import parse_time_data_report
+
+# Tamanho das folhas sintéticas
+DIAS = 1000
+PESSOAS = 4
+
+# Rodadas medidas por caso (a comparação usa a mediana)
+REPETICOES = 11
+
+# Casos de poucos milissegundos rodam várias vezes por rodada, para a rodada
+# não ficar na escala do ruído do relógio e do escalonador
+ITERACOES = {'calculo_horas': 20, 'cumprimento': 5, 'leitura_ocr': 5}
+
+CASOS = [
+    'leitura_excel_tradicional', 'leitura_excel_separado', 'leitura_excel_nativo', 'leitura_ocr',
+    'calculo_horas', 'agregacao', 'cumprimento', 'exportacao',
+]
+
+
+def _excel_bytes(writer, df):
+    buffer = io.BytesIO()
+    writer(df, buffer)
+    return buffer.getvalue()
+
+
+def _frames_by_person(df, dated):
+    return {pessoa: sub for pessoa, sub in dated.groupby('Pessoa', sort=False, observed=True)}
+
+
+def preparar_casos(dias, pessoas):
+    """
+    Dados de entrada (fora da medição) e função medida de cada caso.
+
+    Os casos seguem o caminho do app: a saída da leitura alimenta o cálculo,
+    que alimenta a agregação e a exportação.
+    """
+    dias_df = generate_days(dias, people=pessoas)
+    tradicional = _excel_bytes(lambda df, out: to_traditional_excel(df, out, with_person=pessoas > 1), dias_df)
+    separado = _excel_bytes(to_separated_excel, dias_df)
+    nativo = _excel_bytes(lambda df, out: to_traditional_excel(df, out, native=True, with_person=pessoas > 1), dias_df)
+    texto = to_ocr_text(dias_df[dias_df['Pessoa'] == dias_df['Pessoa'].iloc[0]])
+
+    raw = process_excel_file(io.BytesIO(tradicional))
+    df, dated = hours_frames(raw)
+    frames = _frames_by_person(df, dated)
+    full_df = dated.sort_values('Data', kind='stable')
+    full_df['Semana'] = full_df['Data'].dt.to_period('W')
+
+    def exportar():
+        aggregator = IncrementalAggregator()
+        aggregator.sync(frames)
+        write_excel(report_sheets(full_df, float(df['Horas/Dia'].sum()), aggregator), io.BytesIO())
+
+    def agregar():
+        aggregator = IncrementalAggregator()
+        aggregator.sync(frames)
+        aggregator.daily_stats()
+        return person_stats(full_df)
+
+    return {
+        'leitura_excel_tradicional': lambda: process_excel_file(io.BytesIO(tradicional)),
+        'leitura_excel_separado': lambda: process_excel_file(io.BytesIO(separado)),
+        'leitura_excel_nativo': lambda: process_excel_file(io.BytesIO(nativo)),
+        'leitura_ocr': lambda: parse_time_data_report(texto),
+        'calculo_horas': lambda: hours_frames(raw),
+        'agregacao': agregar,
+        'cumprimento': lambda: track_progress(full_df, required_hours=240),
+        'exportacao': exportar,
+    }
+
+
+@pytest.fixture(scope='module')
+def casos():
+    return preparar_casos(DIAS, PESSOAS)
+
+
+@pytest.mark.benchmark(disable_gc=True)
+@pytest.mark.parametrize('nome', CASOS)
+def test_desempenho(benchmark, casos, nome):
+    # Versões gravadas com cada medição: a base só vale com as mesmas do uv.lock
+    benchmark.extra_info.update(
+        dias=DIAS, pessoas=PESSOAS, pandas=pd.__version__, numpy=np.__version__, openpyxl=openpyxl.__version__
+    )
+    benchmark.pedantic(casos[nome], rounds=REPETICOES, iterations=ITERACOES.get(nome, 1), warmup_rounds=1)
@@ -0,0 +1,146 @@
+"""
+Cache dos textos de OCR, endereçado pelo conteúdo da imagem enviada.
+
+A chave é o SHA-256 dos bytes originais do upload, então reruns do Streamlit e
+novos uploads do mesmo formulário não voltam a chamar o OCR.space. Há duas
+camadas: uma LRU em memória e, opcionalmente, uma pasta em disco com limite de
+tamanho (os arquivos usados há mais tempo são apagados primeiro).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Quantidade de textos mantidos em memória
+MAX_MEMORY_ITEMS = 512
+
+# Tamanho máximo da pasta de cache em disco (bytes)
+MAX_DISK_BYTES = 50 * 1024 * 1024
+
+
+def content_key(data):
+    """Chave do cache para os bytes de uma imagem."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class OCRCache:
+    """Cache LRU em memória com camada opcional em disco e contadores de acertos."""
+
+    def __init__(self, max_items=MAX_MEMORY_ITEMS, disk_dir=None, max_disk_bytes=MAX_DISK_BYTES):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.txt")
+
+    def get(self, key):
+        """Retorna o texto guardado para key, ou None se não estiver no cache."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.memory_hits += 1
+                return self._items[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    text = f.read()
+                os.utime(path)  # marca como usado recentemente
+            except OSError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, text)
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        """Guarda o texto de OCR de uma imagem nas duas camadas."""
+        with self._lock:
+            self._remember(key, text)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def _remember(self, key, text):
+        self._items[key] = text
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def _evict_disk(self):
+        """Apaga os arquivos menos usados até a pasta caber em max_disk_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.txt'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def clear(self):
+        """Esvazia a camada em memória e zera os contadores."""
+        with self._lock:
+            self._items.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Contadores de uso do cache."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / total if total else 0.0,
+                'memory_items': len(self._items),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(disk_dir=None):
+    """
+    Retorna o cache compartilhado pelo processo.
+
+    O módulo é importado uma única vez pelo servidor do Streamlit, então o
+    mesmo cache sobrevive aos reruns do script.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None or (disk_dir or None) != _cache.disk_dir:
+            _cache = OCRCache(disk_dir=disk_dir or None)
+        return _cache
@@ -0,0 +1,129 @@
+"""
+Cálculo das horas trabalhadas, compartilhado pelo app (main.py) e pelos scripts
+em lote (extrair_dados_fotos.py).
+
+Fórmula:
+    Horas/Dia = (Início Intervalo - Entrada) + (Saída - Fim Intervalo)
+
+Sem intervalo informado, Horas/Dia = Saída - Entrada. Dias sem Entrada ou
+Saída válidas (ex.: 'Feriado') valem 0, assim como totais negativos. Com mais
+pares de batidas, cada par (entrada, saída) soma; um par que atravessa a
+meia-noite (22:00 às 06:00) vale o período real. O dia pode virar a meia-noite
+uma vez só, com até 16 h (registros.MAX_OVERNIGHT_MINUTES) da primeira à
+última batida; batidas fora dessa ordem deixam o dia 'invalido', com 0 horas.
+O cálculo parte da coluna Minutos das linhas compactas de registros.py, já
+somada das batidas.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from diagnostico import count, timed
+from registros import (
+    HOLIDAY, MISSING_DAY, MISSING_MINUTES, TIME_COLUMNS, days_to_datetime, punches_from_columns, time_to_minutes,
+    worked_minutes
+)
+
+
+def calculate_hours(row):
+    """
+    Calcula as horas trabalhadas de uma linha (versão linha a linha, usada como
+    referência; não considera turnos que atravessam a meia-noite).
+    """
+    try:
+        entrada = pd.to_datetime(row['Entrada'], format='%H:%M', errors='coerce')
+        saida = pd.to_datetime(row['Saída'], format='%H:%M', errors='coerce')
+        ini_intervalo = pd.to_datetime(row['Início Intervalo'], format='%H:%M', errors='coerce')
+        fim_intervalo = pd.to_datetime(row['Fim Intervalo'], format='%H:%M', errors='coerce')
+
+        if pd.isna(entrada) or pd.isna(saida):
+            return 0
+
+        # Horas trabalhadas = (Saída1 - Entrada1) + (Saída2 - Entrada2)
+        # Saída1 = Início do Intervalo, Entrada1 = Entrada
+        # Saída2 = Saída, Entrada2 = Fim do Intervalo
+        # O intervalo já fica de fora dos dois períodos, então não é subtraído de novo.
+
+        if pd.notna(ini_intervalo) and pd.notna(fim_intervalo):
+            periodo1 = (ini_intervalo - entrada).total_seconds() / 3600  # Manhã
+            periodo2 = (saida - fim_intervalo).total_seconds() / 3600    # Tarde
+            horas_trabalhadas = periodo1 + periodo2
+        else:
+            # Se não há intervalo, calcula normalmente
+            horas_trabalhadas = (saida - entrada).total_seconds() / 3600
+
+        return max(0, round(horas_trabalhadas, 2))
+    except:
+        return 0
+
+
+def hours_from_minutes(entrada, inicio_intervalo, fim_intervalo, saida):
+    """
+    Horas trabalhadas de cada dia a partir dos quatro arrays de minutos.
+
+    Mesma fórmula de calculate_hours, em lote com NumPy (registros.worked_minutes),
+    mais os turnos que atravessam a meia-noite e a verificação da ordem das
+    batidas (registros.ordered_days); horários ausentes valem MISSING_MINUTES.
+    """
+    columns = [np.asarray(m, dtype=np.int16) for m in (entrada, inicio_intervalo, fim_intervalo, saida)]
+    valido = (columns[0] != MISSING_MINUTES) & (columns[3] != MISSING_MINUTES)
+    return np.where(valido, minutes_to_hours(worked_minutes(punches_from_columns(columns))), 0.0)
+
+
+def minutes_to_hours(minutes):
+    """Minutos trabalhados em horas, arredondadas em duas casas."""
+    return np.round(np.asarray(minutes) / 60.0, 2)
+
+
+def calculate_hours_vectorized(df):
+    """
+    Calcula a coluna 'Horas/Dia' de um DataFrame com os horários em texto.
+
+    Converte as quatro colunas de horário uma única vez em arrays de minutos
+    e faz as contas em lote com NumPy. Com os horários em ordem no mesmo dia,
+    o resultado é o de ``df.apply(calculate_hours, axis=1)``. Os dois só
+    divergem quando os horários voltam no relógio. Um turno que atravessa a
+    meia-noite (22:00 às 06:00) vale o período real aqui e 0 em
+    calculate_hours. Batidas fora de ordem (registros.ordered_days) valem 0
+    aqui. Nesse caso calculate_hours soma os dois períodos como vierem, com
+    mínimo de 0.
+    """
+    n = len(df)
+    minutes = []
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            minutes.append(time_to_minutes(df[col].to_numpy()))
+        else:
+            minutes.append(np.full(n, MISSING_MINUTES, dtype=np.int16))
+    return pd.Series(hours_from_minutes(*minutes), index=df.index, name='Horas/Dia')
+
+
+def default_person(filename):
+    """Identificador da pessoa quando o formulário não traz o nome: o nome do arquivo, sem extensão."""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def dated_frame(df):
+    """
+    Linhas que entram nas estatísticas: data válida e dia que não é feriado,
+    com 'Data' em datetime.
+    """
+    dated = df[(df['Dia'].to_numpy() != MISSING_DAY) & (df['Situação'] != HOLIDAY).to_numpy()].copy()
+    dated.insert(0, 'Data', days_to_datetime(dated['Dia'].to_numpy()))
+    return dated
+
+
+@timed('horas.calculo')
+def hours_frames(records):
+    """
+    Acrescenta 'Horas/Dia' às linhas compactas de um arquivo (registros.py).
+
+    Retorna (df, dated): df com todas as linhas e dated só com as de data
+    válida que não são feriado, com 'Data' em datetime. As horas saem direto
+    da coluna Minutos, sem interpretar texto.
+    """
+    df = records.copy()
+    df['Horas/Dia'] = minutes_to_hours(records['Minutos'].to_numpy())
+    count('horas.linhas', len(df))
+    return df, dated_frame(df)
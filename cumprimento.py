@@ -0,0 +1,175 @@
+"""
+Acompanhamento do cumprimento da PSC (prestação de serviços à comunidade).
+
+Para cada pessoa do consolidado (full_df: Data em datetime, Horas/Dia e
+Pessoa), mostra se ela está em dia com as horas determinadas: horas
+acumuladas, somas móveis dos últimos 7 e 30 dias, a data prevista de término
+pelo ritmo recente e as semanas com menos horas que o mínimo.
+
+Tudo sai de uma única passada vetorizada sobre as horas por (pessoa, dia) em
+ordem. O acumulado e as janelas móveis são diferenças de uma soma acumulada
+(np.cumsum), nas posições achadas com np.searchsorted sobre uma chave inteira
+pessoa-dia. As semanas são somas segmentadas (np.bincount). Não há laço nem
+groupby().rolling() por pessoa: o custo cresce com o número de linhas, não
+com o de pessoas.
+
+A data de referência de cada pessoa é o último dia com registro dela (ou uma
+data dada em as_of), não a data de hoje: o relatório de um lote antigo sai
+igual em qualquer dia, e quem tem formulários só até um mês anterior não vê as
+semanas seguintes marcadas nem as janelas zeradas.
+"""
+import numpy as np
+import pandas as pd
+
+from diagnostico import timed
+
+# Horas de PSC exigidas por pessoa; 0 = sem meta (sem projeção de término)
+REQUIRED_HOURS = 0.0
+
+# Mínimo de horas por semana. A PSC é cumprida à razão de uma hora de tarefa
+# por dia de condenação (Código Penal, art. 46, § 3º): 7 horas por semana
+WEEKLY_MINIMUM = 7.0
+
+# Janelas móveis, em dias corridos contando o próprio dia
+WINDOWS = (7, 30)
+
+# Janela (dias corridos até a referência) cujo ritmo projeta a data de término
+PACE_WINDOW = 30
+
+# Casas decimais das somas: descarta o resíduo de ponto flutuante das diferenças de np.cumsum
+_DECIMALS = 6
+
+
+def _person_days(df):
+    """
+    Horas somadas por pessoa e dia, em ordem de (pessoa, dia).
+
+    Retorna (pessoas, pessoa, dia, horas): pessoa são os códigos em pessoas
+    (em ordem alfabética) e dia os dias desde 1970-01-01. Linhas do mesmo dia
+    (dois arquivos, dois turnos) somam em uma entrada.
+    """
+    names = df['Pessoa'].astype(object)
+    codes, people = pd.factorize(names.where(names.notna(), ''), sort=True)
+    days = df['Data'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    first = days.min() if len(days) else 0
+    span = days.max() - first + 1 if len(days) else 1
+    keys, inverse = np.unique(codes * span + (days - first), return_inverse=True)
+    hours = np.bincount(inverse.ravel(), weights=df['Horas/Dia'].to_numpy(dtype=float), minlength=len(keys))
+    return pd.Index(people, name='Pessoa'), keys // span, keys % span + first, hours
+
+
+def _dates(days):
+    """Dias desde 1970-01-01 (NaN = sem data) em datetime."""
+    return pd.to_datetime(np.asarray(days, dtype=float), unit='D')
+
+
+def _segment_sums(segment, weights, n):
+    return np.round(np.bincount(segment, weights=weights, minlength=n), _DECIMALS)
+
+
+@timed('cumprimento.acompanhamento')
+def track_progress(df, required_hours=REQUIRED_HOURS, weekly_minimum=WEEKLY_MINIMUM, as_of=None):
+    """
+    Acompanhamento das horas de cada pessoa, como (resumo, diario, semanas).
+
+    diario tem uma linha por pessoa e dia com registro: Horas, Acumulado e as
+    somas dos últimos 7 e 30 dias. semanas tem as semanas completas (segunda a
+    domingo) de cada pessoa, da primeira com registro até a última antes da
+    data de referência (ou até a do término), com as semanas sem registro
+    valendo 0 e a marca Abaixo do Mínimo; a semana em que as horas foram
+    concluídas não é marcada. resumo tem uma linha por pessoa: total, janelas
+    e ritmo semanal na data de referência, semanas abaixo do mínimo e, com
+    required_hours, quanto falta e a data de conclusão ou a prevista.
+
+    A data de referência é o último dia de cada pessoa; as_of (data) fixa uma
+    só para todas, e os dias depois dela ficam de fora.
+    """
+    if as_of is not None:
+        df = df[df['Data'] <= pd.Timestamp(as_of)]
+    people, person, day, hours = _person_days(df)
+    n = len(people)
+    position = np.arange(len(hours))
+    start = np.searchsorted(person, np.arange(n + 1))
+    if as_of is None:
+        reference = day[start[1:] - 1]
+    else:
+        reference = np.full(n, np.datetime64(pd.Timestamp(as_of).date(), 'D').astype(np.int64))
+
+    # Soma das horas antes de cada posição; soma de i a j = before[j + 1] - before[i]
+    before = np.concatenate([[0.0], np.cumsum(hours)])
+    span = day.max() - day.min() + 1 if len(day) else 1
+    key = person * span + (day - day.min(initial=0))
+    daily = pd.DataFrame({
+        'Pessoa': pd.Categorical.from_codes(person, categories=people),
+        'Data': _dates(day),
+        'Horas': hours,
+        'Acumulado': np.round(before[position + 1] - before[start[person]], _DECIMALS),
+    })
+    for window in WINDOWS:
+        # A janela não recua além do primeiro dia da própria pessoa
+        low = np.maximum(np.searchsorted(key, key - (window - 1)), start[person])
+        daily[f'Últimos {window} Dias'] = np.round(before[position + 1] - before[low], _DECIMALS)
+
+    recent = {
+        window: _segment_sums(person, np.where(day > reference[person] - window, hours, 0.0), n)
+        for window in sorted(set(WINDOWS) | {PACE_WINDOW})
+    }
+    pace = recent[PACE_WINDOW] / PACE_WINDOW  # horas por dia corrido
+    total = _segment_sums(person, hours, n)
+
+    done_day = np.full(n, np.nan)
+    if required_hours > 0:
+        reached = np.flatnonzero(daily['Acumulado'].to_numpy() >= required_hours)
+        done, first = np.unique(person[reached], return_index=True)
+        done_day[done] = day[reached[first]]
+    done = ~np.isnan(done_day)
+
+    # Semanas de segunda a domingo, numeradas como em agregacao (1970-01-01 foi uma quinta-feira)
+    week = (day + 3) // 7
+    # Só semanas completas até a referência: a da referência conta se ela cai num domingo
+    last_week = (reference + 3) // 7 - ((reference + 3) % 7 != 6)
+    done_week = np.where(done, (np.nan_to_num(done_day) + 3) // 7, -1).astype(np.int64)
+    last_week = np.where(done, np.minimum(last_week, done_week), last_week)
+    first_week = week[start[:-1]]
+    counts = np.maximum(last_week - first_week + 1, 0)
+    week_person = np.repeat(np.arange(n), counts)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    listed = first_week[week_person] + np.arange(offsets[-1]) - offsets[week_person]
+
+    # Horas de cada semana listada: as entradas diárias caem na posição da mesma (pessoa, semana).
+    # Com as_of, as semanas listadas vão além da última com registro; a chave cobre as duas
+    low = week.min(initial=0)
+    week_span = max(week.max(initial=0), listed.max(initial=0)) - low + 1
+    listed_key = week_person * week_span + (listed - low)
+    daily_key = person * week_span + (week - low)
+    slot = np.minimum(np.searchsorted(listed_key, daily_key), max(len(listed_key) - 1, 0))
+    found = listed_key[slot] == daily_key if len(listed_key) else np.zeros(len(daily_key), dtype=bool)
+    week_hours = _segment_sums(slot[found], hours[found], len(listed))
+    below = (week_hours < weekly_minimum) & (listed != done_week[week_person])
+    weeks = pd.DataFrame({
+        'Pessoa': pd.Categorical.from_codes(week_person, categories=people),
+        'Semana': pd.DatetimeIndex((listed * 7 - 3).astype('datetime64[D]')).to_period('W'),
+        'Horas': week_hours,
+        'Abaixo do Mínimo': below,
+    })
+
+    summary = pd.DataFrame({
+        'Dias': np.bincount(person[hours > 0], minlength=n),
+        'Total Horas': total,
+        **{f'Últimos {window} Dias': recent[window] for window in WINDOWS},
+        'Ritmo Semanal': np.round(pace * 7, _DECIMALS),
+        'Semanas': counts,
+        'Semanas Abaixo do Mínimo': np.bincount(week_person[below], minlength=n),
+        'Primeiro Dia': _dates(day[start[:-1]]),
+        'Último Dia': _dates(day[start[1:] - 1]),
+    }, index=people)
+    if required_hours > 0:
+        remaining = np.maximum(required_hours - total, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Sem horas na janela do ritmo não há previsão
+            forecast = np.where(pace > 0, reference + np.ceil(remaining / pace), np.nan)
+        summary['Faltam'] = remaining
+        summary['% Cumprido'] = np.minimum(total / required_hours, 1.0) * 100
+        summary['Concluído Em'] = _dates(done_day)
+        summary['Término Previsto'] = _dates(np.where(done, done_day, forecast))
+    return summary, daily, weeks
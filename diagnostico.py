@@ -0,0 +1,182 @@
+"""
+Tempos por etapa, contadores e perfil opcional de uma execução.
+
+As etapas do processamento (leitura do Excel, preparo da imagem, chamada ao
+OCR, cálculo das horas, gravação do relatório, gráficos...) são marcadas com
+`with stage('nome'):` (ou `@timed('nome')`) e os volumes com `count('nome', n)`. Fora de um bloco
+`with collecting():` essas chamadas não fazem nada, então o custo no caminho
+normal é só uma consulta a uma ContextVar.
+
+O coletor fica na ContextVar da execução: cada rerun do Streamlit e cada
+arquivo do lote tem o seu. Threads criadas com `submit_in_context` enxergam o
+mesmo coletor. Os tempos são somados por etapa, então etapas que rodam em
+paralelo (ex.: OCR) podem somar mais que o tempo total.
+"""
+import contextvars
+import functools
+import io
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_active = contextvars.ContextVar('diagnostico', default=None)
+
+
+class Diagnostics:
+    """Tempos acumulados por etapa e contadores de uma execução."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = Counter()
+
+    def add_time(self, name, seconds, calls=1):
+        with self._lock:
+            entry = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += calls
+            entry['seconds'] += seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def merge(self, data):
+        """Soma um resultado de to_dict() (ex.: vindo de um processo do pool)."""
+        for name, entry in data.get('stages', {}).items():
+            self.add_time(name, entry['seconds'], entry['calls'])
+        for name, n in data.get('counters', {}).items():
+            self.count(name, n)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+    def rows(self):
+        """Linhas (etapa, chamadas, segundos, ms por chamada), da etapa mais cara para a mais barata."""
+        with self._lock:
+            items = sorted(self.stages.items(), key=lambda item: -item[1]['seconds'])
+            return [
+                (name, e['calls'], e['seconds'], 1000 * e['seconds'] / e['calls'] if e['calls'] else 0.0)
+                for name, e in items
+            ]
+
+
+def current():
+    """Coletor ativo, ou None."""
+    return _active.get()
+
+
+@contextmanager
+def collecting(diagnostics=None):
+    """Ativa um coletor (novo, ou o informado) durante o bloco e o devolve."""
+    diagnostics = diagnostics or Diagnostics()
+    token = _active.set(diagnostics)
+    try:
+        yield diagnostics
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Soma o tempo do bloco à etapa name, se houver coletor ativo."""
+    diagnostics = _active.get()
+    if diagnostics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        diagnostics.add_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorador: soma o tempo de cada chamada da função à etapa name."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Soma n ao contador name, se houver coletor ativo."""
+    diagnostics = _active.get()
+    if diagnostics is not None:
+        diagnostics.count(name, n)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit que roda fn com o contexto (e o coletor) de quem chamou."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class Profile:
+    """Resultado de profiled(): relatório em texto e gravação em arquivo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._profiler = None
+
+    def text(self, limit=30):
+        """Funções mais caras, em texto."""
+        if self.engine == 'pyinstrument':
+            return self._profiler.output_text(unicode=True)
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def save(self, path):
+        """Grava o perfil: .prof (pstats/snakeviz) no cProfile; .html ou texto no pyinstrument."""
+        if self.engine == 'pyinstrument':
+            output = self._profiler.output_html() if path.endswith('.html') else self.text()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            self._profiler.dump_stats(path)
+
+
+@contextmanager
+def profiled(engine=None):
+    """
+    Perfila o bloco com pyinstrument ou cProfile e devolve um Profile.
+
+    engine None usa o pyinstrument se estiver instalado e, se não, o cProfile
+    da biblioteca padrão. O cProfile só enxerga a thread atual.
+    """
+    if engine is None:
+        try:
+            import pyinstrument  # noqa: F401
+            engine = 'pyinstrument'
+        except ImportError:
+            engine = 'cprofile'
+
+    profile = Profile(engine)
+    if engine == 'pyinstrument':
+        from pyinstrument import Profiler
+        profiler = profile._profiler = Profiler()
+        start, stop = profiler.start, profiler.stop
+    elif engine == 'cprofile':
+        import cProfile
+        profiler = profile._profiler = cProfile.Profile()
+        start, stop = profiler.enable, profiler.disable
+    else:
+        raise ValueError(f"Perfilador desconhecido: {engine}")
+
+    start()
+    try:
+        yield profile
+    finally:
+        stop()
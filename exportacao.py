@@ -0,0 +1,191 @@
+"""
+Montagem e gravação da planilha consolidada (horas_psc_analise.xlsx).
+
+Usado tanto pelo app Streamlit quanto pelo processamento em lote, para que os
+dois gerem exatamente as mesmas abas. O Excel é gravado linha a linha no modo
+constant_memory do xlsxwriter, com datas nativas do Excel em vez de texto;
+para rotinas que não precisam de planilha há saída em CSV e Parquet.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from agregacao import person_monthly_pivot, person_stats
+from cumprimento import REQUIRED_HOURS, WEEKLY_MINIMUM, track_progress
+from diagnostico import count, stage, timed
+from registros import display_frame
+
+REPORT_FILENAME = 'horas_psc_analise.xlsx'
+
+# Formatos aceitos por write_report
+FORMATS = ('xlsx', 'csv', 'parquet')
+
+DATE_FORMAT = 'dd/mm/yyyy'
+
+# Linhas convertidas em valores Python de cada vez na gravação do Excel
+WRITE_CHUNK_ROWS = 5000
+
+# Dia zero das datas do Excel (sistema 1900)
+_EXCEL_EPOCH = np.datetime64('1899-12-30')
+
+
+@timed('exportacao.abas')
+def report_sheets(full_df, total_geral, aggregator, required_hours=REQUIRED_HOURS, weekly_minimum=WEEKLY_MINIMUM):
+    """
+    Monta as abas Detalhes, Resumo, Totais Semanais e Totais Mensais e, se
+    full_df tem a coluna Pessoa, Por Pessoa, Pessoa x Mês e as do
+    acompanhamento da PSC (cumprimento.track_progress): Cumprimento,
+    Progresso Diário e Semanas Abaixo do Mínimo.
+
+    full_df tem as linhas compactas de todos os arquivos com 'Data' em
+    datetime, e aggregator é o IncrementalAggregator com os mesmos arquivos.
+    Na aba Detalhes os horários saem como 'HH:MM' (registros.display_frame);
+    as datas são convertidas só na gravação.
+    """
+    media_diaria, desvio_diario, moda_diaria = aggregator.daily_stats()
+    media_semanal, desvio_semanal = aggregator.weekly_stats()
+
+    stats_df = pd.DataFrame([
+        ['Total Geral', f"{total_geral:.2f}"],
+        ['Média Diária', f"{media_diaria:.2f}"],
+        ['Moda Diária', f"{moda_diaria:.2f}"],
+        ['Desvio Padrão Diário', f"{desvio_diario:.2f}"],
+        ['Média Semanal', f"{media_semanal:.2f}"],
+        ['Desvio Padrão Semanal', f"{desvio_semanal:.2f}"]
+    ], columns=['Estatística', 'Valor'])
+
+    weekly_totals_df = aggregator.weekly_totals().reset_index()
+    weekly_totals_df.columns = ['Semana', 'Total Horas']
+    weekly_totals_df['Semana'] = weekly_totals_df['Semana'].astype(str)
+    weekly_totals_df['Total Horas'] = weekly_totals_df['Total Horas'].round(2)
+
+    monthly_totals_df = aggregator.monthly_totals().reset_index()
+    monthly_totals_df.columns = ['Mês/Ano', 'Total Horas']
+    monthly_totals_df['Mês/Ano'] = monthly_totals_df['Mês/Ano'].astype(str)
+    monthly_totals_df['Total Horas'] = monthly_totals_df['Total Horas'].round(2)
+
+    sheets = {
+        'Detalhes': display_frame(full_df, date_text=False),
+        'Resumo': stats_df,
+        'Totais Semanais': weekly_totals_df,
+        'Totais Mensais': monthly_totals_df,
+    }
+    if 'Pessoa' in full_df.columns:
+        by_person = person_stats(full_df)
+        numeric = by_person.select_dtypes('number').columns
+        sheets['Por Pessoa'] = by_person.round({col: 2 for col in numeric}).reset_index()
+        sheets['Pessoa x Mês'] = person_monthly_pivot(full_df).round(2).reset_index()
+        summary, daily, weeks = track_progress(full_df, required_hours, weekly_minimum)
+        numeric = summary.select_dtypes('number').columns
+        sheets['Cumprimento'] = summary.round({col: 2 for col in numeric}).reset_index()
+        sheets['Progresso Diário'] = daily.round({col: 2 for col in daily.select_dtypes('number').columns})
+        sheets['Semanas Abaixo do Mínimo'] = weeks[weeks['Abaixo do Mínimo']].drop(columns='Abaixo do Mínimo')
+    return sheets
+
+
+def _column_values(series):
+    """
+    Converte uma coluna (ou um trecho dela) em lista de valores Python.
+
+    Datas viram números de série do Excel (exibidos com DATE_FORMAT) e valores
+    ausentes viram None, que não são gravados.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        serial = (series.to_numpy(dtype='datetime64[ns]') - _EXCEL_EPOCH) / np.timedelta64(1, 'D')
+        values = serial.astype(object)
+        values[np.isnan(serial)] = None
+        return values.tolist()
+    if isinstance(series.dtype, pd.PeriodDtype):
+        series = series.astype(str)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        numbers = series.to_numpy(dtype=float, na_value=np.nan)
+        values = numbers.astype(object)
+        values[np.isnan(numbers)] = None
+        return values.tolist()
+    values = series.astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def _write_sheet(worksheet, df, date_format):
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    for c in range(df.shape[1]):
+        if pd.api.types.is_datetime64_any_dtype(df.iloc[:, c]):
+            # Formato da coluna vale para as células gravadas sem formato próprio
+            worksheet.set_column(c, c, 12, date_format)
+
+    # constant_memory exige gravar as linhas em ordem; cada linha vai para o disco assim que termina.
+    # Só WRITE_CHUNK_ROWS linhas viram valores Python de cada vez, não a aba inteira
+    write = worksheet.write
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        block = df.iloc[start:start + WRITE_CHUNK_ROWS]
+        columns = [_column_values(block.iloc[:, c]) for c in range(block.shape[1])]
+        for r, row in enumerate(zip(*columns), start=start + 1):
+            for c, value in enumerate(row):
+                if value is not None and value != '':
+                    write(r, c, value)
+
+
+@timed('exportacao.excel')
+def write_excel(sheets, output):
+    """
+    Grava as abas em output (caminho ou arquivo aberto em modo binário).
+
+    Usa o modo constant_memory do xlsxwriter: cada linha é descarregada em
+    arquivo temporário assim que gravada. As colunas viram valores Python em
+    trechos de WRITE_CHUNK_ROWS linhas, então a planilha nunca fica inteira
+    na memória além do DataFrame de origem.
+    """
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        # Texto do OCR/planilha é gravado como texto, nunca como fórmula ou link
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    try:
+        date_format = workbook.add_format({'num_format': DATE_FORMAT})
+        for sheet_name, df in sheets.items():
+            _write_sheet(workbook.add_worksheet(sheet_name), df, date_format)
+            count('exportacao.linhas', len(df))
+    finally:
+        workbook.close()
+
+
+def _table_path(base, sheet_name, ext):
+    slug = sheet_name.lower().replace(' ', '_')
+    return f"{base}_{slug}.{ext}"
+
+
+def write_tables(sheets, base, fmt):
+    """
+    Grava cada aba em um arquivo CSV ou Parquet (base_detalhes.csv, base_resumo.csv, ...).
+
+    Colunas de período (Semana) são gravadas como texto. Parquet exige o
+    pyarrow instalado. Retorna os caminhos gravados.
+    """
+    paths = []
+    for sheet_name, df in sheets.items():
+        period_cols = [col for col in df.columns if isinstance(df[col].dtype, pd.PeriodDtype)]
+        if period_cols:
+            df = df.assign(**{col: df[col].astype(str) for col in period_cols})
+        path = _table_path(base, sheet_name, fmt)
+        with stage(f'exportacao.{fmt}'):
+            if fmt == 'csv':
+                df.to_csv(path, index=False, date_format='%Y-%m-%d')
+            elif fmt == 'parquet':
+                df.to_parquet(path, index=False)
+            else:
+                raise ValueError(f"Formato desconhecido: {fmt}")
+        count('exportacao.linhas', len(df))
+        paths.append(path)
+    return paths
+
+
+def write_report(sheets, output, fmt='xlsx'):
+    """Grava o relatório no formato pedido; para csv/parquet output é o prefixo dos arquivos."""
+    if fmt == 'xlsx':
+        write_excel(sheets, output)
+        return [output]
+    base, ext = os.path.splitext(output)
+    return write_tables(sheets, base if ext else output, fmt)
@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime
 import openpyxl
 
+from calculo_horas import calculate_hours_vectorized
+
 def criar_excel_dados_fotos():
     """
     Extrai dados das fotos do formulário PSC e cria arquivo Excel
@@ -38,35 +40,8 @@ def criar_excel_dados_fotos():
     # Criar DataFrame
     df = pd.DataFrame(dados_formulario)
     
-    # Função para calcular horas trabalhadas
-    def calcular_horas_psc(row):
-        try:
-            if row['Entrada'] == 'Feriado' or row['Entrada'] == '':
-                return 0
-                
-            entrada = pd.to_datetime(row['Entrada'], format='%H:%M', errors='coerce')
-            saida = pd.to_datetime(row['Saída'], format='%H:%M', errors='coerce')
-            ini_intervalo = pd.to_datetime(row['Início Intervalo'], format='%H:%M', errors='coerce')
-            fim_intervalo = pd.to_datetime(row['Fim Intervalo'], format='%H:%M', errors='coerce')
-
-            if pd.isna(entrada) or pd.isna(saida):
-                return 0
-
-            # Calcular períodos de trabalho
-            if pd.notna(ini_intervalo) and pd.notna(fim_intervalo):
-                periodo1 = (ini_intervalo - entrada).total_seconds() / 3600  # Manhã
-                periodo2 = (saida - fim_intervalo).total_seconds() / 3600    # Tarde
-                horas_trabalhadas = periodo1 + periodo2
-            else:
-                # Se não há intervalo, calcula normalmente
-                horas_trabalhadas = (saida - entrada).total_seconds() / 3600
-
-            return max(0, round(horas_trabalhadas, 2))
-        except:
-            return 0
-    
     # Calcular horas trabalhadas
-    df['Horas/Dia'] = df.apply(calcular_horas_psc, axis=1)
+    df['Horas/Dia'] = calculate_hours_vectorized(df)
     
     # Converter datas
     df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
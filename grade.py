@@ -0,0 +1,329 @@
+"""
+Recorte da tabela de horários do formulário PSC antes do OCR.
+
+A foto inteira do formulário leva ao OCR o cabeçalho, os carimbos e as
+assinaturas, com datas e horários soltos que o leitor de texto confunde com os
+dias da tabela. Aqui a grade da tabela é encontrada na imagem binarizada e
+endireitada: as colunas de pixels com uma sequência escura longa são a régua
+vertical e dão a faixa da tabela; dentro dela, as linhas de pixels escuras de
+uma coluna da régua à outra são a régua horizontal. Com a grade:
+
+  - 'grade': só o retângulo da tabela vai para o OCR (menos bytes e menos
+    texto para reconhecer);
+  - 'celulas': cada célula vai separada para o OCR, em paralelo, e o texto de
+    cada linha da tabela é montado célula a célula, na ordem das colunas.
+
+Sem grade reconhecível (formulário sem régua, foto muito torta), a imagem
+inteira vai para o OCR, como no modo 'imagem'. O nome no cabeçalho fica fora
+da grade: nos modos com recorte a Pessoa é o nome do arquivo.
+"""
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import imagens
+import ocr
+from diagnostico import count, timed
+
+# Modos de envio ao OCR: imagem inteira, só a tabela ou célula a célula
+MODES = ('imagem', 'grade', 'celulas')
+
+# Maior lado (px) da cópia reduzida usada para achar a grade
+DETECT_SIDE = 1200
+
+# Vizinhança (px na cópia reduzida) e diferença mínima para a média dela na binarização
+BINARIZE_WINDOW = 31
+BINARIZE_OFFSET = 12
+
+# Inclinação máxima (graus) corrigida antes de procurar a régua, e o passo da busca
+MAX_SKEW = 4.0
+SKEW_STEP = 0.25
+
+# Sequência escura mínima de uma coluna da régua, em fração da altura da imagem
+# (a tabela costuma ocupar só parte da foto)
+MIN_COLUMN_FRACTION = 0.2
+
+# Sequência escura mínima, em fração da largura (ou altura) da tabela, para contar como linha da régua
+MIN_LINE_FRACTION = 0.5
+
+# Tolerância (px na cópia reduzida) para linhas levemente inclinadas ou falhadas
+LINE_TOLERANCE = 2
+
+# Distância máxima, em múltiplos do espaçamento das linhas da tabela, para juntar
+# à tabela uma horizontal de fora da faixa das colunas (tolera uma régua apagada
+# pela escrita no meio)
+ROW_SPACING_SLACK = 2.5
+
+# Largura mínima (px na cópia reduzida) de uma coluna da tabela
+MIN_CELL = 12
+
+# Mínimo de linhas horizontais e verticais para aceitar uma grade
+MIN_ROWS = 3
+MIN_COLUMNS = 3
+
+# Margem (px na imagem original) em volta da tabela recortada
+CROP_MARGIN = 8
+
+# Fração de cada célula descartada nas bordas, para a régua não entrar no OCR
+CELL_INSET = 0.08
+
+
+def _binarize(gray, window=BINARIZE_WINDOW, offset=BINARIZE_OFFSET):
+    """
+    Pixels escuros pelo limiar local: mais escuros que a média da vizinhança
+    (window x window) menos offset. Sombras e fundos escuros da foto não viram
+    blocos pretos, como aconteceria com um limiar único.
+    """
+    integral = np.pad(gray.astype(np.int64).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    h, w = gray.shape
+    r = window // 2
+    y0 = np.clip(np.arange(h) - r, 0, h)[:, None]
+    y1 = np.clip(np.arange(h) + r + 1, 0, h)[:, None]
+    x0 = np.clip(np.arange(w) - r, 0, w)[None, :]
+    x1 = np.clip(np.arange(w) + r + 1, 0, w)[None, :]
+    area = (y1 - y0) * (x1 - x0)
+    local_sum = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    return gray.astype(np.int64) * area < local_sum - offset * area
+
+
+def _skew_angle(dark):
+    """
+    Ângulo (graus) que deixa a régua horizontal: o que concentra mais os
+    pixels escuros em poucas linhas (maior variância do perfil horizontal).
+    Busca em passos de 1 grau e depois de SKEW_STEP em volta do melhor.
+    """
+    image = Image.fromarray(dark.astype(np.uint8) * 255)
+    scores = {}
+
+    def score(angle):
+        if angle not in scores:
+            profile = np.asarray(image.rotate(angle, resample=Image.NEAREST)).sum(axis=1, dtype=np.float64)
+            scores[angle] = profile.var()
+        return scores[angle]
+
+    best = max(np.arange(-MAX_SKEW, MAX_SKEW + 0.5, 1.0), key=score)
+    fine = np.arange(best - 1 + SKEW_STEP, best + 1, SKEW_STEP)
+    return float(max(fine[np.abs(fine) <= MAX_SKEW], key=score))
+
+
+def _spread(mask, axis, k):
+    """Estende os pixels escuros k posições nos dois sentidos do eixo (fecha falhas pequenas)."""
+    out = mask.copy()
+    for shift in range(1, k + 1):
+        if axis == 0:
+            out[shift:] |= mask[:-shift]
+            out[:-shift] |= mask[shift:]
+        else:
+            out[:, shift:] |= mask[:, :-shift]
+            out[:, :-shift] |= mask[:, shift:]
+    return out
+
+
+def _longest_runs(mask):
+    """
+    Maior sequência de True em cada linha de um array booleano 2D: (comprimentos,
+    inícios), com comprimento 0 nas linhas sem nenhum True.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    lengths = end_cols - start_cols
+    # Ordenado por linha e comprimento: a última sequência de cada linha é a maior
+    order = np.lexsort((lengths, start_rows))
+    rows = start_rows[order]
+    last = np.r_[rows[1:] != rows[:-1], True] if len(rows) else np.zeros(0, dtype=bool)
+    longest = np.zeros(mask.shape[0], dtype=np.int64)
+    starts = np.zeros(mask.shape[0], dtype=np.int64)
+    longest[rows[last]] = lengths[order][last]
+    starts[rows[last]] = start_cols[order][last]
+    return longest, starts
+
+
+def _line_positions(is_line):
+    """Centro de cada grupo de posições consecutivas marcadas como linha."""
+    positions = np.flatnonzero(is_line)
+    if not len(positions):
+        return positions
+    groups = np.split(positions, np.flatnonzero(np.diff(positions) > 1) + 1)
+    return np.array([int(group.mean()) for group in groups])
+
+
+def _runs(dark, tolerance=LINE_TOLERANCE):
+    """_longest_runs de cada linha de pixels, tolerando linhas levemente inclinadas ou falhadas."""
+    return _longest_runs(_spread(_spread(dark, 0, tolerance), 1, tolerance))
+
+
+def _extend_rows(candidates, inside):
+    """
+    Horizontais da tabela: as de dentro da faixa das colunas (índices inside em
+    candidates) mais as vizinhas acima e abaixo no mesmo espaçamento, que ficam
+    fora da faixa quando a escrita à mão interrompe as colunas da régua.
+    """
+    first, last = inside[0], inside[-1]
+    spacing = np.median(np.diff(candidates[first:last + 1]))
+    while first > 0 and candidates[first] - candidates[first - 1] <= ROW_SPACING_SLACK * spacing:
+        first -= 1
+    while last < len(candidates) - 1 and candidates[last + 1] - candidates[last] <= ROW_SPACING_SLACK * spacing:
+        last += 1
+    return candidates[first:last + 1]
+
+
+def _load(data):
+    image = Image.open(BytesIO(data))
+    if image.format == 'JPEG':
+        image.draft('L', (DETECT_SIDE, DETECT_SIDE))
+    return ImageOps.exif_transpose(image).convert('L')
+
+
+@timed('imagem.grade')
+def find_grid(data):
+    """
+    Grade da tabela: (ys, xs, ângulo), com as linhas da régua em pixels da
+    imagem original já endireitada por rotate(ângulo), ou None se a imagem não
+    tem uma grade reconhecível.
+    """
+    image = _load(data)
+    small = image.copy()
+    small.thumbnail((DETECT_SIDE, DETECT_SIDE))
+    dark = _binarize(np.asarray(small))
+    angle = _skew_angle(dark)
+    if angle:
+        dark = np.asarray(Image.fromarray(dark.astype(np.uint8) * 255).rotate(angle, resample=Image.NEAREST)) > 0
+
+    # As colunas da régua dão a faixa vertical da tabela: cabeçalho e rodapé
+    # ficam fora dela, mesmo com linhas de texto largas
+    longest, starts = _runs(dark.T)
+    columns = longest >= MIN_COLUMN_FRACTION * dark.shape[0]
+    if columns.sum() < MIN_COLUMNS:
+        count('imagem.sem_grade')
+        return None
+    top = int(np.median(starts[columns]))
+    bottom = int(np.median(starts[columns] + longest[columns]))
+    band = dark[top:bottom]
+    xs = _line_positions(_runs(band.T)[0] >= MIN_LINE_FRACTION * band.shape[0])
+    if len(xs) < MIN_COLUMNS:
+        count('imagem.sem_grade')
+        return None
+    # Só as horizontais que atravessam a tabela de uma coluna da régua à outra
+    table = dark[:, xs[0]:xs[-1] + 1]
+    candidates = _line_positions(_runs(table)[0] >= MIN_LINE_FRACTION * table.shape[1])
+    inside = (candidates >= top - LINE_TOLERANCE) & (candidates <= bottom + LINE_TOLERANCE)
+    if inside.sum() < MIN_ROWS:
+        count('imagem.sem_grade')
+        return None
+    ys = _extend_rows(candidates, np.flatnonzero(inside))
+    # A borda externa da tabela pode não ter régua vertical (fora do papel, dobra):
+    # as horizontais dizem onde a tabela começa e termina
+    covered = _spread(dark, 0, LINE_TOLERANCE)[ys].mean(axis=0) >= MIN_LINE_FRACTION
+    longest, starts = _runs(covered[None, :], MIN_CELL)
+    # (_runs estende as sequências MIN_CELL px para cada lado)
+    left, right = int(starts[0]) + MIN_CELL, int(starts[0] + longest[0]) - MIN_CELL
+    if left < xs[0] - MIN_CELL:
+        xs = np.r_[left, xs]
+    if right > xs[-1] + MIN_CELL:
+        xs = np.r_[xs, right]
+    # Régua dupla (linha grossa partida pela binarização) vira uma coluna só
+    xs = xs[np.r_[True, np.diff(xs) >= MIN_CELL]]
+    scale_y, scale_x = image.height / dark.shape[0], image.width / dark.shape[1]
+    return np.round(ys * scale_y).astype(int), np.round(xs * scale_x).astype(int), angle
+
+
+def _straightened(data, angle):
+    image = _load(data)
+    return image.rotate(angle, resample=Image.BICUBIC, fillcolor=255) if angle else image
+
+
+def _encode(image, source):
+    """Recorte no formato da imagem enviada: PNG continua PNG (texto nítido), foto vira JPEG."""
+    output = BytesIO()
+    if Image.open(BytesIO(source)).format == 'PNG':
+        image.save(output, format='PNG', optimize=True)
+    else:
+        image.save(output, format='JPEG', quality=imagens.JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def crop_to_grid(data, grid=None):
+    """Bytes (em tons de cinza) só com a tabela, ou os bytes originais se não há grade."""
+    grid = grid if grid is not None else find_grid(data)
+    if grid is None:
+        return data
+    ys, xs, angle = grid
+    image = _straightened(data, angle)
+    box = (
+        max(0, xs[0] - CROP_MARGIN), max(0, ys[0] - CROP_MARGIN),
+        min(image.width, xs[-1] + CROP_MARGIN), min(image.height, ys[-1] + CROP_MARGIN),
+    )
+    count('imagem.recortes')
+    return _encode(image.crop(box), data)
+
+
+def grid_cells(data, grid=None):
+    """
+    Células da tabela, linha a linha: lista de listas de bytes de imagem (uma por
+    coluna), ou None se a imagem não tem grade.
+    """
+    grid = grid if grid is not None else find_grid(data)
+    if grid is None:
+        return None
+    ys, xs, angle = grid
+    image = _straightened(data, angle)
+    rows = []
+    for top, bottom in zip(ys[:-1], ys[1:]):
+        inset_y = int((bottom - top) * CELL_INSET)
+        row = []
+        for left, right in zip(xs[:-1], xs[1:]):
+            inset_x = int((right - left) * CELL_INSET)
+            row.append(_encode(image.crop((left + inset_x, top + inset_y, right - inset_x, bottom - inset_y)), data))
+        rows.append(row)
+    count('imagem.celulas', sum(len(row) for row in rows))
+    return rows
+
+
+def _ocr_cells(data, backend):
+    """OCR célula a célula; cada linha da tabela vira uma linha de texto. Retorna (texto, erro)."""
+    rows = grid_cells(data)
+    if rows is None:
+        image_bytes, filename = imagens.prepare_image_bytes(data)
+        return ocr.ocr_many([image_bytes], filenames=[filename], backend=backend)[0]
+    cells = [cell for row in rows for cell in row]
+    results = ocr.ocr_many(cells, filenames=['celula.png'] * len(cells), backend=backend.for_cells())
+    errors = [error for _, error in results if error is not None]
+    if errors:
+        return '', errors[0]
+    texts = iter(' '.join(text.split()) for text, _ in results)
+    return '\n'.join(' '.join(next(texts) for _ in row).strip() for row in rows), None
+
+
+def cache_key(backend, content_hash, mode='imagem'):
+    """Chave do texto no cache_ocr: o recorte muda o texto, então cada modo tem a sua."""
+    key = backend.cache_key(content_hash)
+    return key if mode == 'imagem' else f"{key}-{mode}"
+
+
+def recognize_many(images, backend, mode='imagem', on_done=None):
+    """
+    OCR de várias imagens no modo pedido (MODES); retorna (texto, erro) de
+    cada uma, na ordem de images, como ocr.ocr_many.
+
+    Nos modos 'imagem' e 'grade' as imagens vão em paralelo para o OCR; no
+    modo 'celulas' uma imagem por vez, com as células dela em paralelo.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo de recorte desconhecido: {mode} (opções: {', '.join(MODES)})")
+    if mode == 'celulas':
+        results = []
+        for i, data in enumerate(images):
+            results.append(_ocr_cells(data, backend))
+            if on_done:
+                on_done(i, i + 1)
+        return results
+    if mode == 'grade':
+        images = [crop_to_grid(data) for data in images]
+    prepared = [imagens.prepare_image_bytes(data) for data in images]
+    return ocr.ocr_many(
+        [data for data, _ in prepared], filenames=[name for _, name in prepared], backend=backend, on_done=on_done
+    )
@@ -0,0 +1,239 @@
+"""
+Figuras Plotly do app.
+
+Para períodos longos o navegador não recebe um ponto por dia em todas as
+camadas: linhas constantes (média, moda) viram uma forma horizontal com um
+único valor, séries médias usam WebGL (go.Scattergl) em vez de uma barra SVG
+por dia e séries muito longas são agregadas por semana ou mês. O histograma é
+enviado já com as contagens por faixa.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from diagnostico import timed
+
+# Até este número de pontos o gráfico usa barras (SVG), uma por ponto
+BAR_LIMIT = 366
+
+# Até este número de pontos usa go.Scattergl (WebGL); acima, agrega por semana/mês
+WEBGL_LIMIT = 3000
+
+HISTOGRAM_BINS = 15
+
+_DATE_AXIS = dict(type='date', tickformat='%d/%m/%Y')
+
+
+def _reference_lines(fig, lines):
+    """
+    Linhas horizontais constantes (média, moda): uma forma com um único valor
+    cada, em vez de uma série com o mesmo valor repetido em todos os dias.
+
+    lines é uma lista de (y, rótulo, cor, traço).
+    """
+    fig.update_layout(
+        shapes=[
+            dict(type='line', xref='paper', x0=0, x1=1, yref='y', y0=y, y1=y,
+                 line=dict(color=color, dash=dash, width=2))
+            for y, _, color, dash in lines
+        ],
+        annotations=[
+            dict(xref='paper', x=0, yref='y', y=y, text=label, showarrow=False,
+                 xanchor='left', yanchor='bottom', font=dict(color=color))
+            for y, label, color, _ in lines
+        ],
+    )
+
+
+def _aggregate_daily(dates, hours):
+    """Média de horas por dia em cada semana (ou mês, se ainda forem pontos demais)."""
+    series = pd.Series(np.asarray(hours, dtype=float), index=pd.DatetimeIndex(dates))
+    for freq, label in (('W', 'semana'), ('MS', 'mês')):
+        grouped = series.resample(freq).mean().dropna()
+        if len(grouped) <= BAR_LIMIT:
+            break
+    return grouped, label
+
+
+@timed('graficos.diario')
+def daily_hours_figure(dates, hours, media_diaria, moda_diaria):
+    """Gráfico de horas trabalhadas por dia, com linhas de média e moda."""
+    fig = go.Figure()
+    n = len(hours)
+    if n <= BAR_LIMIT:
+        fig.add_trace(go.Bar(
+            x=dates.dt.strftime('%Y-%m-%d'),
+            y=hours,
+            name='Horas Trabalhadas',
+            marker_color='#00ffea',
+            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>Horas: %{y:.2f}h<extra></extra>'
+        ))
+        title = "Horas Trabalhadas por Dia"
+    elif n <= WEBGL_LIMIT:
+        fig.add_trace(go.Scattergl(
+            x=dates.dt.strftime('%Y-%m-%d'),
+            y=hours,
+            mode='markers',
+            name='Horas Trabalhadas',
+            marker=dict(color='#00ffea', size=4),
+            hovertemplate='<b>%{x|%d/%m/%Y}</b><br>Horas: %{y:.2f}h<extra></extra>'
+        ))
+        title = "Horas Trabalhadas por Dia"
+    else:
+        grouped, label = _aggregate_daily(dates, hours)
+        fig.add_trace(go.Bar(
+            x=grouped.index.strftime('%Y-%m-%d'),
+            y=grouped.values,
+            name=f'Média por dia na {label}',
+            marker_color='#00ffea',
+            hovertemplate=f'<b>{label.capitalize()} de %{{x|%d/%m/%Y}}</b><br>Média: %{{y:.2f}}h/dia<extra></extra>'
+        ))
+        title = f"Horas Trabalhadas por Dia (média por {label}, {n} dias)"
+
+    _reference_lines(fig, [
+        (media_diaria, f'Média Diária ({media_diaria:.2f}h)', 'magenta', 'dash'),
+        (moda_diaria, f'Moda ({moda_diaria:.2f}h)', 'yellow', 'dot'),
+    ])
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Data",
+        xaxis=_DATE_AXIS,
+        yaxis_title="Horas",
+        template="plotly_dark",
+        height=500,
+        showlegend=True
+    )
+    return fig
+
+
+@timed('graficos.histograma')
+def hours_histogram_figure(hours, media_diaria, moda_diaria, desvio_diario):
+    """Histograma das horas diárias, com média, moda e faixa de ±1 desvio padrão."""
+    values = np.asarray(hours, dtype=float)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS) if len(values) else (np.array([]), np.array([0.0]))
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    fig = go.Figure()
+    # Contagens já calculadas: o navegador recebe HISTOGRAM_BINS barras, não todos os dias
+    fig.add_trace(go.Bar(
+        x=centers,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]) if len(counts) else None,
+        name='Frequência',
+        marker_color='lime',
+        opacity=0.7,
+        hovertemplate='Horas: %{customdata[0]:.1f}-%{customdata[1]:.1f}<br>Frequência: %{y}<extra></extra>'
+    ))
+
+    # Média, moda e área de ±1 desvio padrão como formas do layout
+    shapes = [
+        dict(type='line', x0=media_diaria, x1=media_diaria, yref='paper', y0=0, y1=1,
+             line=dict(color='cyan', dash='dash')),
+        dict(type='line', x0=moda_diaria, x1=moda_diaria, yref='paper', y0=0, y1=1,
+             line=dict(color='yellow', dash='dot')),
+    ]
+    annotations = [
+        dict(x=media_diaria, yref='paper', y=1, text=f"Média: {media_diaria:.2f}h",
+             showarrow=False, yanchor='bottom'),
+        dict(x=moda_diaria, yref='paper', y=0, text=f"Moda: {moda_diaria:.2f}h",
+             showarrow=False, yanchor='top'),
+    ]
+    if pd.notna(desvio_diario):
+        shapes.append(dict(type='rect', x0=media_diaria - desvio_diario, x1=media_diaria + desvio_diario,
+                           yref='paper', y0=0, y1=1, fillcolor='orange', opacity=0.2, line_width=0, layer='below'))
+        annotations.append(dict(x=media_diaria + desvio_diario, yref='paper', y=1, text="±1 Desvio Padrão",
+                                showarrow=False, xanchor='right', yanchor='top'))
+
+    fig.update_layout(
+        title="Distribuição das Horas Trabalhadas",
+        xaxis_title="Horas por Dia",
+        yaxis_title="Frequência (Quantos Dias)",
+        template="plotly_dark",
+        height=500,
+        showlegend=False,
+        bargap=0,
+        shapes=shapes,
+        annotations=annotations
+    )
+    return fig
+
+
+@timed('graficos.semanal')
+def weekly_totals_figure(weekly_totals, media_semanal):
+    """Gráfico dos totais semanais, com a linha da média semanal."""
+    week_labels = [str(w) for w in weekly_totals.index]
+    fig = go.Figure()
+    if len(weekly_totals) <= BAR_LIMIT:
+        fig.add_trace(go.Bar(
+            x=week_labels,
+            y=weekly_totals.values,
+            name='Horas Semanais',
+            marker_color='#ffaa00',
+            hovertemplate='<b>Semana %{x}</b><br>Total: %{y:.2f}h<extra></extra>'
+        ))
+    else:
+        fig.add_trace(go.Scattergl(
+            x=week_labels,
+            y=weekly_totals.values,
+            mode='lines+markers',
+            name='Horas Semanais',
+            marker=dict(color='#ffaa00', size=4),
+            line=dict(color='#ffaa00', width=1),
+            hovertemplate='<b>Semana %{x}</b><br>Total: %{y:.2f}h<extra></extra>'
+        ))
+
+    _reference_lines(fig, [(media_semanal, f'Média Semanal ({media_semanal:.2f}h)', 'cyan', 'dash')])
+
+    fig.update_layout(
+        title="Horas Trabalhadas por Semana",
+        xaxis_title="Semana",
+        yaxis_title="Total de Horas",
+        template="plotly_dark",
+        height=500,
+        showlegend=True
+    )
+    return fig
+
+
+@timed('graficos.cumprimento')
+def progress_figure(daily, required_hours=0):
+    """
+    Horas acumuladas e dos últimos 7 dias de uma pessoa (diario de
+    cumprimento.track_progress), com a linha das horas exigidas.
+    """
+    dates = daily['Data'].dt.strftime('%Y-%m-%d')
+    # Uma linha por série: WebGL acima de BAR_LIMIT pontos
+    scatter = go.Scatter if len(daily) <= BAR_LIMIT else go.Scattergl
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=dates,
+        y=daily['Acumulado'],
+        mode='lines',
+        name='Acumulado',
+        line=dict(color='#00ffea', width=2),
+        hovertemplate='<b>%{x|%d/%m/%Y}</b><br>Acumulado: %{y:.2f}h<extra></extra>'
+    ))
+    fig.add_trace(scatter(
+        x=dates,
+        y=daily['Últimos 7 Dias'],
+        mode='lines',
+        name='Últimos 7 dias',
+        line=dict(color='#ffaa00', width=1),
+        hovertemplate='<b>%{x|%d/%m/%Y}</b><br>Últimos 7 dias: %{y:.2f}h<extra></extra>'
+    ))
+    if required_hours:
+        _reference_lines(fig, [(required_hours, f'Exigido ({required_hours:g}h)', 'magenta', 'dash')])
+
+    fig.update_layout(
+        title="Cumprimento das Horas",
+        xaxis_title="Data",
+        xaxis=_DATE_AXIS,
+        yaxis_title="Horas",
+        template="plotly_dark",
+        height=500,
+        showlegend=True
+    )
+    return fig
@@ -0,0 +1,64 @@
+"""
+Preparação das imagens enviadas antes do OCR e da pré-visualização.
+
+Uploads em JPEG ou PNG dentro dos limites vão para o OCR com os bytes
+originais, sem decodificar e recodificar. Só imagens grandes demais (em bytes
+ou em resolução) ou em outro formato são reduzidas e recomprimidas em JPEG.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from diagnostico import count, timed
+
+# Formatos aceitos pelo OCR.space sem conversão
+PASS_THROUGH_FORMATS = {'JPEG': 'jpg', 'PNG': 'png'}
+
+# Limite de tamanho do arquivo no plano gratuito do OCR.space
+MAX_OCR_BYTES = 1024 * 1024
+
+# Maior lado (px) enviado ao OCR; acima disso a imagem é reduzida
+MAX_OCR_SIDE = 2400
+
+JPEG_QUALITY = 85
+
+# Maior lado (px) da miniatura exibida no app
+THUMBNAIL_SIDE = 600
+
+
+@timed('imagem.preparo')
+def prepare_image_bytes(data, max_bytes=MAX_OCR_BYTES, max_side=MAX_OCR_SIDE):
+    """
+    Retorna (bytes, nome_arquivo) prontos para enviar ao OCR.
+
+    Só o cabeçalho da imagem é lido para decidir; a decodificação completa
+    acontece apenas quando é preciso reduzir ou converter.
+    """
+    count('imagem.bytes_recebidos', len(data))
+    with Image.open(BytesIO(data)) as image:
+        ext = PASS_THROUGH_FORMATS.get(image.format)
+        if ext and len(data) <= max_bytes and max(image.size) <= max_side:
+            return data, f"image.{ext}"
+
+        if image.format == 'JPEG':
+            # Decodifica direto em resolução reduzida quando possível
+            image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        count('imagem.recomprimidas')
+        return output.getvalue(), 'image.jpg'
+
+
+def make_thumbnail(data, side=THUMBNAIL_SIDE):
+    """Miniatura da imagem para pré-visualização, sem decodificar a resolução completa."""
+    image = Image.open(BytesIO(data))
+    if image.format == 'JPEG':
+        image.draft('RGB', (side, side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side))
+    return image
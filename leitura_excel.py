@@ -0,0 +1,354 @@
+"""
+Leitura das planilhas Excel de horários.
+
+A planilha é lida em modo somente leitura do openpyxl e percorrida em blocos de
+tamanho fixo; cada bloco é normalizado com operações vetorizadas do pandas nas
+linhas compactas de registros.py (dia, horários em minutos, situação e a
+Pessoa que preencheu o formulário). Assim o pico de memória não depende do
+tamanho do arquivo.
+
+Datas e horários vão para as linhas compactas como o openpyxl os entrega:
+células de data/hora nativas (datetime, time, frações do dia) são convertidas
+direto, sem passar por texto. Só as células de texto são interpretadas, com o
+formato de data detectado uma vez por coluna (detect_date_format) e reusado
+nos blocos seguintes.
+"""
+import hashlib
+import re
+import unicodedata
+import zipfile
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+
+from diagnostico import count, timed
+from registros import (
+    DATE_FORMAT, MISSING_MINUTES, detect_date_format, empty_records, is_holiday, make_punch_records, make_records,
+    punches_from_columns, time_to_minutes
+)
+
+# Linhas lidas da planilha por bloco
+CHUNK_SIZE = 5000
+
+# Mapear possíveis nomes de colunas
+COL_MAPPING = {
+    'data': ['data', 'date', 'dia'],
+    'entrada1': ['horário de entrada 1', 'entrada 1', 'entrada1', 'entry1'],
+    'saida1': ['horário de saída 1', 'saida 1', 'saida1', 'exit1'],
+    'entrada2': ['horário de entrada 2', 'entrada 2', 'entrada2', 'entry2'],
+    'saida2': ['horário de saída 2', 'saida 2', 'saida2', 'exit2'],
+    'entrada': ['entrada', 'entry', 'inicio', 'start'],
+    'saida': ['saida', 'exit', 'fim', 'end'],
+    'inicio_intervalo': ['inicio_intervalo', 'inicio intervalo', 'break_start', 'intervalo_inicio'],
+    'fim_intervalo': ['fim_intervalo', 'fim intervalo', 'break_end', 'intervalo_fim'],
+    # Opcional: planilhas com várias pessoas têm uma coluna com o nome de cada uma
+    'pessoa': ['pessoa', 'prestador', 'nome', 'colaborador', 'funcionario']
+}
+
+# Campos que não contam para reconhecer o modelo de planilha
+_OPTIONAL_FIELDS = ('pessoa',)
+
+# Colunas numeradas do modelo separado ('Horário de entrada 3', 'saida3', 'exit 3'...)
+_NUMBERED_PUNCH = re.compile(r'\b(entrada|entry|saida|exit)\s*(\d+)\s*$')
+
+
+def _fold(text):
+    """Minúsculas e sem acentos, para comparar nomes de colunas ('Saída' == 'saida')."""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _compile_mapping(mapping):
+    """Compila a tabela de apelidos em uma expressão regular por campo, na ordem de prioridade."""
+    return tuple(
+        (key, tuple(re.compile(re.escape(_fold(name))) for name in names))
+        for key, names in mapping.items()
+    )
+
+
+_COMPILED_MAPPING = _compile_mapping(COL_MAPPING)
+
+
+def header_signature(columns):
+    """Identificador curto do cabeçalho, igual para planilhas do mesmo modelo."""
+    return hashlib.sha1('\x1f'.join(str(c) for c in columns).encode('utf-8')).hexdigest()[:12]
+
+
+@lru_cache(maxsize=256)
+def _resolve_header(columns):
+    folded = [_fold(col) for col in columns]
+    found_cols = {}
+    for key, patterns in _COMPILED_MAPPING:
+        # Os apelidos são testados em ordem; o primeiro que aparece em alguma coluna vence
+        for pattern in patterns:
+            col = next((c for c, f in zip(columns, folded) if pattern.search(f)), None)
+            if col is not None:
+                found_cols[key] = col
+                break
+
+    # Verificar se é o formato com pares numerados (entrada1, saida1, entrada2, saida2...)
+    if 'entrada1' in found_cols and 'saida2' in found_cols:
+        found_cols['pares'] = _numbered_pairs(columns, folded, found_cols)
+        return 'separado', found_cols
+
+    # Formato tradicional
+    # Se não encontrar as colunas esperadas, assumir ordem padrão
+    if len([key for key in found_cols if key not in _OPTIONAL_FIELDS]) < 3:  # Pelo menos Data, Entrada e Saída
+        cols = list(columns)
+        if len(cols) >= 3:
+            found_cols = {
+                'data': cols[0] if len(cols) > 4 else None,
+                'entrada': cols[0] if len(cols) <= 4 else cols[1],
+                'saida': cols[-1],  # Última coluna como saída
+                'pessoa': found_cols.get('pessoa'),
+            }
+            if len(cols) >= 5:
+                found_cols['inicio_intervalo'] = cols[2]
+                found_cols['fim_intervalo'] = cols[3]
+            return 'posicional', found_cols
+    return 'tradicional', found_cols
+
+
+def _numbered_pairs(columns, folded, found_cols):
+    """
+    Pares (entrada N, saída N) do modelo separado, em ordem de N; None onde
+    falta a coluna. Os pares 1 e 2 são os de COL_MAPPING.
+    """
+    numbered = {
+        1: [found_cols.get('entrada1'), found_cols.get('saida1')],
+        2: [found_cols.get('entrada2'), found_cols.get('saida2')],
+    }
+    for col, name in zip(columns, folded):
+        match = _NUMBERED_PUNCH.search(name)
+        if match and int(match.group(2)) > 2:
+            side = 0 if match.group(1) in ('entrada', 'entry') else 1
+            numbered.setdefault(int(match.group(2)), [None, None])[side] = col
+    return tuple(tuple(numbered[n]) for n in sorted(numbered))
+
+
+def resolve_columns(columns):
+    """
+    Encontra as colunas da planilha que correspondem a cada campo de COL_MAPPING.
+
+    Retorna (modelo, colunas), onde modelo é 'separado' (Entrada1/Saída1/
+    Entrada2/Saída2..., com os pares numerados em colunas['pares']), 'tradicional' (Data/Entrada/Intervalo/Saída) ou
+    'posicional' (colunas assumidas pela ordem). O resultado fica em cache por
+    cabeçalho, então lotes de planilhas do mesmo modelo resolvem em tempo
+    constante.
+    """
+    layout, found_cols = _resolve_header(tuple(columns))
+    return layout, dict(found_cols)
+
+
+def _header_names(header):
+    """Nomes das colunas no mesmo padrão do pd.read_excel (vazias viram 'Unnamed: i')."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_excel_chunks(excel_file, chunk_size=CHUNK_SIZE):
+    """
+    Lê a primeira aba da planilha e gera DataFrames de até chunk_size linhas,
+    com as colunas do cabeçalho original.
+
+    Arquivos que o openpyxl não abre (.xls) são lidos com pd.read_excel e
+    divididos nos mesmos blocos.
+    """
+    try:
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile):
+        # Pelo caminho, o openpyxl recusa a extensão .xls (InvalidFileException);
+        # um upload (BytesIO) não tem extensão e falha ao abrir como zip
+        if hasattr(excel_file, 'seek'):
+            excel_file.seek(0)
+        df = pd.read_excel(excel_file)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        start = 0
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                break
+            chunk = pd.DataFrame.from_records(block, columns=columns, coerce_float=False)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def _cells(chunk, col, strip=False):
+    """
+    Coluna com os valores das células como vieram da planilha (datetime, time,
+    números ou texto); células vazias viram None.
+    """
+    if col is None or col not in chunk.columns:
+        return pd.Series(None, index=chunk.index, dtype=object)
+    values = chunk[col]
+    if values.dtype != object and not pd.api.types.is_string_dtype(values):
+        # Coluna tipada (datetime64, float): vazias já são NaT/NaN
+        return values
+    values = values.astype(object)
+    if strip and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'mixed', 'mixed-integer'):
+        # .str devolve NaN nas células que não são texto; essas ficam como estão
+        stripped = values.str.strip()
+        values = stripped.where(stripped.notna(), values)
+    return values.where(values.notna() & (values != ''), None)
+
+
+def _as_text(chunk, col, strip=False):
+    """Coluna como texto; células vazias viram ''."""
+    if col is None or col not in chunk.columns:
+        return pd.Series('', index=chunk.index, dtype=object)
+    values = chunk[col].astype(object)
+    text = values.where(values.notna(), '').astype(str)
+    if strip:
+        text = text.str.strip()
+    return text.where(text != 'nan', '')
+
+
+def _placeholder_dates(index):
+    """Data fictícia (linha + 1 em dezembro/2024) para planilhas sem coluna de data."""
+    days = np.char.zfill((np.asarray(index) + 1).astype(str), 2)
+    return pd.Series(days, index=index, dtype=object) + '/12/2024'
+
+
+def _person(chunk, found_cols, person):
+    """Coluna Pessoa: o nome na planilha, ou person nas linhas sem nome."""
+    names = _as_text(chunk, found_cols.get('pessoa'), strip=True)
+    if person:
+        names = names.where(names != '', person)
+    return names
+
+
+def normalize_chunk(chunk, layout, found_cols, person=None, date_formats=None):
+    """
+    Converte um bloco da planilha nas linhas compactas de registros.py,
+    descartando linhas sem Entrada/Saída (exceto as de feriado). No modelo
+    separado, todos os pares numerados entram nas horas; ficam as linhas com
+    pelo menos duas batidas.
+
+    person identifica quem preencheu o formulário quando a planilha não tem
+    coluna de nome (ex.: o nome do arquivo). date_formats guarda o formato de
+    data detectado por coluna entre os blocos da mesma planilha.
+    """
+    pessoa = _person(chunk, found_cols, person)
+    data, date_format = _dates(chunk, found_cols, date_formats)
+    if layout == 'separado':
+        return _normalize_pairs(chunk, found_cols['pares'], data, pessoa, date_format)
+
+    entrada = _cells(chunk, found_cols.get('entrada'))
+    saida = _cells(chunk, found_cols.get('saida'))
+    inicio_intervalo = _cells(chunk, found_cols.get('inicio_intervalo'))
+    fim_intervalo = _cells(chunk, found_cols.get('fim_intervalo'))
+
+    # Validar se a linha tem dados válidos; "Feriado" na Entrada fica, com a situação de feriado
+    holiday = is_holiday(entrada)
+    keep = (entrada.notna() & saida.notna()).to_numpy() | holiday
+    return make_records(
+        data[keep], entrada[keep], inicio_intervalo[keep], fim_intervalo[keep], saida[keep],
+        pessoa[keep], holiday[keep], date_format or DATE_FORMAT
+    )
+
+
+def _normalize_pairs(chunk, pairs, data, pessoa, date_format):
+    """
+    Modelo separado: as batidas de todos os pares numerados, em ordem
+    (Entrada 1, Saída 1, Entrada 2...). Ficam as linhas com pelo menos duas
+    células preenchidas; uma linha com um par pela metade (entrada sem saída
+    ou saída sem entrada) fica 'invalido', em vez de juntar as células que
+    sobram em pares que não existem.
+    """
+    cells = [_cells(chunk, col, strip=True) for pair in pairs for col in pair]
+    holiday = is_holiday(cells[0])
+    minutes = [time_to_minutes(col) for col in cells]
+    present = np.sum([col.notna().to_numpy() for col in cells], axis=0)
+    keep = (present >= 2) | holiday
+    # Par completo: entrada e saída legíveis, ou as duas em branco
+    readable = np.array([col != MISSING_MINUTES for col in minutes]).reshape(len(minutes), len(chunk))
+    complete = (readable[0::2] == readable[1::2]).all(axis=0)
+    return make_punch_records(
+        data[keep], punches_from_columns([col[keep] for col in minutes]),
+        pessoa[keep], holiday[keep], date_format or DATE_FORMAT, complete[keep]
+    )
+
+
+def _dates(chunk, found_cols, date_formats):
+    """Coluna de datas e o formato das datas em texto; sem coluna de data, as datas fictícias."""
+    if not found_cols.get('data'):
+        return _placeholder_dates(chunk.index), None
+    data = _cells(chunk, found_cols['data'])
+    return data, _date_format(data, found_cols['data'], date_formats)
+
+
+def _date_format(data, col, date_formats):
+    """Formato das datas em texto da coluna, detectado no primeiro bloco que tem texto."""
+    if data.dtype != object:
+        return None
+    if date_formats is None:
+        return detect_date_format(data)
+    if date_formats.get(col) is None:
+        date_formats[col] = detect_date_format(data)
+    return date_formats[col]
+
+
+def iter_normalized_chunks(excel_file, chunk_size=CHUNK_SIZE, person=None):
+    """Gera os blocos da planilha já convertidos nas linhas compactas."""
+    layout = found_cols = None
+    date_formats = {}
+    for chunk in iter_excel_chunks(excel_file, chunk_size):
+        if found_cols is None:
+            layout, found_cols = resolve_columns(chunk.columns)
+        yield normalize_chunk(chunk, layout, found_cols, person, date_formats)
+
+
+@timed('excel.leitura')
+def process_excel_file(excel_file, chunk_size=CHUNK_SIZE, person=None):
+    """
+    Processa um arquivo Excel e extrai os dados de horário nas linhas compactas
+    de registros.py (Dia, horários em minutos, Situação e Pessoa).
+
+    A coluna Pessoa vem da coluna de nome da planilha, se houver; nas linhas
+    sem nome, recebe person.
+    """
+    chunks = []
+    layout = signature = None
+    date_formats = {}
+    for chunk in iter_excel_chunks(excel_file, chunk_size):
+        if layout is None:
+            layout, found_cols = resolve_columns(chunk.columns)
+            signature = header_signature(chunk.columns)
+        chunks.append(normalize_chunk(chunk, layout, found_cols, person, date_formats))
+
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+        # Blocos com pessoas diferentes voltam do concat como texto
+        df['Pessoa'] = df['Pessoa'].astype('category')
+    else:
+        df = empty_records()
+    count('excel.linhas', len(df))
+    # Modelo de planilha reconhecido, para exibição
+    df.attrs['modelo'] = layout
+    df.attrs['assinatura'] = signature
+    return df
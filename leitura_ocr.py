@@ -0,0 +1,158 @@
+"""
+Interpretação do texto devolvido pelo OCR.
+
+O texto é percorrido uma única vez por um tokenizador pré-compilado que emite
+datas e horários na ordem em que aparecem. Cada horário fica com a data que o
+precede, então um dia com horário faltando é reportado sem deslocar os
+horários dos dias seguintes. Um dia pode ter qualquer número par de horários
+(pares de entrada e saída, inclusive turnos que passam da meia-noite), que
+vão para as batidas irregulares de registros.py. O nome de quem preencheu o
+formulário, quando aparece no cabeçalho ("Nome: ..."), vai para a coluna
+Pessoa. Os dias saem nas linhas compactas de registros.py; um dia marcado
+"Feriado" sem horários vira uma linha com a situação de feriado.
+"""
+import re
+
+import numpy as np
+
+from diagnostico import count, timed
+from registros import (
+    make_punch_records, make_records, ordered_days, punches_from_counts, select_days, time_to_minutes
+)
+
+# Datas (dd/mm/aaaa) e horários (hh:mm) em uma única expressão, com o prefixo
+# comum fatorado para o motor de regex não testar as duas alternativas do zero,
+# e a palavra "Feriado"
+TOKEN_RE = re.compile(r'\d{1,2}(?:/\d{1,2}/\d{4}|:\d{2})|(?i:feriado)')
+
+# Linha de cabeçalho com o nome da pessoa ("Nome: Fulano", "Prestador - Fulano")
+NAME_RE = re.compile(r'^[ \t]*(?:nome|prestador|pessoa)\b[^:\-\n]{0,30}[:\-][ \t]*(\S[^\n]*?)[ \t]*$', re.IGNORECASE | re.MULTILINE)
+
+# Horários por dia na leitura por coluna: Entrada, Início Intervalo, Fim Intervalo, Saída
+TIMES_PER_DAY = 4
+
+# Palavra (duas letras ou mais) na linha de uma data: 'Emitido em 30/11/2024' é do cabeçalho
+LABEL_RE = re.compile(r'[^\W\d_]{2,}')
+
+
+def tokenize(text):
+    """Lista de datas, horários e feriados na ordem do texto (datas são os tokens com '/')."""
+    return TOKEN_RE.findall(text)
+
+
+def _labelled(text, start, end):
+    """Se a linha do token text[start:end] tem palavras além dele."""
+    line_end = text.find('\n', end)
+    line = text[text.rfind('\n', 0, start) + 1:start] + text[end:line_end if line_end >= 0 else len(text)]
+    return LABEL_RE.search(line) is not None
+
+
+def find_person(text):
+    """Nome da pessoa no cabeçalho do formulário, ou None."""
+    match = NAME_RE.search(text)
+    return match.group(1) if match else None
+
+
+def _records(rows, person):
+    """Linhas compactas a partir de tuplas (data, entrada, início, fim, saída, feriado)."""
+    columns = list(zip(*rows)) or [()] * 6
+    return make_records(*columns[:5], pessoa=person, holiday=list(columns[5]))
+
+
+def _parse_by_position(dates, times, person, labelled):
+    """
+    Pareamento antigo: o texto tem todas as datas e depois todos os horários
+    (leitura por coluna), TIMES_PER_DAY horários por data.
+
+    Datas a mais que os dias com horários, quando estão numa linha com
+    palavras (labelled, ex.: 'Emitido em 30/11/2024'), são do cabeçalho: ficam
+    de fora do pareamento, para não deslocar os dias da tabela.
+    """
+    days_with_times = -(-len(times) // TIMES_PER_DAY)  # divisão arredondada para cima
+    surplus = max(len(dates) - days_with_times, 0)
+    header = set([i for i, label in enumerate(labelled) if label][:surplus])
+    malformed = [{'Data': dates[i], 'Horários': [], 'Motivo': 'data fora da tabela'} for i in sorted(header)]
+    dates = [date for i, date in enumerate(dates) if i not in header]
+    rows = []
+    for i, date in enumerate(dates):
+        day_times = times[i * TIMES_PER_DAY:(i + 1) * TIMES_PER_DAY]
+        if len(day_times) == TIMES_PER_DAY:
+            rows.append((date, *day_times, False))
+        else:
+            malformed.append({'Data': date, 'Horários': day_times, 'Motivo': 'horários insuficientes'})
+    return _records(rows, person), malformed
+
+
+@timed('ocr.interpretacao')
+def parse_time_data_report(text, person=None):
+    """
+    Extrai os dias do texto do OCR.
+
+    Retorna (data, malformed): data são as linhas compactas dos dias
+    (registros.py) e malformed lista os dias descartados, com os horários
+    encontrados e o motivo.
+    A Pessoa de cada dia é o nome do cabeçalho do formulário ou, sem ele, person.
+    """
+    person = find_person(text) or person or ''
+    days = []  # [data, [horários], feriado]
+    dates = []
+    times = []
+    times_after_last_date = 0
+    current = None
+    for token in tokenize(text):
+        if '/' in token:
+            current = [token, [], False]
+            days.append(current)
+            dates.append(token)
+            times_after_last_date = 0
+        elif ':' not in token:
+            if current is not None:
+                current[2] = True
+        else:
+            times.append(token)
+            if current is not None:
+                current[1].append(token)
+                times_after_last_date += 1
+
+    # OCR que lê a tabela por colunas: todas as datas primeiro, todos os horários no fim
+    if len(dates) > 1 and times and times_after_last_date == len(times) > TIMES_PER_DAY:
+        labelled = [_labelled(text, *match.span()) for match in TOKEN_RE.finditer(text) if '/' in match.group()]
+        data, malformed = _parse_by_position(dates, times, person, labelled)
+        count('ocr.dias_descartados', len(malformed))
+        return data, malformed
+
+    # Pares de entrada e saída: 2 (sem intervalo), 4, 6...
+    reasons = [
+        f"{len(day_times)} horário(s): esperados pares de entrada e saída"
+        if len(day_times) % 2 or not (day_times or holiday) else None
+        for _, day_times, holiday in days
+    ]
+    paired = [day_times for (_, day_times, _), reason in zip(days, reasons) if reason is None]
+    punches = punches_from_counts(time_to_minutes([t for day_times in paired for t in day_times]),
+                                  [len(day_times) for day_times in paired])
+    # A mesma verificação das planilhas (registros.ordered_days): batidas que
+    # voltam no relógio mais de uma vez, ou que viram a meia-noite e passam de
+    # MAX_OVERNIGHT_MINUTES, são de dois dias juntos (a data do dia seguinte
+    # não foi lida) ou foram mal lidas
+    ordered = ordered_days(punches)
+
+    kept_dates = []
+    holidays = []
+    malformed = []
+    in_order = iter(ordered)
+    for (date, day_times, holiday), reason in zip(days, reasons):
+        if reason is None and not next(in_order):
+            reason = f"{len(day_times)} horário(s) fora de ordem"
+        if reason:
+            malformed.append({'Data': date, 'Horários': day_times, 'Motivo': reason})
+        else:
+            kept_dates.append(date)
+            holidays.append(holiday and not day_times)
+    count('ocr.dias_descartados', len(malformed))
+    records = make_punch_records(kept_dates, select_days(punches, ordered), person, np.array(holidays, dtype=bool))
+    return records, malformed
+
+
+def parse_time_data(text, person=None):
+    """Extrai os dias do texto do OCR (apenas os dias válidos)."""
+    return parse_time_data_report(text, person)[0]
@@ -0,0 +1,200 @@
+"""
+Leitura de várias planilhas Excel em paralelo, com um pool de processos.
+
+A leitura pelo openpyxl usa só CPU e segura o GIL, então threads não ajudam:
+cada planilha é lida e tem as horas calculadas em um processo do pool. Para
+a volta ser barata, o processo devolve os arrays das linhas compactas
+(registros.py) em vez de um DataFrame: dias int32, horários e Minutos em
+int16, os códigos da Situação e da Pessoa e as horas em float64. O processo principal remonta
+os mesmos (df, dated) que hours_frames devolveria.
+
+O pool é criado uma vez por processo e reaproveitado entre os reruns do
+Streamlit. Em POSIX os processos saem de um forkserver que já importou o
+pandas e o openpyxl, em vez de um fork do servidor do Streamlit (que tem
+várias threads). As planilhas já lidas ficam em uma LRU em memória pelo
+conteúdo do arquivo.
+"""
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import diagnostico
+from cache_ocr import content_key
+from calculo_horas import dated_frame, hours_frames
+from leitura_excel import process_excel_file
+from registros import STATUS_DTYPE, TIME_COLUMNS
+
+# Processos no pool (padrão: núcleos da máquina)
+MAX_WORKERS = os.cpu_count() or 1
+
+# Com menos planilhas que isso (ou com um só núcleo) a leitura é feita no próprio processo
+MIN_FILES_FOR_POOL = 2
+
+# Planilhas lidas mantidas em memória
+MAX_CACHED_FILES = 512
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def pack_frames(df):
+    """Converte a saída de hours_frames nos arrays compactos enviados entre processos."""
+    return {
+        'days': df['Dia'].to_numpy(),
+        'times': [df[col].to_numpy() for col in TIME_COLUMNS],
+        'worked': df['Minutos'].to_numpy(),
+        'status': df['Situação'].cat.codes.to_numpy(),
+        'person_codes': df['Pessoa'].cat.codes.to_numpy(),
+        'people': df['Pessoa'].cat.categories,
+        'hours': df['Horas/Dia'].to_numpy(dtype=np.float64),
+        'attrs': dict(df.attrs),
+    }
+
+
+def unpack_frames(packed):
+    """Remonta (df, dated) a partir de pack_frames."""
+    df = pd.DataFrame({
+        'Dia': packed['days'],
+        **dict(zip(TIME_COLUMNS, packed['times'])),
+        'Minutos': packed['worked'],
+        'Situação': pd.Categorical.from_codes(packed['status'], dtype=STATUS_DTYPE),
+        'Pessoa': pd.Categorical.from_codes(packed['person_codes'], categories=packed['people']),
+        'Horas/Dia': packed['hours'],
+    })
+    df.attrs.update(packed['attrs'])
+    return df, dated_frame(df)
+
+
+def parse_packed(data, person):
+    """
+    Lê uma planilha e calcula as horas; roda nos processos do pool.
+
+    Retorna (arrays compactos, erro, diagnóstico): erros viram texto em vez de
+    exceção, para uma planilha com problema não interromper as outras.
+    """
+    with diagnostico.collecting() as diag:
+        try:
+            raw_data = process_excel_file(BytesIO(data), person=person)
+            df, _ = hours_frames(raw_data)
+            df.attrs.update(raw_data.attrs)
+            packed, error = pack_frames(df), None
+        except Exception as e:
+            packed, error = None, f"{type(e).__name__}: {e}"
+    return packed, error, diag.to_dict()
+
+
+def _context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # O forkserver importa este módulo (pandas, openpyxl) uma vez; cada processo é um fork dele
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def get_pool():
+    """Pool de processos compartilhado, criado na primeira leitura em paralelo."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_context())
+        return _pool
+
+
+def _discard_pool(pool):
+    """Descarta um pool quebrado (processo morto) para o próximo uso criar outro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _cached(key):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def _remember(key, frames):
+    with _cache_lock:
+        _cache[key] = frames
+        while len(_cache) > MAX_CACHED_FILES:
+            _cache.popitem(last=False)
+
+
+def parse_many(files, on_done=None):
+    """
+    Lê várias planilhas em paralelo e calcula as horas de cada uma.
+
+    files é uma lista de (bytes, pessoa), em que pessoa identifica quem
+    preencheu a planilha quando ela não tem coluna de nome. Retorna uma lista
+    de tuplas (df, dated, erro) na mesma ordem; erro é None quando a leitura
+    deu certo, e df/dated são None quando não deu. on_done(i, n) é chamado na
+    thread de quem chamou sempre que uma planilha termina, como em
+    ocr.ocr_many. Os tempos medidos nos processos entram no coletor de
+    diagnóstico ativo.
+    """
+    results = [None] * len(files)
+    keys = [f"{content_key(data)}:{person}" for data, person in files]
+    pending = []
+    for i, key in enumerate(keys):
+        frames = _cached(key)
+        if frames is None:
+            pending.append(i)
+        else:
+            results[i] = (*frames, None)
+    done = len(files) - len(pending)
+    diagnostico.count('excel.cache_acertos', done)
+    if on_done:
+        for i in range(len(files)):
+            if results[i] is not None:
+                on_done(i, done)
+
+    if len(pending) < MIN_FILES_FOR_POOL or MAX_WORKERS < 2:
+        outcomes = ((i, parse_packed(*files[i])) for i in pending)
+    else:
+        outcomes = _pool_outcomes(files, pending)
+
+    diagnostics = diagnostico.current()
+    for i, (packed, error, diag) in outcomes:
+        if diagnostics is not None:
+            diagnostics.merge(diag)
+        if error is None:
+            frames = unpack_frames(packed)
+            _remember(keys[i], frames)
+            results[i] = (*frames, None)
+        else:
+            results[i] = (None, None, error)
+        done += 1
+        if on_done:
+            on_done(i, done)
+    return results
+
+
+def _pool_outcomes(files, pending):
+    """Gera (índice, resultado de parse_packed) na ordem em que as planilhas terminam."""
+    pool = get_pool()
+    futures = {pool.submit(parse_packed, *files[i]): i for i in pending}
+    diagnostico.count('excel.processos', len(futures))
+    broken = False
+    for future in as_completed(futures):
+        try:
+            outcome = future.result()
+        except BrokenProcessPool as e:
+            broken = True
+            outcome = (None, f"{type(e).__name__}: processo de leitura encerrado inesperadamente", {})
+        yield futures[future], outcome
+    if broken:
+        _discard_pool(pool)
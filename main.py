@@ -1,233 +1,418 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import requests
-from PIL import Image
-import re
-import matplotlib.pyplot as plt
-import seaborn as sns
 from io import BytesIO
-import xlsxwriter
-import openpyxl
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from scipy import stats
+
+import cache_ocr
+import diagnostico
+from agregacao import IncrementalAggregator, person_monthly_pivot, person_stats
+from armazenamento import get_store
+from calculo_horas import default_person, hours_frames
+from cumprimento import WEEKLY_MINIMUM, track_progress
+from leitura_ocr import parse_time_data_report
+from registros import display_frame
+
+# Módulos que puxam dependências pesadas (requests, PIL, openpyxl, xlsxwriter, plotly)
+# são importados só quando usados, para a primeira tela abrir rápido.
 
 OCR_SPACE_API_KEY = ''  # Se tiver, coloque aqui. Se não, deixe vazio.
+OCR_BACKEND = ''  # 'ocrspace', 'tesseract' (local) ou 'demo'. Vazio = OCR.space com a chave, demonstração sem ela.
+OCR_RECORTE = 'imagem'  # 'imagem' (foto inteira), 'grade' (só a tabela) ou 'celulas' (célula a célula). Com recorte, Pessoa = nome do arquivo.
+OCR_CACHE_DIR = ''  # Pasta para guardar o cache do OCR em disco. Vazio = cache só em memória.
+TIMESHEET_DB = 'horas_psc.sqlite3'  # Base local com os arquivos já processados. Vazio = não guarda.
+JOB_POLL_SECONDS = 1  # Intervalo de atualização do progresso das tarefas em segundo plano
+PSC_HORAS_EXIGIDAS = 0  # Horas de PSC a cumprir por pessoa (valor inicial da barra lateral). 0 = sem previsão de término.
 
-# Layout e título cyberpunk
-st.set_page_config(layout="wide", page_title=" Cálculo Horas", page_icon="🕶️")
-
-# Estilo cyberpunk (usando HTML e CSS simples)
-st.markdown("""
-    <style>
-    html, body, [class*="css"] {
-        background-color: #0f0f0f !important;
-        color: #00ffea !important;
-        font-family: 'Courier New', monospace;
-    }
-    .stButton>button {
-        background-color: #440099;
-        color: white;
-        border-radius: 10px;
-    }
-    .stDownloadButton>button {
-        background-color: #008080;
-        color: white;
-    }
-    .css-1offfwp {
-        background-color: #1a1a1a !important;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-def ocr_space_api(image_bytes):
-    """Envia a imagem para OCR.space e retorna o texto extraído."""
-    if not OCR_SPACE_API_KEY:
-        # Retorna dados de exemplo para demonstração
-        return """
-        04/12/2024
-        08:00 12:00 13:00 17:00
-        05/12/2024  
-        08:30 12:00 13:00 17:30
-        06/12/2024
-        09:00 12:00 13:00 18:00
-        """
-    
-    try:
-        payload = {
-            'isOverlayRequired': False,
-            'apikey': OCR_SPACE_API_KEY,
-            'language': 'por',
+def setup_page():
+    """Configura a página; precisa ser o primeiro comando do Streamlit em cada execução."""
+    # Layout e título cyberpunk
+    st.set_page_config(layout="wide", page_title=" Cálculo Horas", page_icon="🕶️")
+
+    # Estilo cyberpunk (usando HTML e CSS simples)
+    st.markdown("""
+        <style>
+        html, body, [class*="css"] {
+            background-color: #0f0f0f !important;
+            color: #00ffea !important;
+            font-family: 'Courier New', monospace;
         }
-        files = {
-            'file': ('image.png', image_bytes),
+        .stButton>button {
+            background-color: #440099;
+            color: white;
+            border-radius: 10px;
         }
-        response = requests.post('https://api.ocr.space/parse/image', data=payload, files=files)
-        result = response.json()
-        if result['IsErroredOnProcessing']:
-            return ''
-        parsed_results = result.get("ParsedResults")
-        if parsed_results:
-            return parsed_results[0]['ParsedText']
-        return ''
-    except Exception as e:
-        st.error(f"Erro no OCR: {str(e)}")
-        return ''
-
-def extract_data_from_image(image):
-    img_byte_arr = BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    img_bytes = img_byte_arr.getvalue()
-    text = ocr_space_api(img_bytes)
-    return text
-
-def parse_time_data(text):
-    date_pattern = r'\d{1,2}/\d{1,2}/\d{4}'
-    time_pattern = r'\d{1,2}:\d{2}'
-
-    dates = re.findall(date_pattern, text)
-    times = re.findall(time_pattern, text)
-
-    data = []
-    for i in range(0, len(dates)):
-        if i * 4 + 3 < len(times):
-            entry = {
-                'Data': dates[i],
-                'Entrada': times[i*4],
-                'Início Intervalo': times[i*4+1],
-                'Fim Intervalo': times[i*4+2],
-                'Saída': times[i*4+3]
-            }
-            data.append(entry)
-    return data
-
-def calculate_hours(row):
-    try:
-        entrada = pd.to_datetime(row['Entrada'], format='%H:%M', errors='coerce')
-        saida = pd.to_datetime(row['Saída'], format='%H:%M', errors='coerce')
-        ini_intervalo = pd.to_datetime(row['Início Intervalo'], format='%H:%M', errors='coerce')
-        fim_intervalo = pd.to_datetime(row['Fim Intervalo'], format='%H:%M', errors='coerce')
+        .stDownloadButton>button {
+            background-color: #008080;
+            color: white;
+        }
+        .css-1offfwp {
+            background-color: #1a1a1a !important;
+        }
+        </style>
+    """, unsafe_allow_html=True)
 
-        if pd.isna(entrada) or pd.isna(saida):
-            return 0
+def extract_data_from_images(uploaded_files, on_done=None):
+    """
+    Executa o OCR de várias imagens em paralelo e retorna os textos na ordem do upload.
 
-        # Horas trabalhadas = (Horário de saída1 - Horário de entrada1) + (Horário de saída2 - Horário de entrada2) - (hora fim do intervalo - hora inicio do intervalo)
-        # Saída1 = Início do Intervalo, Entrada1 = Entrada
-        # Saída2 = Saída, Entrada2 = Fim do Intervalo
-        
-        if pd.notna(ini_intervalo) and pd.notna(fim_intervalo):
-            periodo1 = (ini_intervalo - entrada).total_seconds() / 3600  # Manhã
-            periodo2 = (saida - fim_intervalo).total_seconds() / 3600    # Tarde
-            tempo_intervalo = (fim_intervalo - ini_intervalo).total_seconds() / 3600  # Intervalo
-            horas_trabalhadas = periodo1 + periodo2 - tempo_intervalo
+    O motor de OCR é o de get_ocr_backend e o recorte o de OCR_RECORTE
+    (grade.py). Imagens já vistas (mesmos bytes) vêm do cache e não são
+    reconhecidas de novo. JPEG/PNG dentro dos limites do OCR são enviados com
+    os bytes originais.
+    """
+    import grade
+
+    backend = get_ocr_backend()
+    cache = cache_ocr.get_cache(OCR_CACHE_DIR)
+    raw = [f.getvalue() for f in uploaded_files]
+    keys = [grade.cache_key(backend, cache_ocr.content_key(data), OCR_RECORTE) for data in raw]
+    texts = [cache.get(key) if backend.persistent else None for key in keys]
+    pending = [i for i, text in enumerate(texts) if text is None]
+    cached = len(uploaded_files) - len(pending)
+    diagnostico.count('ocr.cache_acertos', cached)
+
+    def pending_done(j, done):
+        if on_done:
+            on_done(pending[j], cached + done)
+
+    results = grade.recognize_many([raw[i] for i in pending], backend, OCR_RECORTE, on_done=pending_done)
+    for i, (text, error) in zip(pending, results):
+        if error is not None:
+            st.error(f"Erro no OCR de {uploaded_files[i].name}: {str(error)}")
+        elif backend.persistent:
+            cache.put(keys[i], text)
+        texts[i] = text
+    return texts
+
+def get_ocr_backend():
+    """Motor de OCR configurado em OCR_BACKEND (com a chave do OCR.space, se houver)."""
+    import ocr
+
+    return ocr.get_backend(OCR_BACKEND, OCR_SPACE_API_KEY)
+
+def parse_excel_uploads(uploaded_files, on_done=None):
+    """
+    Lê as planilhas em paralelo (um processo por núcleo) e calcula as horas.
+
+    Retorna (df, dated, erro) na ordem do upload; planilhas já lidas (mesmos
+    bytes) vêm de um cache em memória.
+    """
+    from leitura_paralela import parse_many
+
+    return parse_many([(f.getvalue(), default_person(f.name)) for f in uploaded_files], on_done=on_done)
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def parse_ocr_text(text, person):
+    """Interpreta o texto do OCR e calcula as horas; o resultado fica em cache pelo texto."""
+    raw_data, malformed = parse_time_data_report(text, person)
+    df, dated = hours_frames(raw_data)
+    return df, dated, malformed
+
+def upload_keys(uploaded_files):
+    """Chave de cada arquivo pelo conteúdo; arquivos repetidos recebem um sufixo para contar duas vezes."""
+    return numbered_keys(cache_ocr.content_key(uploaded_file.getvalue()) for uploaded_file in uploaded_files)
+
+def numbered_keys(hashes):
+    """Hashes de conteúdo com o número da ocorrência ('hash:1', 'hash:2', ...)."""
+    seen = {}
+    keys = []
+    for key in hashes:
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(f"{key}:{seen[key]}")
+    return keys
+
+def show_history(store):
+    """Consulta por período às linhas já guardadas na base local, sem reprocessar arquivos."""
+    first, last = store.date_range()
+    if first is None:
+        return
+    with st.expander("🗄️ Histórico da base local"):
+        col_inicio, col_fim = st.columns(2)
+        inicio = col_inicio.date_input("De", value=first.date(), min_value=first.date(), max_value=last.date())
+        fim = col_fim.date_input("Até", value=last.date(), min_value=first.date(), max_value=last.date())
+        historico = store.query(inicio, fim)
+        if historico.empty:
+            st.info("Nenhum dia guardado nesse período.")
+            return
+        st.write(
+            f"**{historico['Horas/Dia'].sum():.2f}** horas em {len(historico)} dia(s) "
+            f"de {historico['Arquivo'].nunique()} arquivo(s)"
+        )
+        semanal = historico.groupby(historico['Data'].dt.to_period('W'))['Horas/Dia'].sum()
+        st.dataframe(semanal.rename_axis('Semana').rename('Total Horas').round(2).reset_index().astype({'Semana': str}))
+
+def show_diagnostics(diag, profile=None):
+    """Painel com o tempo de cada etapa, os contadores e, se pedido, o perfil da execução."""
+    with st.expander("🩺 Diagnóstico desta execução", expanded=True):
+        etapas = pd.DataFrame(diag.rows(), columns=['Etapa', 'Chamadas', 'Segundos', 'ms/chamada'])
+        if etapas.empty:
+            st.info("Nenhuma etapa medida nesta execução.")
         else:
-            # Se não há intervalo, calcula normalmente
-            horas_trabalhadas = (saida - entrada).total_seconds() / 3600
+            st.dataframe(etapas.round(3), hide_index=True)
+        if diag.counters:
+            st.dataframe(
+                pd.DataFrame(sorted(diag.counters.items()), columns=['Contador', 'Valor']), hide_index=True
+            )
+        st.download_button(
+            "⬇️ Diagnóstico (JSON)", diag.to_json(indent=2), file_name="diagnostico.json", mime="application/json"
+        )
+        if profile is not None:
+            st.write(f"**Perfil ({profile.engine})**")
+            st.code(profile.text(), language=None)
 
-        return max(0, round(horas_trabalhadas, 2))
-    except:
-        return 0
+def main():
+    setup_page()
+    # Diagnóstico opcional: com as opções desligadas, as marcações de etapa não custam nada
+    mostrar_diagnostico = st.sidebar.checkbox("🩺 Mostrar diagnóstico", help="Tempo de cada etapa e contadores de linhas, bytes e chamadas ao OCR")
+    perfilar = mostrar_diagnostico and st.sidebar.checkbox("Perfilar esta execução", help="cProfile (ou pyinstrument, se instalado) só nesta execução")
+    if not mostrar_diagnostico:
+        render_app()
+        return
 
-def process_excel_file(excel_file):
-    """Processa um arquivo Excel e extrai os dados de horário"""
-    try:
-        # Tenta ler o arquivo Excel
-        df = pd.read_excel(excel_file)
-        
-        # Busca por colunas que possam conter os dados necessários
-        data_processed = []
-        
-        # Mapear possíveis nomes de colunas
-        col_mapping = {
-            'data': ['data', 'date', 'dia'],
-            'entrada1': ['horário de entrada 1', 'entrada 1', 'entrada1', 'entry1'],
-            'saida1': ['horário de saída 1', 'saida 1', 'saida1', 'exit1'],
-            'entrada2': ['horário de entrada 2', 'entrada 2', 'entrada2', 'entry2'],
-            'saida2': ['horário de saída 2', 'saida 2', 'saida2', 'exit2'],
-            'entrada': ['entrada', 'entry', 'inicio', 'start'],
-            'saida': ['saida', 'exit', 'fim', 'end'],
-            'inicio_intervalo': ['inicio_intervalo', 'inicio intervalo', 'break_start', 'intervalo_inicio'],
-            'fim_intervalo': ['fim_intervalo', 'fim intervalo', 'break_end', 'intervalo_fim']
-        }
-        
-        # Encontrar as colunas corretas
-        found_cols = {}
-        for key, possible_names in col_mapping.items():
-            for col in df.columns:
-                if any(name.lower() in col.lower() for name in possible_names):
-                    found_cols[key] = col
-                    break
-        
-        # Verificar se é o formato com 4 colunas (entrada1, saida1, entrada2, saida2)
-        if 'entrada1' in found_cols and 'saida2' in found_cols:
-            # Formato com horários separados
-            for i, row in df.iterrows():
-                try:
-                    entrada1 = str(row[found_cols['entrada1']]).strip() if 'entrada1' in found_cols else ''
-                    saida1 = str(row[found_cols.get('saida1', '')]).strip() if 'saida1' in found_cols else ''
-                    entrada2 = str(row[found_cols.get('entrada2', '')]).strip() if 'entrada2' in found_cols else ''
-                    saida2 = str(row[found_cols['saida2']]).strip() if 'saida2' in found_cols else ''
-                    
-                    # Verificar se tem dados válidos
-                    if entrada1 and saida2 and entrada1 != 'nan' and saida2 != 'nan':
-                        data_entry = {
-                            'Data': f"{i+1:02d}/12/2024",  # Data fictícia
-                            'Entrada': entrada1,
-                            'Saída': saida2,
-                            'Início Intervalo': saida1 if saida1 and saida1 != 'nan' else '',
-                            'Fim Intervalo': entrada2 if entrada2 and entrada2 != 'nan' else ''
-                        }
-                        data_processed.append(data_entry)
-                        
-                except Exception as e:
-                    continue
+    with diagnostico.collecting() as diag:
+        if perfilar:
+            with diagnostico.profiled() as profile:
+                render_app()
         else:
-            # Formato tradicional
-            # Se não encontrar as colunas esperadas, assumir ordem padrão
-            if len(found_cols) < 3:  # Pelo menos Data, Entrada e Saída
-                cols = df.columns.tolist()
-                if len(cols) >= 3:
-                    found_cols = {
-                        'data': cols[0] if len(cols) > 4 else None,
-                        'entrada': cols[0] if len(cols) <= 4 else cols[1],
-                        'saida': cols[-1]  # Última coluna como saída
-                    }
-                    if len(cols) >= 5:
-                        found_cols['inicio_intervalo'] = cols[2]
-                        found_cols['fim_intervalo'] = cols[3]
-            
-            # Processar os dados
-            for i, row in df.iterrows():
-                try:
-                    if 'data' in found_cols and found_cols['data']:
-                        data_val = str(row[found_cols['data']])
-                    else:
-                        data_val = f"{i+1:02d}/12/2024"  # Data fictícia se não houver coluna de data
-                    
-                    data_entry = {
-                        'Data': data_val,
-                        'Entrada': str(row[found_cols['entrada']]) if 'entrada' in found_cols else '',
-                        'Saída': str(row[found_cols['saida']]) if 'saida' in found_cols else '',
-                        'Início Intervalo': str(row[found_cols.get('inicio_intervalo', '')]) if 'inicio_intervalo' in found_cols else '',
-                        'Fim Intervalo': str(row[found_cols.get('fim_intervalo', '')]) if 'fim_intervalo' in found_cols else ''
-                    }
-                    
-                    # Validar se a linha tem dados válidos
-                    if data_entry['Entrada'] and data_entry['Saída'] and data_entry['Entrada'] != 'nan' and data_entry['Saída'] != 'nan':
-                        data_processed.append(data_entry)
-                        
-                except Exception as e:
-                    continue
-                
-        return data_processed
-        
+            profile = None
+            render_app()
+    show_diagnostics(diag, profile)
+
+def show_file(name, df):
+    """Tabela de um arquivo processado; retorna o total de horas dele."""
+    total = df['Horas/Dia'].sum()
+    st.write(f"**{name}** - Total: `{total:.2f}` horas 🕒")
+    st.dataframe(display_frame(df))
+    return total
+
+def get_job_queue():
+    """Fila de tarefas em segundo plano, no mesmo SQLite da base local (em memória sem a base)."""
+    from tarefas import get_queue
+
+    return get_queue(TIMESHEET_DB or ':memory:', TIMESHEET_DB, get_ocr_backend(), OCR_CACHE_DIR, OCR_RECORTE)
+
+def start_job(uploaded_files, kind):
+    """Coloca os arquivos na fila (uma vez por conjunto enviado) e acompanha a tarefa."""
+    queue = get_job_queue()
+    keys = upload_keys(uploaded_files)
+    current = st.session_state.get('tarefa')
+    if current is None or current['chaves'] != keys or current['tipo'] != kind:
+        job_id = queue.submit(kind, [(f.name, f.getvalue()) for f in uploaded_files])
+        current = st.session_state['tarefa'] = {'id': job_id, 'chaves': keys, 'tipo': kind}
+        # Na URL, para a tarefa continuar visível se a página for recarregada
+        st.query_params['tarefa'] = str(job_id)
+    show_job(queue, current['id'])
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(queue, job_id):
+    """Progresso da tarefa, atualizado sozinho; os arquivos prontos aparecem antes do fim do lote."""
+    from tarefas import ACTIVE, DONE
+
+    status = queue.status(job_id)
+    if status['estado'] not in ACTIVE:
+        # Terminou: a página inteira roda de novo para mostrar os resultados
+        st.rerun()
+    st.progress(
+        status['feitos'] / status['total'],
+        text=f"⏳ {status['feitos']} de {status['total']} arquivo(s) processado(s) em segundo plano"
+    )
+    arquivos = queue.files(job_id)
+    prontos = arquivos[arquivos['Situação'] == DONE]
+    st.write(f"Parcial: `{prontos['Total Horas'].sum():.2f}` horas em {len(prontos)} arquivo(s)")
+    st.dataframe(arquivos, hide_index=True)
+    if st.button("⛔ Cancelar", key=f"cancelar_{job_id}"):
+        queue.cancel(job_id)
+        st.rerun()
+
+def show_job(queue, job_id):
+    """Tarefa em segundo plano: o progresso enquanto roda e, no fim, os resultados como no processamento direto."""
+    from tarefas import ACTIVE, CANCELLED
+
+    status = queue.status(job_id)
+    if status is None:
+        st.warning(f"Tarefa {job_id} não encontrada.")
+        return
+    if status['estado'] in ACTIVE:
+        job_progress(queue, job_id)
+        return
+    if status['estado'] == CANCELLED:
+        st.warning(f"Tarefa cancelada: {status['cancelados']} arquivo(s) não processado(s).")
+        if st.button("🔁 Processar de novo"):
+            st.session_state.pop('tarefa', None)
+            st.rerun()
+
+    results = queue.results(job_id)
+    keys = numbered_keys(key for _, _, key, *_ in results)
+    frames = {}
+    total_geral = 0
+    for key, (_, name, _, df, dated, malformed, error) in zip(keys, results):
+        if error:
+            st.error(f"Erro ao processar {name}: {error}")
+            continue
+        for dia in malformed:
+            st.warning(f"{name}: dia {dia['Data']} ignorado ({dia['Motivo']})")
+        if df is None or len(df) == 0:
+            st.warning(f"Nenhum dado detectado em {name}")
+            continue
+        total_geral += show_file(name, df)
+        frames[key] = dated
+    if frames:
+        show_results(frames, total_geral)
+
+def show_results(frames, total_geral):
+    """Estatísticas, gráficos e download do Excel com os arquivos processados (frames: chave -> dated)."""
+    # Processar dados automaticamente
+    st.success("✅ Processamento concluído! Preparando download do Excel...")
+    full_df = pd.concat(frames.values()).sort_values('Data', kind='stable')
+
+    # Meta e mínimo semanal do acompanhamento da PSC (seção ⚖️ e abas do Excel)
+    horas_exigidas = st.sidebar.number_input(
+        "⚖️ Horas de PSC exigidas", min_value=0.0, value=float(PSC_HORAS_EXIGIDAS), step=10.0,
+        help="Horas que cada pessoa precisa cumprir; 0 = sem previsão de término"
+    )
+    minimo_semanal = st.sidebar.number_input(
+        "Mínimo semanal (h)", min_value=0.0, value=WEEKLY_MINIMUM, step=1.0,
+        help="Semanas com menos horas que isso são marcadas no acompanhamento"
+    )
+    
+    # Estatísticas atualizadas só com os arquivos que entraram ou saíram desde o último rerun
+    aggregator = st.session_state.setdefault('agregador', IncrementalAggregator())
+    aggregator.sync(frames)
+
+    # Calcular estatísticas DIÁRIAS
+    media_diaria, desvio_diario, moda_diaria = aggregator.daily_stats()
+    
+    # Calcular estatísticas SEMANAIS
+    full_df['Semana'] = full_df['Data'].dt.to_period('W')
+    weekly_totals = aggregator.weekly_totals().rename_axis('Semana')
+    media_semanal, desvio_semanal = aggregator.weekly_stats()
+    
+    # Calcular total mensal
+    monthly_totals_display = aggregator.monthly_totals().rename_axis('Mes_Ano')
+    
+    # Gerar Excel automaticamente
+    from exportacao import REPORT_FILENAME, report_sheets, write_excel
+    try:
+        output = BytesIO()
+        write_excel(report_sheets(full_df, total_geral, aggregator, horas_exigidas, minimo_semanal), output)
+        output.seek(0)
     except Exception as e:
-        st.error(f"Erro ao processar arquivo Excel: {str(e)}")
-        return []
+        st.error(f"Erro ao gerar Excel: {str(e)}")
+        output = None
+    
+    # Download automático
+    if output:
+        st.download_button(
+            label="📊 DOWNLOAD AUTOMÁTICO - Excel Consolidado",
+            data=output,
+            file_name=REPORT_FILENAME,
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            type="primary"
+        )
 
-def main():
+    st.subheader("📊 Visualizações Interativas")
+    # Plotly só é carregado quando há dados para plotar
+    from graficos import daily_hours_figure, hours_histogram_figure, weekly_totals_figure
+    
+    # Gráfico 1: Horas por Dia (Gráfico de Barras Interativo)
+    st.write("📅 **Horas Trabalhadas por Dia**")
+    st.write("*💡 Passe o mouse sobre as barras para ver detalhes. Este gráfico mostra sua jornada diária, permitindo identificar dias com mais ou menos trabalho.*")
+    try:
+        fig1 = daily_hours_figure(full_df['Data'], full_df['Horas/Dia'], media_diaria, moda_diaria)
+        with diagnostico.stage('graficos.envio'):
+            st.plotly_chart(fig1, use_container_width=True)
+    except Exception as e:
+        st.error(f"Erro no gráfico: {str(e)}")
+
+    # Gráfico 2: Distribuição das Horas (Histograma Interativo)
+    st.write("📈 **Distribuição das Horas Diárias**")
+    st.write("*💡 Este histograma mostra com que frequência você trabalha determinadas quantidades de horas. Picos indicam suas jornadas mais comuns.*")
+    try:
+        fig2 = hours_histogram_figure(full_df['Horas/Dia'], media_diaria, moda_diaria, desvio_diario)
+        with diagnostico.stage('graficos.envio'):
+            st.plotly_chart(fig2, use_container_width=True)
+    except Exception as e:
+        st.error(f"Erro no gráfico: {str(e)}")
+
+    # Gráfico 3: Totais Semanais (Gráfico de Barras Interativo)
+    st.write("📅 **Totais Semanais**")
+    st.write("*💡 Visualize suas horas semanais totais. Ajuda a identificar semanas mais intensas e padrões semanais de trabalho.*")
+    try:
+        fig3 = weekly_totals_figure(weekly_totals, media_semanal)
+        with diagnostico.stage('graficos.envio'):
+            st.plotly_chart(fig3, use_container_width=True)
+    except Exception as e:
+        st.error(f"Erro no gráfico semanal: {str(e)}")
+
+    st.subheader("📚 Estatísticas Explicadas")
+
+    st.markdown(f"""
+    ### 📊 Estatísticas Diárias:
+    - **Total Geral:** `{total_geral:.2f}` horas
+    - **Média diária:** `{media_diaria:.2f}` horas  
+      📈 A média é o valor médio de horas que você trabalhou por dia. É a soma de todas as horas dividida pelo número de dias.
+    - **Moda diária:** `{moda_diaria:.2f}` horas  
+      🎯 A moda é o valor de horas que você mais trabalhou (mais frequente). Indica sua jornada típica.
+    - **Desvio padrão diário:** `{desvio_diario:.2f}` horas  
+      📊 O desvio padrão mostra a variabilidade das suas horas diárias. Quanto menor, mais consistente é sua rotina.
+      - Se ≤ 1h: Rotina muito consistente 🟢
+      - Se 1-2h: Rotina moderadamente variável 🟡  
+      - Se > 2h: Rotina muito variável 🔴
+      
+    ### 📅 Estatísticas Semanais:
+    - **Média semanal:** `{media_semanal:.2f}` horas  
+      📈 A média de horas trabalhadas por semana completa.
+    - **Desvio padrão semanal:** `{desvio_semanal:.2f}` horas  
+      📊 Mostra a variação das horas semanais. Quanto maior, mais irregular é sua carga de trabalho semanal.
+      
+    ### 🔍 Como Interpretar os Gráficos:
+    - **Gráfico de Barras Diário:** Cada barra representa um dia. Barras altas = dias intensos.
+    - **Histograma:** Mostra quantos dias você trabalhou X horas. Picos = suas jornadas mais comuns.
+    - **Gráfico Semanal:** Compare semanas inteiras. Útil para identificar períodos mais intensos.
+    """)
+    
+    st.subheader("📅 Totais por Semana")
+    for semana, total_semana in weekly_totals.items():
+        st.write(f"**Semana {semana}:** `{total_semana:.2f}` horas")
+        
+    st.subheader("📅 Totais por Mês")
+    for mes, total_mes in monthly_totals_display.items():
+        st.write(f"**{mes}:** `{total_mes:.2f}` horas")
+
+    if full_df['Pessoa'].nunique() > 1:
+        # Uma passada agrupada para todas as pessoas, sem laço por pessoa
+        st.subheader("👥 Por Pessoa")
+        por_pessoa = person_stats(full_df)
+        st.dataframe(por_pessoa.round({col: 2 for col in por_pessoa.select_dtypes('number').columns}))
+        st.write("**Total de horas por mês**")
+        st.dataframe(person_monthly_pivot(full_df).round(2))
+
+    show_progress(full_df, horas_exigidas, minimo_semanal)
+
+def show_progress(full_df, horas_exigidas, minimo_semanal):
+    """Seção de acompanhamento da PSC: andamento de cada pessoa e semanas abaixo do mínimo."""
+    st.subheader("⚖️ Cumprimento da PSC")
+    resumo, diario, semanas = track_progress(full_df, horas_exigidas, minimo_semanal)
+    if resumo.empty:
+        # Arquivos sem nenhuma data válida não têm dias para acompanhar
+        st.info("Nenhum dia com data válida para acompanhar.")
+        return
+    meta = f"das {horas_exigidas:g} horas exigidas" if horas_exigidas else "(informe as horas exigidas na barra lateral)"
+    st.write(f"*💡 Situação de cada pessoa no último dia com registro dela. O ritmo semanal vem dos últimos 30 dias e projeta o término {meta}.*")
+    st.dataframe(resumo.round({col: 2 for col in resumo.select_dtypes('number').columns}))
+
+    abaixo = semanas[semanas['Abaixo do Mínimo']]
+    if abaixo.empty:
+        st.write(f"✅ Nenhuma semana completa abaixo de {minimo_semanal:g} horas.")
+    else:
+        st.write(f"⚠️ **{len(abaixo)} semana(s) abaixo de {minimo_semanal:g} horas**")
+        st.dataframe(abaixo.drop(columns='Abaixo do Mínimo').astype({'Semana': str}), hide_index=True)
+
+    if len(resumo) == 1:
+        from graficos import progress_figure
+        with diagnostico.stage('graficos.envio'):
+            st.plotly_chart(progress_figure(diario, horas_exigidas), use_container_width=True)
+
+def render_app():
     st.title("Controle de Horas")
     st.subheader("Análise OCR e Visualização de Jornadas")
 
@@ -261,15 +446,61 @@ def main():
     
     if uploaded_files:
         st.success(f"✅ {len(uploaded_files)} arquivo(s) carregado(s) com sucesso!")
+        em_segundo_plano = st.toggle(
+            "⏳ Processar em segundo plano",
+            help="Os arquivos entram em uma fila e são processados sem travar a página; dá para cancelar"
+        )
 
-    if uploaded_files:
-        all_data = []
+    if uploaded_files and em_segundo_plano:
+        start_job(uploaded_files, file_processing_type)
+    elif uploaded_files:
         total_geral = 0
         
         # Barra de progresso para múltiplos arquivos
         progress_bar = st.progress(0)
         status_text = st.empty()
         
+        keys = upload_keys(uploaded_files)
+        hashes = [key.rsplit(':', 1)[0] for key in keys]
+
+        # Arquivos já processados antes são lidos da base local, sem OCR nem leitura da planilha
+        store = get_store(TIMESHEET_DB) if TIMESHEET_DB else None
+        stored = {}
+        if store is not None:
+            for i, content_hash in enumerate(hashes):
+                loaded = store.load(content_hash)
+                if loaded is not None:
+                    stored[i] = loaded
+            if stored:
+                st.caption(f"🗄️ {len(stored)} arquivo(s) lido(s) da base local, sem reprocessar")
+        
+        if file_processing_type == "image":
+            # OCR de todas as imagens novas em paralelo antes de exibir os resultados
+            to_ocr = [f for i, f in enumerate(uploaded_files) if i not in stored]
+
+            def ocr_progress(i, done):
+                progress_bar.progress(done / len(to_ocr))
+                status_text.text(f"OCR {done} de {len(to_ocr)}: {to_ocr[i].name}")
+            
+            ocr_texts = iter(extract_data_from_images(to_ocr, on_done=ocr_progress) if to_ocr else [])
+            cache_stats = cache_ocr.get_cache(OCR_CACHE_DIR).stats()
+            st.caption(
+                f"Cache OCR: {cache_stats['memory_hits'] + cache_stats['disk_hits']} acerto(s), "
+                f"{cache_stats['misses']} falta(s) ({cache_stats['hit_rate']:.0%})"
+            )
+        else:
+            # Leitura de todas as planilhas novas em paralelo, com erros isolados por arquivo
+            to_parse = [i for i in range(len(uploaded_files)) if i not in stored]
+
+            def excel_progress(j, done):
+                progress_bar.progress(done / len(to_parse))
+                status_text.text(f"Planilha {done} de {len(to_parse)}: {uploaded_files[to_parse[j]].name}")
+
+            parsed = dict(zip(to_parse, parse_excel_uploads([uploaded_files[i] for i in to_parse], on_done=excel_progress)))
+        
+        frames = {}
+        diagnostico.count('upload.arquivos', len(uploaded_files))
+        diagnostico.count('upload.bytes', sum(f.size for f in uploaded_files))
         for i, uploaded_file in enumerate(uploaded_files):
             # Atualizar progresso
             progress = (i + 1) / len(uploaded_files)
@@ -278,298 +509,52 @@ def main():
             
             if file_processing_type == "image":
                 # Processamento de imagem (OCR)
-                image = Image.open(uploaded_file)
-                st.image(image, caption=uploaded_file.name, width=300)
-                text = extract_data_from_image(image)
-                raw_data = parse_time_data(text)
+                import imagens
+                st.image(imagens.make_thumbnail(uploaded_file.getvalue()), caption=uploaded_file.name, width=300)
+                if i in stored:
+                    df, dated, malformed = stored[i]
+                else:
+                    text = next(ocr_texts)
+                    df, dated, malformed = parse_ocr_text(text, default_person(uploaded_file.name))
+                    # Texto de demonstração ou OCR com erro não vão para a base
+                    if store is not None and get_ocr_backend().persistent and text and len(df):
+                        store.save(hashes[i], uploaded_file.name, 'ocr', df, malformed)
+                for dia in malformed:
+                    st.warning(f"{uploaded_file.name}: dia {dia['Data']} ignorado ({dia['Motivo']})")
             else:
                 # Processamento de Excel
-                raw_data = process_excel_file(uploaded_file)
-                st.write(f"📊 **{uploaded_file.name}** processado")
+                if i in stored:
+                    df, dated, _ = stored[i]
+                else:
+                    df, dated, error = parsed[i]
+                    if error:
+                        st.error(f"Erro ao processar arquivo Excel {uploaded_file.name}: {error}")
+                        continue
+                    if store is not None and len(df):
+                        store.save(hashes[i], uploaded_file.name, 'excel', df)
+                modelo = df.attrs.get('modelo')
+                st.write(f"📊 **{uploaded_file.name}** processado" + (f" (modelo: {modelo})" if modelo else ""))
 
-            if not raw_data:
+            if len(df) == 0:
                 st.warning(f"Nenhum dado detectado em {uploaded_file.name}")
                 continue
 
-            df = pd.DataFrame(raw_data)
-            df['Horas/Dia'] = df.apply(calculate_hours, axis=1)
-
-            total = df['Horas/Dia'].sum()
-            total_geral += total
-            all_data.append(df)
-
-            st.write(f"**{uploaded_file.name}** - Total: `{total:.2f}` horas 🕒")
-            st.dataframe(df)
+            total_geral += show_file(uploaded_file.name, df)
+            frames[keys[i]] = dated
         
         # Finalizar barra de progresso
         progress_bar.progress(1.0)
         status_text.text(f"✅ Processamento completo! {len(uploaded_files)} arquivo(s) processado(s).")
 
-        if all_data:
-            # Processar dados automaticamente
-            st.success("✅ Processamento concluído! Preparando download do Excel...")
-            full_df = pd.concat(all_data)
-            
-            # Converter data com tratamento de erro
-            try:
-                full_df['Data'] = pd.to_datetime(full_df['Data'], format='%d/%m/%Y', errors='coerce')
-                # Remove linhas com datas inválidas
-                full_df = full_df.dropna(subset=['Data'])
-                full_df.sort_values('Data', inplace=True)
-            except Exception as e:
-                st.warning(f"Erro na conversão de datas: {str(e)}. Usando dados sem ordenação por data.")
-                # Se não conseguir converter, manter como está
-
-            # Calcular estatísticas DIÁRIAS
-            media_diaria = full_df['Horas/Dia'].mean()
-            desvio_diario = full_df['Horas/Dia'].std()
-            # Calcular moda (valor mais frequente)
-            moda_diaria = stats.mode(full_df['Horas/Dia'], keepdims=True)[0][0] if len(full_df['Horas/Dia']) > 0 else 0
-            
-            # Calcular estatísticas SEMANAIS
-            full_df['Semana'] = full_df['Data'].dt.to_period('W')
-            weekly_totals = full_df.groupby('Semana')['Horas/Dia'].sum()
-            media_semanal = weekly_totals.mean()
-            desvio_semanal = weekly_totals.std()
-            
-            # Calcular total mensal
-            full_df['Mes_Ano'] = full_df['Data'].dt.to_period('M')
-            monthly_totals = full_df.groupby('Mes_Ano')['Horas/Dia'].sum().reset_index()
-            monthly_totals['Mes_Ano'] = monthly_totals['Mes_Ano'].astype(str)
-            monthly_totals_display = full_df.groupby('Mes_Ano')['Horas/Dia'].sum()
-            
-            # Gerar Excel automaticamente
-            try:
-                output = BytesIO()
-                
-                # Preparar DataFrame para Excel
-                excel_df = full_df.copy()
-                excel_df['Data'] = excel_df['Data'].dt.strftime('%d/%m/%Y')
-                excel_df = excel_df.drop('Mes_Ano', axis=1, errors='ignore')
-                
-                # Usar pandas para criar Excel
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    # Aba Detalhes
-                    excel_df.to_excel(writer, sheet_name='Detalhes', index=False)
-                    
-                    # Aba Resumo
-                    stats_df = pd.DataFrame([
-                        ['Total Geral', f"{total_geral:.2f}"],
-                        ['Média Diária', f"{media_diaria:.2f}"],
-                        ['Moda Diária', f"{moda_diaria:.2f}"],
-                        ['Desvio Padrão Diário', f"{desvio_diario:.2f}"],
-                        ['Média Semanal', f"{media_semanal:.2f}"],
-                        ['Desvio Padrão Semanal', f"{desvio_semanal:.2f}"]
-                    ], columns=['Estatística', 'Valor'])
-                    stats_df.to_excel(writer, sheet_name='Resumo', index=False)
-                    
-                    # Aba Totais Semanais
-                    weekly_totals_df = weekly_totals.reset_index()
-                    weekly_totals_df['Semana'] = weekly_totals_df['Semana'].astype(str)
-                    weekly_totals_df.columns = ['Semana', 'Total Horas']
-                    weekly_totals_df['Total Horas'] = weekly_totals_df['Total Horas'].round(2)
-                    weekly_totals_df.to_excel(writer, sheet_name='Totais Semanais', index=False)
-                    
-                    # Aba Totais Mensais
-                    monthly_totals_df = monthly_totals.copy()
-                    monthly_totals_df.columns = ['Mês/Ano', 'Total Horas']
-                    monthly_totals_df['Total Horas'] = monthly_totals_df['Total Horas'].round(2)
-                    monthly_totals_df.to_excel(writer, sheet_name='Totais Mensais', index=False)
-                
-                output.seek(0)
-                
-            except Exception as e:
-                st.error(f"Erro ao gerar Excel: {str(e)}")
-                output = None
-            
-            # Download automático
-            if output:
-                st.download_button(
-                    label="📊 DOWNLOAD AUTOMÁTICO - Excel Consolidado",
-                    data=output,
-                    file_name="horas_psc_analise.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    type="primary"
-                )
-
-            st.subheader("📊 Visualizações Interativas")
-            
-            # Gráfico 1: Horas por Dia (Gráfico de Barras Interativo)
-            st.write("📅 **Horas Trabalhadas por Dia**")
-            st.write("*💡 Passe o mouse sobre as barras para ver detalhes. Este gráfico mostra sua jornada diária, permitindo identificar dias com mais ou menos trabalho.*")
-            try:
-                dates_str = full_df['Data'].dt.strftime('%d/%m/%Y')
-                fig1 = go.Figure()
-                
-                # Barras das horas trabalhadas
-                fig1.add_trace(go.Bar(
-                    x=dates_str, 
-                    y=full_df['Horas/Dia'],
-                    name='Horas Trabalhadas',
-                    marker_color='#00ffea',
-                    hovertemplate='<b>%{x}</b><br>Horas: %{y:.2f}h<extra></extra>'
-                ))
-                
-                # Linha da média
-                fig1.add_trace(go.Scatter(
-                    x=dates_str,
-                    y=[media_diaria] * len(dates_str),
-                    mode='lines',
-                    name=f'Média Diária ({media_diaria:.2f}h)',
-                    line=dict(color='magenta', dash='dash', width=2),
-                    hovertemplate='Média: %{y:.2f}h<extra></extra>'
-                ))
-                
-                # Linha da moda
-                fig1.add_trace(go.Scatter(
-                    x=dates_str,
-                    y=[moda_diaria] * len(dates_str),
-                    mode='lines',
-                    name=f'Moda ({moda_diaria:.2f}h)',
-                    line=dict(color='yellow', dash='dot', width=2),
-                    hovertemplate='Moda: %{y:.2f}h<extra></extra>'
-                ))
-                
-                fig1.update_layout(
-                    title="Horas Trabalhadas por Dia",
-                    xaxis_title="Data",
-                    yaxis_title="Horas",
-                    template="plotly_dark",
-                    height=500,
-                    showlegend=True
-                )
-                st.plotly_chart(fig1, use_container_width=True)
-            except Exception as e:
-                st.error(f"Erro no gráfico: {str(e)}")
-
-            # Gráfico 2: Distribuição das Horas (Histograma Interativo)
-            st.write("📈 **Distribuição das Horas Diárias**")
-            st.write("*💡 Este histograma mostra com que frequência você trabalha determinadas quantidades de horas. Picos indicam suas jornadas mais comuns.*")
-            try:
-                fig2 = go.Figure()
-                
-                # Histograma
-                fig2.add_trace(go.Histogram(
-                    x=full_df['Horas/Dia'],
-                    nbinsx=15,
-                    name='Frequência',
-                    marker_color='lime',
-                    opacity=0.7,
-                    hovertemplate='Horas: %{x:.1f}-%{x:.1f}<br>Frequência: %{y}<extra></extra>'
-                ))
-                
-                # Linha da média
-                fig2.add_vline(
-                    x=media_diaria, 
-                    line_dash="dash", 
-                    line_color="cyan",
-                    annotation_text=f"Média: {media_diaria:.2f}h",
-                    annotation_position="top"
-                )
-                
-                # Linha da moda
-                fig2.add_vline(
-                    x=moda_diaria, 
-                    line_dash="dot", 
-                    line_color="yellow",
-                    annotation_text=f"Moda: {moda_diaria:.2f}h",
-                    annotation_position="bottom"
-                )
-                
-                # Área do desvio padrão
-                fig2.add_vrect(
-                    x0=media_diaria - desvio_diario,
-                    x1=media_diaria + desvio_diario,
-                    fillcolor="orange",
-                    opacity=0.2,
-                    annotation_text="±1 Desvio Padrão",
-                    annotation_position="top right"
-                )
-                
-                fig2.update_layout(
-                    title="Distribuição das Horas Trabalhadas",
-                    xaxis_title="Horas por Dia",
-                    yaxis_title="Frequência (Quantos Dias)",
-                    template="plotly_dark",
-                    height=500,
-                    showlegend=False
-                )
-                st.plotly_chart(fig2, use_container_width=True)
-            except Exception as e:
-                st.error(f"Erro no gráfico: {str(e)}")
-
-            # Gráfico 3: Totais Semanais (Gráfico de Barras Interativo)
-            st.write("📅 **Totais Semanais**")
-            st.write("*💡 Visualize suas horas semanais totais. Ajuda a identificar semanas mais intensas e padrões semanais de trabalho.*")
-            try:
-                week_labels = [str(w) for w in weekly_totals.index]
-                fig3 = go.Figure()
-                
-                # Barras semanais
-                fig3.add_trace(go.Bar(
-                    x=week_labels,
-                    y=weekly_totals.values,
-                    name='Horas Semanais',
-                    marker_color='#ffaa00',
-                    hovertemplate='<b>Semana %{x}</b><br>Total: %{y:.2f}h<extra></extra>'
-                ))
-                
-                # Linha da média semanal
-                fig3.add_trace(go.Scatter(
-                    x=week_labels,
-                    y=[media_semanal] * len(week_labels),
-                    mode='lines',
-                    name=f'Média Semanal ({media_semanal:.2f}h)',
-                    line=dict(color='cyan', dash='dash', width=2),
-                    hovertemplate='Média Semanal: %{y:.2f}h<extra></extra>'
-                ))
-                
-                fig3.update_layout(
-                    title="Horas Trabalhadas por Semana",
-                    xaxis_title="Semana",
-                    yaxis_title="Total de Horas",
-                    template="plotly_dark",
-                    height=500,
-                    showlegend=True
-                )
-                st.plotly_chart(fig3, use_container_width=True)
-            except Exception as e:
-                st.error(f"Erro no gráfico semanal: {str(e)}")
-
-            st.subheader("📚 Estatísticas Explicadas")
-
-            st.markdown(f"""
-            ### 📊 Estatísticas Diárias:
-            - **Total Geral:** `{total_geral:.2f}` horas
-            - **Média diária:** `{media_diaria:.2f}` horas  
-              📈 A média é o valor médio de horas que você trabalhou por dia. É a soma de todas as horas dividida pelo número de dias.
-            - **Moda diária:** `{moda_diaria:.2f}` horas  
-              🎯 A moda é o valor de horas que você mais trabalhou (mais frequente). Indica sua jornada típica.
-            - **Desvio padrão diário:** `{desvio_diario:.2f}` horas  
-              📊 O desvio padrão mostra a variabilidade das suas horas diárias. Quanto menor, mais consistente é sua rotina.
-              - Se ≤ 1h: Rotina muito consistente 🟢
-              - Se 1-2h: Rotina moderadamente variável 🟡  
-              - Se > 2h: Rotina muito variável 🔴
-              
-            ### 📅 Estatísticas Semanais:
-            - **Média semanal:** `{media_semanal:.2f}` horas  
-              📈 A média de horas trabalhadas por semana completa.
-            - **Desvio padrão semanal:** `{desvio_semanal:.2f}` horas  
-              📊 Mostra a variação das horas semanais. Quanto maior, mais irregular é sua carga de trabalho semanal.
-              
-            ### 🔍 Como Interpretar os Gráficos:
-            - **Gráfico de Barras Diário:** Cada barra representa um dia. Barras altas = dias intensos.
-            - **Histograma:** Mostra quantos dias você trabalhou X horas. Picos = suas jornadas mais comuns.
-            - **Gráfico Semanal:** Compare semanas inteiras. Útil para identificar períodos mais intensos.
-            """)
-            
-            st.subheader("📅 Totais por Semana")
-            for semana, total_semana in weekly_totals.items():
-                st.write(f"**Semana {semana}:** `{total_semana:.2f}` horas")
-                
-            st.subheader("📅 Totais por Mês")
-            for mes, total_mes in monthly_totals_display.items():
-                st.write(f"**{mes}:** `{total_mes:.2f}` horas")
+        if frames:
+            show_results(frames, total_geral)
+
+    elif 'tarefa' in st.query_params:
+        # Página recarregada: a tarefa em segundo plano continua e os resultados aparecem aqui
+        show_job(get_job_queue(), int(st.query_params['tarefa']))
+
+    if TIMESHEET_DB:
+        show_history(get_store(TIMESHEET_DB))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Motores de OCR usados pelo app.
+
+O app fala com uma interface só (OCRBackend.recognize) e o motor é escolhido
+por nome em get_backend:
+
+  - 'ocrspace': API do OCR.space. Todas as chamadas passam por uma única
+    requests.Session com pool de conexões, timeout por requisição e novas
+    tentativas com backoff exponencial;
+  - 'tesseract': Tesseract local, chamado por subprocess (sem rede nem limite
+    de requisições); roda um processo por núcleo;
+  - 'demo': devolve DEMO_TEXT, para testar a interface sem OCR.
+
+Várias imagens podem ser reconhecidas em paralelo com ocr_many, que devolve os
+textos na mesma ordem do upload.
+"""
+import abc
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from diagnostico import count, stage, submit_in_context
+
+OCR_SPACE_URL = 'https://api.ocr.space/parse/image'
+
+# Máximo de requisições simultâneas ao OCR.space
+MAX_WORKERS = 4
+
+# Conexões mantidas abertas no pool da sessão
+POOL_SIZE = 10
+
+# (conexão, leitura) em segundos
+TIMEOUT = (10, 60)
+
+# Novas tentativas para falhas de rede e respostas 429/5xx
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+# Executável e idioma do Tesseract local
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')
+TESSERACT_LANG = 'por'
+
+# Modos de segmentação do Tesseract: 6 = um bloco de texto uniforme (a tabela do formulário),
+# 7 = uma linha só (uma célula da tabela)
+TESSERACT_PSM = 6
+TESSERACT_LINE_PSM = 7
+
+# Tempo máximo (s) de uma chamada ao Tesseract
+TESSERACT_TIMEOUT = 60
+
+# Texto devolvido pelo motor de demonstração (e pelo OCR.space sem chave)
+DEMO_TEXT = """
+        04/12/2024
+        08:00 12:00 13:00 17:00
+        05/12/2024
+        08:30 12:00 13:00 17:30
+        06/12/2024
+        09:00 12:00 13:00 18:00
+        """
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class OCRError(Exception):
+    """Erro devolvido pelo OCR.space ao processar uma imagem."""
+
+
+def get_session():
+    """Retorna a sessão HTTP compartilhada, criando-a na primeira chamada."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['POST']),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def ocr_space_api(image_bytes, api_key, filename='image.png', url=None, timeout=TIMEOUT):
+    """
+    Envia a imagem para OCR.space e retorna o texto extraído.
+
+    Sem api_key retorna DEMO_TEXT. Erros de rede são propagados como
+    requests.RequestException e erros de processamento como OCRError.
+    """
+    if not api_key:
+        return DEMO_TEXT
+
+    count('ocr.chamadas')
+    count('ocr.bytes_enviados', len(image_bytes))
+    payload = {
+        'isOverlayRequired': False,
+        'apikey': api_key,
+        'language': 'por',
+    }
+    files = {
+        'file': (filename, image_bytes),
+    }
+    with stage('ocr.requisicao'):
+        response = get_session().post(url or OCR_SPACE_URL, data=payload, files=files, timeout=timeout)
+        response.raise_for_status()
+        result = response.json()
+    if result.get('IsErroredOnProcessing'):
+        raise OCRError(result.get('ErrorMessage') or 'Falha no processamento do OCR')
+    parsed_results = result.get('ParsedResults')
+    if parsed_results:
+        return parsed_results[0]['ParsedText']
+    return ''
+
+
+class OCRBackend(abc.ABC):
+    """Interface dos motores de OCR: recognize(bytes da imagem, nome) devolve o texto."""
+
+    name = ''
+
+    # Reconhecimentos simultâneos em ocr_many
+    max_workers = 1
+
+    # Se o texto pode ir para o cache e para a base local (não vale para a demonstração)
+    persistent = True
+
+    @abc.abstractmethod
+    def recognize(self, image_bytes, filename='image.png'):
+        """Texto reconhecido na imagem; levanta OCRError se o motor não consegue ler."""
+
+    def available(self):
+        """Se o motor pode ser usado nesta máquina (chave configurada, executável instalado...)."""
+        return True
+
+    def cache_key(self, content_hash):
+        """Chave do texto no cache_ocr: o mesmo arquivo tem um texto por motor."""
+        return f"{content_hash}-{self.name}"
+
+    def for_cells(self):
+        """Motor para imagens de uma célula só (uma linha curta de texto)."""
+        return self
+
+
+class OCRSpaceBackend(OCRBackend):
+    """API do OCR.space (ocr_space_api)."""
+
+    name = 'ocrspace'
+    max_workers = MAX_WORKERS
+
+    def __init__(self, api_key, url=None, timeout=TIMEOUT):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+
+    def recognize(self, image_bytes, filename='image.png'):
+        return ocr_space_api(image_bytes, self.api_key, filename=filename, url=self.url, timeout=self.timeout)
+
+    def available(self):
+        return bool(self.api_key)
+
+    def cache_key(self, content_hash):
+        # Mesmas chaves de antes dos outros motores, para aproveitar os caches em disco
+        return content_hash
+
+
+class TesseractBackend(OCRBackend):
+    """Tesseract local, um subprocess por imagem (as imagens vão pela entrada padrão)."""
+
+    name = 'tesseract'
+
+    def __init__(self, cmd=None, lang=TESSERACT_LANG, psm=TESSERACT_PSM, timeout=TESSERACT_TIMEOUT):
+        self.cmd = cmd or TESSERACT_CMD
+        self.lang = lang
+        self.psm = psm
+        self.timeout = timeout
+        # Cada chamada usa um núcleo (OMP_THREAD_LIMIT=1); o paralelismo vem de várias chamadas
+        self.max_workers = os.cpu_count() or 1
+
+    def recognize(self, image_bytes, filename='image.png'):
+        count('ocr.chamadas')
+        count('ocr.bytes_enviados', len(image_bytes))
+        command = [self.cmd, 'stdin', 'stdout', '-l', self.lang, '--psm', str(self.psm)]
+        with stage('ocr.tesseract'):
+            try:
+                result = subprocess.run(
+                    command, input=image_bytes, capture_output=True, timeout=self.timeout,
+                    env={**os.environ, 'OMP_THREAD_LIMIT': '1'}
+                )
+            except FileNotFoundError:
+                raise OCRError(f"Tesseract não encontrado ({self.cmd})")
+            except subprocess.TimeoutExpired:
+                raise OCRError(f"Tesseract passou de {self.timeout}s")
+        if result.returncode:
+            message = result.stderr.decode('utf-8', errors='replace').strip()
+            raise OCRError(message or f"Tesseract terminou com código {result.returncode}")
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def available(self):
+        return shutil.which(self.cmd) is not None
+
+    def for_cells(self):
+        # Modo 7: a imagem é uma única linha de texto
+        return TesseractBackend(self.cmd, self.lang, TESSERACT_LINE_PSM, self.timeout)
+
+
+class DemoBackend(OCRBackend):
+    """Devolve sempre DEMO_TEXT, sem ler a imagem."""
+
+    name = 'demo'
+    persistent = False
+
+    def recognize(self, image_bytes, filename='image.png'):
+        return DEMO_TEXT
+
+
+BACKENDS = {
+    'ocrspace': OCRSpaceBackend,
+    'tesseract': TesseractBackend,
+    'demo': DemoBackend,
+}
+
+
+def get_backend(name='', api_key='', **kwargs):
+    """
+    Motor de OCR pelo nome ('ocrspace', 'tesseract' ou 'demo').
+
+    Sem nome vale o comportamento de antes: OCR.space se há api_key e, sem
+    ela, a demonstração. kwargs vão para o construtor do motor (url e
+    timeout do OCR.space, cmd e lang do Tesseract...).
+    """
+    if not name:
+        name = 'ocrspace' if api_key else 'demo'
+    if name not in BACKENDS:
+        raise ValueError(f"Motor de OCR desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    if name == 'ocrspace':
+        if not api_key:
+            raise ValueError("O OCR.space precisa de uma chave da API")
+        return OCRSpaceBackend(api_key, **kwargs)
+    return BACKENDS[name](**kwargs)
+
+
+def ocr_many(images, api_key='', max_workers=None, on_done=None, filenames=None, backend=None, **kwargs):
+    """
+    Executa o OCR de várias imagens em paralelo, com no máximo max_workers
+    reconhecimentos simultâneos (padrão: o do motor).
+
+    images é uma lista de bytes e filenames, se informado, os nomes enviados
+    com cada uma (a extensão indica o formato ao OCR.space). backend é o
+    motor de OCR; sem ele, get_backend('', api_key, **kwargs). Retorna uma lista de tuplas (texto, erro) na
+    mesma ordem de images; erro é None quando o OCR deu certo. on_done(i, n)
+    é chamado na thread de quem chamou sempre que uma imagem termina (i é o
+    índice da imagem e n quantas já terminaram), útil para barras de progresso.
+    """
+    results = [None] * len(images)
+    if not images:
+        return results
+
+    backend = backend or get_backend('', api_key, **kwargs)
+    max_workers = max_workers or backend.max_workers
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(images)))) as executor:
+        futures = {}
+        for i, image_bytes in enumerate(images):
+            filename = filenames[i] if filenames else 'image.png'
+            # O coletor de diagnóstico de quem chamou vale também nas threads
+            futures[submit_in_context(executor, backend.recognize, image_bytes, filename)] = i
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = (future.result(), None)
+            except Exception as e:
+                # Qualquer falha (rede, JSON fora do formato, erro do motor) fica só nesta imagem
+                results[i] = ('', e)
+            if on_done:
+                on_done(i, done)
+    return results
@@ -0,0 +1,276 @@
+"""
+Processamento em lote, sem interface, de pastas com formulários PSC.
+
+Lê planilhas Excel e imagens (OCR) em paralelo com um pool de processos e grava
+a planilha consolidada com as mesmas abas do app (Detalhes, Resumo, Totais
+Semanais e Totais Mensais, por pessoa e o acompanhamento da PSC).
+
+Uso:
+    python processar_lote.py formularios/
+    python processar_lote.py "formularios/**/*.xlsx" -o relatorio.xlsx --workers 8
+    python processar_lote.py formularios/ --banco horas_psc.sqlite3
+    python processar_lote.py formularios/ --diagnostico tempos.json
+    python processar_lote.py formularios/ --workers 0 --perfil lote.prof
+    python processar_lote.py fotos/ --ocr tesseract
+    python processar_lote.py fotos/ --ocr tesseract --recorte grade
+    python processar_lote.py formularios/ --horas-exigidas 240 --minimo-semanal 7
+
+Com --banco, arquivos já guardados na base local (mesmo conteúdo) são lidos de
+lá em vez de reprocessados, e os novos são acrescentados a ela.
+
+--diagnostico grava em JSON o tempo de cada etapa (leitura do Excel, preparo da
+imagem, OCR, cálculo, gravação do relatório...) somado entre os processos, os
+contadores de linhas, bytes e chamadas ao OCR e o tempo de cada arquivo.
+--perfil grava um perfil do cProfile (.prof) ou do pyinstrument (.html/.txt,
+se instalado); use com --workers 0 para o processamento entrar no perfil.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+
+import pandas as pd
+
+import diagnostico
+import grade
+import ocr
+from agregacao import IncrementalAggregator
+from armazenamento import get_store
+from cache_ocr import content_key
+from calculo_horas import default_person, hours_frames
+from cumprimento import REQUIRED_HOURS, WEEKLY_MINIMUM
+from exportacao import FORMATS, REPORT_FILENAME, report_sheets, write_report
+from leitura_excel import process_excel_file
+from leitura_ocr import parse_time_data_report
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def collect_files(patterns):
+    """Expande pastas e padrões glob na lista ordenada de arquivos suportados."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '**', '*')
+        for path in glob.glob(pattern, recursive=True):
+            if path.lower().endswith(EXCEL_EXTENSIONS + IMAGE_EXTENSIONS) and os.path.isfile(path):
+                paths.add(path)
+    return sorted(paths)
+
+
+def process_file(path, backend=None, ocr_mode='imagem'):
+    """
+    Processa um arquivo e retorna um dict com o resultado e o tempo gasto.
+
+    backend é o motor de OCR das imagens (padrão: ocr.get_backend()) e
+    ocr_mode o recorte enviado a ele (grade.MODES). Roda
+    dentro dos processos do pool, então erros viram parte do resultado em vez
+    de interromper o lote. Os tempos das etapas deste arquivo voltam em
+    result['diagnostics'].
+    """
+    with diagnostico.collecting() as diag:
+        result = _process_file(path, backend or ocr.get_backend(), ocr_mode)
+    result['diagnostics'] = diag.to_dict()
+    return result
+
+
+def _process_file(path, backend, ocr_mode):
+    start = time.perf_counter()
+    result = {
+        'path': path, 'rows': 0, 'total': 0.0, 'malformed': [], 'df': None, 'dated': None,
+        'error': None, 'stored': False,
+    }
+    try:
+        if path.lower().endswith(EXCEL_EXTENSIONS):
+            raw_data = process_excel_file(path, person=default_person(path))
+        else:
+            with open(path, 'rb') as f:
+                image = f.read()
+            text, error = grade.recognize_many([image], backend, ocr_mode)[0]
+            if error is not None:
+                raise error
+            raw_data, result['malformed'] = parse_time_data_report(text, default_person(path))
+
+        if len(raw_data):
+            df, dated = hours_frames(raw_data)
+            df.attrs.update(getattr(raw_data, 'attrs', {}))
+            _fill_result(result, df, dated)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _fill_result(result, df, dated):
+    result['rows'] = len(df)
+    result['total'] = float(df['Horas/Dia'].sum())
+    result['df'] = df
+    result['dated'] = dated
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return content_key(f.read())
+
+
+def _report(result):
+    if result['error']:
+        status = f"ERRO {result['error']}"
+    else:
+        status = f"{result['rows']} linha(s), {result['total']:.2f} h" + (" (base local)" if result['stored'] else "")
+    print(f"{result['seconds']:8.3f}s  {result['path']}  {status}", file=sys.stderr)
+
+
+def run_batch(paths, output, workers=None, backend=None, fmt='xlsx', db_path=None, diagnostics=None, ocr_mode='imagem',
+              required_hours=REQUIRED_HOURS, weekly_minimum=WEEKLY_MINIMUM):
+    """
+    Processa os arquivos em paralelo e grava o relatório no formato fmt.
+
+    Com db_path, arquivos já guardados na base local são lidos dela e os
+    novos são guardados lá (imagens só se o motor de OCR não for o de
+    demonstração). backend é o motor de OCR (padrão: ocr.get_backend()) e
+    ocr_mode o recorte das imagens (grade.MODES). workers=0 processa tudo no próprio processo, sem pool.
+    required_hours e weekly_minimum vão para as abas do acompanhamento da PSC.
+    diagnostics, se informado, recebe os tempos e contadores de todos os
+    arquivos. Retorna (resultados por arquivo, arquivos gravados).
+    """
+    diagnostics = diagnostics or diagnostico.Diagnostics()
+    with diagnostico.collecting(diagnostics):
+        return _run_batch(paths, output, workers, backend or ocr.get_backend(), fmt, db_path, diagnostics, ocr_mode,
+                          required_hours, weekly_minimum)
+
+
+def _run_batch(paths, output, workers, backend, fmt, db_path, diagnostics, ocr_mode, required_hours, weekly_minimum):
+    results = []
+    store = get_store(db_path) if db_path else None
+    hashes = {}
+    pending = []
+    for path in paths:
+        if store is None:
+            pending.append(path)
+            continue
+        start = time.perf_counter()
+        hashes[path] = _file_hash(path)
+        loaded = store.load(hashes[path])
+        if loaded is None:
+            pending.append(path)
+            continue
+        df, dated, malformed = loaded
+        result = {'path': path, 'malformed': malformed, 'error': None, 'stored': True}
+        _fill_result(result, df, dated)
+        result['seconds'] = time.perf_counter() - start
+        results.append(result)
+        _report(result)
+
+    with ExitStack() as stack:
+        if workers == 0:
+            done = (process_file(path, backend, ocr_mode) for path in pending)
+        else:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            futures = [executor.submit(process_file, path, backend, ocr_mode) for path in pending]
+            done = (future.result() for future in as_completed(futures))
+        for result in done:
+            diagnostics.merge(result.pop('diagnostics'))
+            results.append(result)
+            _report(result)
+            is_image = not result['path'].lower().endswith(EXCEL_EXTENSIONS)
+            if store is not None and result['rows'] and (backend.persistent or not is_image):
+                # Só o processo principal grava na base
+                store.save(hashes[result['path']], os.path.basename(result['path']),
+                           'ocr' if is_image else 'excel', result['df'], result['malformed'])
+
+    # Mesma ordem dos arquivos de entrada, independente de qual terminou primeiro
+    order = {path: i for i, path in enumerate(paths)}
+    results.sort(key=lambda r: order[r['path']])
+
+    frames = {r['path']: r['dated'] for r in results if r['dated'] is not None and len(r['dated'])}
+    if not frames:
+        return results, []
+
+    total_geral = sum(r['total'] for r in results)
+    full_df = pd.concat(frames.values()).sort_values('Data', kind='stable')
+    full_df['Semana'] = full_df['Data'].dt.to_period('W')
+    aggregator = IncrementalAggregator()
+    aggregator.sync(frames)
+    sheets = report_sheets(full_df, total_geral, aggregator, required_hours, weekly_minimum)
+    written = write_report(sheets, output, fmt)
+    return results, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('entradas', nargs='+', help='Pastas ou padrões glob com planilhas e imagens')
+    parser.add_argument('-o', '--saida', default=REPORT_FILENAME, help=f'Planilha gerada (padrão: {REPORT_FILENAME})')
+    parser.add_argument('--formato', choices=FORMATS, default='xlsx',
+                        help='xlsx (padrão), ou csv/parquet: um arquivo por aba com o prefixo de --saida')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processos em paralelo (padrão: núcleos da máquina; 0 = sem pool, no próprio processo)')
+    parser.add_argument('--banco', default=None,
+                        help='Base SQLite com os arquivos já processados (lidos dela e acrescentados a ela)')
+    parser.add_argument('--diagnostico', metavar='ARQUIVO.json', default=None,
+                        help='Grava os tempos por etapa e os contadores do lote em JSON')
+    parser.add_argument('--perfil', metavar='ARQUIVO', default=None,
+                        help='Perfila a execução (cProfile .prof, ou pyinstrument .html se instalado)')
+    parser.add_argument('--api-key', default=os.environ.get('OCR_SPACE_API_KEY', ''),
+                        help='Chave do OCR.space (padrão: variável OCR_SPACE_API_KEY)')
+    parser.add_argument('--ocr', choices=list(ocr.BACKENDS), default='',
+                        help='Motor de OCR das imagens (padrão: ocrspace com a chave, demo sem ela)')
+    parser.add_argument('--recorte', choices=grade.MODES, default='imagem',
+                        help='Parte da imagem enviada ao OCR: inteira (padrão), só a tabela ou célula a célula')
+    parser.add_argument('--horas-exigidas', type=float, default=REQUIRED_HOURS,
+                        help='Horas de PSC exigidas por pessoa, para a previsão de término (padrão: sem meta)')
+    parser.add_argument('--minimo-semanal', type=float, default=WEEKLY_MINIMUM,
+                        help=f'Semanas com menos horas que isso são marcadas (padrão: {WEEKLY_MINIMUM:g})')
+    args = parser.parse_args(argv)
+
+    paths = collect_files(args.entradas)
+    if not paths:
+        parser.error('nenhuma planilha ou imagem encontrada')
+    try:
+        backend = ocr.get_backend(args.ocr, args.api_key)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(not p.lower().endswith(EXCEL_EXTENSIONS) for p in paths) and not backend.available():
+        parser.error(f"motor de OCR '{backend.name}' indisponível nesta máquina")
+
+    diag = diagnostico.Diagnostics()
+    start = time.perf_counter()
+    if args.perfil:
+        with diagnostico.profiled() as profile:
+            results, written = run_batch(
+                paths, args.saida, args.workers, backend, args.formato, args.banco, diag, args.recorte,
+                args.horas_exigidas, args.minimo_semanal
+            )
+        profile.save(args.perfil)
+    else:
+        results, written = run_batch(paths, args.saida, args.workers, backend, args.formato, args.banco, diag, args.recorte,
+                                     args.horas_exigidas, args.minimo_semanal)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for r in results if r['error'])
+    rows = sum(r['rows'] for r in results)
+    print(f"✅ {len(results)} arquivo(s), {rows} linha(s), {errors} erro(s) em {elapsed:.2f}s", file=sys.stderr)
+    for path in written:
+        print(f"📊 Relatório gravado em {path}", file=sys.stderr)
+    if args.diagnostico:
+        report = diag.to_dict()
+        report['seconds'] = elapsed
+        report['files'] = [
+            {'path': r['path'], 'seconds': r['seconds'], 'rows': r['rows'], 'stored': r['stored'], 'error': r['error']}
+            for r in results
+        ]
+        with open(args.diagnostico, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"🩺 Diagnóstico gravado em {args.diagnostico}", file=sys.stderr)
+    if args.perfil:
+        print(f"🩺 Perfil gravado em {args.perfil}", file=sys.stderr)
+    return 1 if errors == len(results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,443 @@
+"""
+Formato compacto e tipado das linhas de horário.
+
+Os leitores de Excel e de OCR produzem uma linha por dia já neste formato, e
+o cálculo das horas, a agregação, a base local e a exportação partem dele sem
+voltar a interpretar texto:
+
+  - Dia: int32 com os dias desde 1970-01-01 (MISSING_DAY se a data é inválida);
+  - Entrada, Início Intervalo, Fim Intervalo, Saída: int16 com os minutos
+    desde a meia-noite (MISSING_MINUTES se ausente ou ilegível);
+  - Minutos: int16 com os minutos trabalhados no dia, somados de todas as
+    batidas (0 fora dos dias trabalhados);
+  - Situação: categoria 'trabalhado' (Entrada e Saída válidas), 'feriado' ou
+    'invalido';
+  - Pessoa: categoria com quem preencheu o formulário.
+
+Um dia pode ter qualquer número de batidas (entrada, saída, entrada, saída...).
+Elas circulam como um par irregular (minutos, offsets): minutos é um array só
+com as batidas de todos os dias em sequência e as do dia i ficam em
+minutos[offsets[i]:offsets[i + 1]]. Os quatro horários da linha resumem as
+batidas (a primeira, a segunda, a penúltima e a última) e Minutos sai delas
+por somas segmentadas do NumPy, sem laço por dia. Um par cuja saída é menor
+que a entrada atravessou a meia-noite. As batidas de um dia andam para a frente
+e voltam no relógio no máximo uma vez (a meia-noite), num período de até
+MAX_OVERNIGHT_MINUTES nesse caso; um dia fora dessa ordem (ordered_days) é
+'invalido' e vale 0.
+
+As conversões aceitam tanto texto quanto as células nativas das planilhas
+(datetime, time, frações do dia e números de série do Excel); o texto é só o
+caso de reserva. Texto só volta a aparecer para exibição (display_frame), por
+tabelas de consulta: uma coluna de horários tem no máximo 1440 valores
+distintos.
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Colunas de horário, na ordem do dia
+TIME_COLUMNS = ['Entrada', 'Início Intervalo', 'Fim Intervalo', 'Saída']
+
+RECORD_COLUMNS = ['Dia'] + TIME_COLUMNS + ['Minutos', 'Situação', 'Pessoa']
+
+# Valores usados para data e horário ausentes ou inválidos
+MISSING_DAY = np.iinfo(np.int32).min
+MISSING_MINUTES = -1
+
+WORKED = 'trabalhado'
+HOLIDAY = 'feriado'
+INVALID = 'invalido'
+STATUS_DTYPE = pd.CategoricalDtype([WORKED, HOLIDAY, INVALID])
+
+DATE_FORMAT = '%d/%m/%Y'
+
+# Formatos de data em texto reconhecidos por detect_date_format, na ordem de preferência
+DATE_FORMATS = (DATE_FORMAT, '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y')
+
+# Valores distintos testados por detect_date_format
+DATE_FORMAT_SAMPLE = 50
+
+# Dia 0 dos números de série de datas do Excel (1899-12-30) em dias desde 1970-01-01
+EXCEL_EPOCH_DAYS = -25569
+
+SECONDS_PER_DAY = 24 * 60 * 60
+MINUTES_PER_DAY = 24 * 60
+
+# Período mais longo (min), da primeira à última batida, aceito num dia que
+# atravessa a meia-noite; mais longo que isso é erro de digitação ou de leitura
+MAX_OVERNIGHT_MINUTES = 16 * 60
+
+# 'HH:MM' de cada minuto do dia; o último elemento ('') atende MISSING_MINUTES (índice -1)
+_MINUTE_TEXT = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)] + [''], dtype=object)
+
+
+def _parse_hhmm(value):
+    """Converte um único valor 'HH:MM' (ou 'HH:MM:SS') em minutos desde a meia-noite (ou MISSING_MINUTES)."""
+    if not isinstance(value, str):
+        return MISSING_MINUTES
+    hora, sep, resto = value.partition(':')
+    minuto, _, segundo = resto.partition(':')
+    if not sep or not (1 <= len(hora) <= 2) or not (1 <= len(minuto) <= 2) or len(segundo) > 2:
+        return MISSING_MINUTES
+    if not (hora.isdigit() and minuto.isdigit() and (segundo.isdigit() or segundo == '')):
+        return MISSING_MINUTES
+    h, m = int(hora), int(minuto)
+    if h > 23 or m > 59 or (segundo and int(segundo) > 59):
+        return MISSING_MINUTES
+    return h * 60 + m
+
+
+def _fraction_minutes(fractions):
+    """
+    Frações do dia do Excel (0.5 = 12:00) em minutos. Números fora de [0, 1)
+    não são horários (um 8 digitado sem os minutos, um número de série de
+    data) e viram MISSING_MINUTES. Arredonda ao segundo antes de descartar os
+    segundos, para 0.3333... virar 08:00 e não 07:59.
+    """
+    fractions = np.asarray(fractions, dtype=np.float64)
+    valid = np.isfinite(fractions) & (fractions >= 0) & (fractions < 1)
+    seconds = np.round(np.where(valid, fractions, 0) * SECONDS_PER_DAY).astype(np.int64) % SECONDS_PER_DAY
+    return np.where(valid, seconds // 60, MISSING_MINUTES).astype(np.int16)
+
+
+def _cell_minutes(value):
+    """Minutos de um valor de célula: texto, time, datetime, timedelta ou fração do dia."""
+    if isinstance(value, str):
+        return _parse_hhmm(value.strip())
+    if isinstance(value, (datetime, time)):
+        return value.hour * 60 + value.minute
+    if isinstance(value, timedelta):
+        seconds = value.total_seconds()
+        return int(seconds // 60) if 0 <= seconds < SECONDS_PER_DAY else MISSING_MINUTES
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return int(_fraction_minutes([value])[0])
+    return MISSING_MINUTES
+
+
+def time_to_minutes(values):
+    """
+    Converte uma coluna de horários em um array int16 de minutos.
+
+    Colunas de datetime e de números (frações do dia do Excel) são convertidas
+    direto no NumPy. Nas demais, cada valor distinto ('HH:MM', time da
+    planilha...) é interpretado uma única vez (uma coluna de horários tem no
+    máximo 1440 valores válidos), e o resultado é espalhado para todas as
+    linhas com indexação do NumPy. Valores ausentes ou inválidos viram
+    MISSING_MINUTES.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        minutes = (series.dt.hour * 60 + series.dt.minute).to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.where(np.isnan(minutes), MISSING_MINUTES, minutes).astype(np.int16)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return _fraction_minutes(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+    parsed = np.fromiter((_cell_minutes(u) for u in uniques), dtype=np.int16, count=len(uniques))
+    # Código -1 (NaN) cai no último elemento, que é o sentinela
+    lookup = np.append(parsed, np.int16(MISSING_MINUTES))
+    return lookup[codes]
+
+
+def _serial_days(serials):
+    """Números de série de datas do Excel (dias desde 1899-12-30) em dias desde 1970-01-01."""
+    serials = np.asarray(serials, dtype=np.float64)
+    valid = np.isfinite(serials) & (serials >= 1)
+    return np.where(valid, np.floor(np.where(valid, serials, 0)) + EXCEL_EPOCH_DAYS, MISSING_DAY).astype(np.int32)
+
+
+def _cell_days(value):
+    """Dias de uma célula de data nativa (date, datetime ou número de série), ou MISSING_DAY."""
+    if isinstance(value, (date, np.datetime64)):
+        return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return int(_serial_days([value])[0])
+    return MISSING_DAY
+
+
+def detect_date_format(values, formats=DATE_FORMATS, sample=DATE_FORMAT_SAMPLE):
+    """
+    Formato (de formats) que lê mais datas entre os primeiros `sample` textos
+    distintos de values; DATE_FORMAT se nenhum texto é data, None se values
+    não tem texto (só células nativas ou vazias).
+    """
+    distinct = pd.unique(pd.Series(values, dtype=object).dropna())
+    texts = pd.Series([v.strip() for v in distinct if isinstance(v, str)][:sample], dtype=object)
+    if not len(texts):
+        return None
+    hits = [pd.to_datetime(texts, format=fmt, errors='coerce').notna().sum() for fmt in formats]
+    best = int(np.argmax(hits))
+    return formats[best] if hits[best] else DATE_FORMAT
+
+
+def dates_to_days(values, fmt=DATE_FORMAT):
+    """
+    Converte uma coluna de datas em dias int32 desde 1970-01-01.
+
+    Aceita células nativas (datetime, date, números de série do Excel) e texto
+    no formato fmt (ver detect_date_format). Colunas de datetime e de números
+    são convertidas direto no NumPy; nas demais, cada valor distinto é
+    interpretado uma única vez.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series.dt.tz_localize(None) if series.dt.tz is not None else series
+        parsed = parsed.to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(parsed)
+        days = np.where(valid, parsed.astype('datetime64[D]').astype(np.int64), MISSING_DAY)
+        return days.astype(np.int32)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return _serial_days(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+    lookup = np.full(len(uniques) + 1, MISSING_DAY, dtype=np.int32)
+    is_text = np.fromiter((isinstance(u, str) for u in uniques), dtype=bool, count=len(uniques))
+    if is_text.any():
+        parsed = pd.to_datetime(pd.Series(uniques[is_text], dtype=object).str.strip(), format=fmt, errors='coerce').to_numpy()
+        valid = ~np.isnat(parsed)
+        text_days = np.full(len(parsed), MISSING_DAY, dtype=np.int32)
+        text_days[valid] = parsed[valid].astype('datetime64[D]').astype(np.int64)
+        lookup[:-1][is_text] = text_days
+    if not is_text.all():
+        lookup[:-1][~is_text] = [_cell_days(u) for u in uniques[~is_text]]
+    return lookup[codes]
+
+
+def days_to_datetime(days):
+    """Dias int32 em datetime64 (NaT para MISSING_DAY)."""
+    days = np.asarray(days, dtype=np.int64)
+    missing = days == MISSING_DAY
+    dates = np.where(missing, 0, days).astype('datetime64[D]').astype('datetime64[ns]')
+    dates[missing] = np.datetime64('NaT')
+    return dates
+
+
+def format_days(days, fmt=DATE_FORMAT):
+    """Dias int32 como texto ('' para MISSING_DAY), formatando cada dia distinto uma vez."""
+    codes, uniques = pd.factorize(np.asarray(days))
+    text = pd.Series(days_to_datetime(uniques)).dt.strftime(fmt).fillna('').to_numpy(dtype=object)
+    return text[codes]
+
+
+def format_minutes(minutes):
+    """Minutos int16 como 'HH:MM' ('' para MISSING_MINUTES)."""
+    return _MINUTE_TEXT[np.asarray(minutes)]
+
+
+def is_holiday(values):
+    """Textos que marcam o dia como feriado (ex.: 'Feriado' no lugar da Entrada)."""
+    text = pd.Series(values, dtype=object)
+    if pd.api.types.infer_dtype(text, skipna=True) not in ('string', 'mixed', 'mixed-integer', 'empty'):
+        # Coluna só de células nativas (horários, números): nenhum texto
+        return np.zeros(len(text), dtype=bool)
+    return text.str.contains(HOLIDAY, case=False, na=False).to_numpy()
+
+
+def _categorical(values, n):
+    if values is None or isinstance(values, str):
+        categories = [values or '']
+        return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=categories)
+    return pd.Categorical(pd.Series(values, dtype=object).fillna(''))
+
+
+def make_records(dates, entrada, inicio_intervalo, fim_intervalo, saida, pessoa=None, holiday=None,
+                 date_format=DATE_FORMAT):
+    """
+    Monta as linhas compactas a partir das colunas de um leitor.
+
+    dates e os horários são sequências do mesmo tamanho, de texto ou de
+    células nativas da planilha (datas em texto no formato date_format);
+    pessoa é uma sequência ou um único nome para todas as linhas. holiday
+    marca os dias de feriado; sem ele, vale o texto 'Feriado' na Entrada.
+    """
+    minutes = [time_to_minutes(values) for values in (entrada, inicio_intervalo, fim_intervalo, saida)]
+    if holiday is None:
+        holiday = is_holiday(entrada)
+    # As batidas presentes, na ordem das colunas; um intervalo pela metade
+    # deixa o dia com número ímpar de batidas e vale da Entrada à Saída
+    punches = punches_from_columns(minutes)
+    return _build_records(
+        dates_to_days(dates, date_format), minutes, worked_minutes(punches), pessoa, holiday, ordered_days(punches)
+    )
+
+
+def make_punch_records(dates, punches, pessoa=None, holiday=None, date_format=DATE_FORMAT, complete=None):
+    """
+    Linhas compactas a partir das batidas irregulares (minutos, offsets) de
+    cada dia, para leitores com qualquer número de pares entrada/saída.
+
+    Os horários da linha são o resumo de summary_columns e Minutos soma todos
+    os pares. holiday marca os dias de feriado (sem batidas). complete marca
+    os dias cujas batidas formam pares completos; os demais ficam 'invalido'.
+    """
+    columns = summary_columns(punches)
+    if holiday is None:
+        holiday = np.zeros(len(columns[0]), dtype=bool)
+    consistent = ordered_days(punches)
+    if complete is not None:
+        consistent &= np.asarray(complete, dtype=bool)
+    return _build_records(
+        dates_to_days(dates, date_format), columns, worked_minutes(punches), pessoa, holiday, consistent
+    )
+
+
+def _build_records(days, minutes, worked, pessoa, holiday, consistent):
+    valid = (minutes[0] != MISSING_MINUTES) & (minutes[3] != MISSING_MINUTES) & consistent
+    status = np.where(valid, 0, np.where(holiday, 1, 2)).astype(np.int8)
+
+    records = pd.DataFrame(dict(zip(TIME_COLUMNS, minutes)))
+    records.insert(0, 'Dia', days)
+    records['Minutos'] = np.where(valid, np.minimum(worked, np.iinfo(np.int16).max), 0).astype(np.int16)
+    records['Situação'] = pd.Categorical.from_codes(status, dtype=STATUS_DTYPE)
+    records['Pessoa'] = _categorical(pessoa, len(days))
+    return records
+
+
+def empty_records():
+    """Tabela de linhas compactas sem nenhuma linha."""
+    return make_records([], [], [], [], [])
+
+
+def _offsets(counts):
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def punches_from_counts(minutes, counts):
+    """
+    Batidas (minutos, offsets) a partir de todas as batidas em sequência e de
+    quantas são de cada dia. Batidas ilegíveis (MISSING_MINUTES) no meio do dia
+    são descartadas, como um intervalo em branco; na primeira ou na última
+    posição elas ficam, e o dia sai sem Entrada ou Saída válida.
+    """
+    minutes = np.asarray(minutes, dtype=np.int16)
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = _offsets(counts)
+    day = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(minutes)) - offsets[:-1][day]
+    keep = (minutes != MISSING_MINUTES) | (position == 0) | (position == counts[day] - 1)
+    if keep.all():
+        return minutes, offsets
+    return minutes[keep], _offsets(np.bincount(day[keep], minlength=len(counts)))
+
+
+def select_days(punches, mask):
+    """Batidas (minutos, offsets) só dos dias marcados em mask."""
+    minutes, offsets = punches
+    counts = np.diff(offsets)
+    mask = np.asarray(mask, dtype=bool)
+    return np.asarray(minutes)[np.repeat(mask, counts)], _offsets(counts[mask])
+
+
+def punches_from_columns(columns):
+    """
+    Batidas (minutos, offsets) a partir de colunas de minutos do mesmo
+    tamanho, na ordem do dia (Entrada 1, Saída 1, Entrada 2...). Horários
+    ausentes (MISSING_MINUTES) são descartados.
+    """
+    matrix = np.column_stack([np.asarray(col, dtype=np.int16) for col in columns])
+    present = matrix != MISSING_MINUTES
+    # A seleção por máscara percorre a matriz linha a linha: as batidas saem dia após dia
+    return matrix[present], _offsets(present.sum(axis=1))
+
+
+def _steps(punches):
+    """
+    Passos entre batidas consecutivas do mesmo dia, como (dia, minutos do
+    passo); passos que envolvem uma batida ilegível (MISSING_MINUTES) ficam de
+    fora.
+    """
+    minutes, offsets = punches
+    minutes = np.asarray(minutes, dtype=np.int32)
+    counts = np.diff(offsets)
+    day = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(minutes)) - offsets[:-1][day]
+    step = np.flatnonzero(position[:-1] < counts[day[:-1]] - 1)
+    step = step[(minutes[step] != MISSING_MINUTES) & (minutes[step + 1] != MISSING_MINUTES)]
+    return day[step], minutes[step + 1] - minutes[step]
+
+
+def ordered_days(punches):
+    """
+    Dias cujas batidas estão em ordem: andam para a frente e voltam no
+    relógio no máximo uma vez (a meia-noite), e nesse caso o período da
+    primeira à última batida é de até MAX_OVERNIGHT_MINUTES. Batidas
+    embaralhadas ou de dois dias juntos (a data do dia seguinte não foi lida)
+    não passam.
+    """
+    n = len(punches[1]) - 1
+    day, step = _steps(punches)
+    wraps = np.bincount(day[step < 0], minlength=n)
+    elapsed = np.bincount(day, weights=step % MINUTES_PER_DAY, minlength=n)
+    return (wraps == 0) | ((wraps == 1) & (elapsed <= MAX_OVERNIGHT_MINUTES))
+
+
+def worked_minutes(punches):
+    """
+    Minutos trabalhados em cada dia, somando os pares (entrada, saída) de
+    batidas consecutivas. Um dia com número ímpar de batidas (intervalo pela
+    metade) vale da primeira à última; com menos de duas, vale 0. Um par com a
+    saída antes da entrada atravessou a meia-noite e ganha um dia. Dias fora
+    de ordem (ordered_days) valem 0.
+    """
+    minutes, offsets = punches
+    minutes = np.asarray(minutes, dtype=np.int32)
+    counts = np.diff(offsets)
+    day = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(minutes)) - offsets[:-1][day]
+
+    # Início de cada par: posições pares dos dias com número par de batidas,
+    # e a primeira batida dos dias com número ímpar (par primeira-última)
+    pair_starts = np.flatnonzero((counts[day] % 2 == 0) & (position % 2 == 0))
+    odd_days = np.flatnonzero((counts % 2 == 1) & (counts >= 3))
+    first = np.concatenate([pair_starts, offsets[odd_days]])
+    last = np.concatenate([pair_starts + 1, offsets[odd_days + 1] - 1])
+
+    # Nos dias em ordem, um par que volta no relógio passou da meia-noite
+    spans = (minutes[last] - minutes[first]) % MINUTES_PER_DAY
+    # Soma segmentada: cada par vai para o total do seu dia
+    totals = np.bincount(day[first], weights=spans, minlength=len(counts))
+    return np.where(ordered_days(punches), totals, 0).astype(np.int32)
+
+
+def summary_columns(punches):
+    """
+    Os quatro horários da linha compacta a partir das batidas: Entrada é a
+    primeira, Saída a última (com duas ou mais), Início Intervalo a segunda
+    (com três ou mais) e Fim Intervalo a penúltima (com quatro ou mais).
+    """
+    minutes, offsets = punches
+    counts = np.diff(offsets)
+
+    def pick(index, present):
+        column = np.full(len(counts), MISSING_MINUTES, dtype=np.int16)
+        column[present] = minutes[index[present]]
+        return column
+
+    return [
+        pick(offsets[:-1], counts >= 1),
+        pick(offsets[:-1] + 1, counts >= 3),
+        pick(offsets[1:] - 2, counts >= 4),
+        pick(offsets[1:] - 1, counts >= 2),
+    ]
+
+
+def display_frame(df, date_text=True):
+    """
+    Versão para exibição: 'Data' no lugar de 'Dia' e horários como 'HH:MM'
+    (Minutos fica de fora; as horas do dia estão em Horas/Dia).
+
+    Com date_text=False a Data sai em datetime (para a exportação gravar datas
+    nativas do Excel). Colunas que não são do formato compacto (Horas/Dia,
+    Semana...) são mantidas; horários que já estão em texto ficam como estão.
+    """
+    shown = df.drop(columns=['Dia', 'Data', 'Minutos'], errors='ignore')
+    for col in TIME_COLUMNS:
+        if col in shown.columns and pd.api.types.is_integer_dtype(shown[col]):
+            shown[col] = format_minutes(shown[col].to_numpy())
+    if 'Dia' in df.columns:
+        days = df['Dia'].to_numpy()
+        shown.insert(0, 'Data', format_days(days) if date_text else days_to_datetime(days))
+    elif 'Data' in df.columns:
+        shown.insert(0, 'Data', df['Data'])
+    return shown
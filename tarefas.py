@@ -0,0 +1,392 @@
+"""
+Fila de tarefas em segundo plano para uploads grandes.
+
+Um lote de arquivos enviado vira uma tarefa guardada no SQLite (tabelas
+tarefas e tarefas_arquivos, no mesmo arquivo da base local). Uma thread do
+processo consome a fila em blocos de CHUNK_SIZE arquivos: planilhas pelo pool
+de leitura_paralela e imagens pelo motor de OCR configurado, com grade.recognize_many. Cada bloco
+concluído já aparece no estado da tarefa, então a interface acompanha o
+progresso e mostra os arquivos prontos sem esperar o lote inteiro.
+
+A fila é do processo, não da sessão: reruns do Streamlit e recargas da página
+não interrompem o processamento. Cancelar descarta os arquivos que ainda não
+começaram; o bloco em andamento termina normalmente. Se o app é reiniciado, os
+arquivos que estavam em processamento voltam para a fila.
+
+Os resultados ficam em memória e, pelas mesmas regras do app, na base local
+(armazenamento.py); arquivos que já estão na base nem entram na fila.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from armazenamento import get_store
+from cache_ocr import content_key
+from calculo_horas import default_person, hours_frames
+from leitura_ocr import parse_time_data_report
+
+# Arquivos entregues de uma vez ao pool; o cancelamento vale entre um bloco e outro
+CHUNK_SIZE = 8
+
+# Tarefas com resultados mantidos em memória (as mais recentes)
+MAX_KEPT_JOBS = 32
+
+# Segundos que close() espera o bloco em andamento terminar
+CLOSE_TIMEOUT = 5.0
+
+PENDING = 'pendente'
+RUNNING = 'processando'
+DONE = 'concluido'
+FAILED = 'erro'
+CANCELLED = 'cancelado'
+
+# Estados de uma tarefa que ainda vai mudar
+ACTIVE = (PENDING, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tarefas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    criada_em TEXT NOT NULL,
+    concluida_em TEXT
+);
+CREATE TABLE IF NOT EXISTS tarefas_arquivos (
+    tarefa INTEGER NOT NULL REFERENCES tarefas(id) ON DELETE CASCADE,
+    indice INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    conteudo BLOB,
+    estado TEXT NOT NULL,
+    erro TEXT,
+    linhas INTEGER,
+    total_horas REAL,
+    PRIMARY KEY (tarefa, indice)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tarefas_arquivos_estado ON tarefas_arquivos (estado, tarefa);
+"""
+# 'conteudo' guarda os bytes enviados só até o arquivo ser processado.
+
+
+def process_excel(files, ocr_backend=None, ocr_cache_dir='', ocr_mode='imagem'):
+    """Lê as planilhas (lista de (nome, bytes)); retorna (df, dated, malformed, erro) de cada uma."""
+    from leitura_paralela import parse_many
+
+    results = parse_many([(data, default_person(name)) for name, data in files])
+    return [(df, dated, [], error) for df, dated, error in results]
+
+
+def process_images(files, ocr_backend=None, ocr_cache_dir='', ocr_mode='imagem'):
+    """
+    OCR das imagens (lista de (nome, bytes)) com o recorte ocr_mode (grade.py);
+    retorna (df, dated, malformed, erro) de cada uma.
+    """
+    import cache_ocr
+    import grade
+    import ocr
+
+    backend = ocr_backend or ocr.get_backend()
+    cache = cache_ocr.get_cache(ocr_cache_dir)
+    keys = [grade.cache_key(backend, content_key(data), ocr_mode) for _, data in files]
+    texts = [cache.get(key) if backend.persistent else None for key in keys]
+    pending = [i for i, text in enumerate(texts) if text is None]
+    errors = [None] * len(files)
+    results = grade.recognize_many([files[i][1] for i in pending], backend, ocr_mode)
+    for i, (text, error) in zip(pending, results):
+        if error is not None:
+            errors[i] = f"Erro no OCR: {error}"
+        elif backend.persistent:
+            cache.put(keys[i], text)
+        texts[i] = text
+
+    outcomes = []
+    for (name, _), text, error in zip(files, texts, errors):
+        if error is not None:
+            outcomes.append((None, None, [], error))
+            continue
+        raw_data, malformed = parse_time_data_report(text, default_person(name))
+        df, dated = hours_frames(raw_data)
+        outcomes.append((df, dated, malformed, None))
+    return outcomes
+
+
+# Processamento de cada tipo de tarefa ('excel' ou 'image', como no app)
+PROCESSORS = {
+    'excel': process_excel,
+    'image': process_images,
+}
+
+
+class JobQueue:
+    """Fila de lotes de arquivos processados por uma thread em segundo plano."""
+
+    def __init__(self, path, store_path='', ocr_backend=None, ocr_cache_dir='', ocr_mode='imagem'):
+        self.path = path
+        self.store_path = store_path
+        self.ocr_backend = ocr_backend
+        self.ocr_cache_dir = ocr_cache_dir
+        self.ocr_mode = ocr_mode
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.executescript(SCHEMA)
+        # Arquivos que estavam em processamento quando o app parou voltam para a fila
+        with self._conn:
+            self._conn.execute('UPDATE tarefas_arquivos SET estado = ? WHERE estado = ?', (PENDING, RUNNING))
+        self._results = OrderedDict()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='tarefas', daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        Para a thread e fecha a conexão com o SQLite.
+
+        O bloco em andamento termina normalmente; se ele passa de timeout
+        segundos, a própria thread fecha a conexão quando acabar.
+        """
+        self._closed.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _store(self):
+        return get_store(self.store_path) if self.store_path else None
+
+    def _persistent_ocr(self):
+        # Sem motor configurado vale ocr.get_backend(), a demonstração
+        return self.ocr_backend is not None and self.ocr_backend.persistent
+
+    def submit(self, kind, files):
+        """
+        Coloca um lote na fila e retorna o id da tarefa.
+
+        kind é 'excel' ou 'image' e files uma lista de (nome, bytes). Arquivos
+        que já estão na base local entram como concluídos, sem reprocessar.
+        """
+        if kind not in PROCESSORS:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+        store = self._store()
+        rows = []
+        for i, (name, data) in enumerate(files):
+            key = content_key(data)
+            if store is not None and key in store:
+                rows.append((i, name, key, None, DONE))
+            else:
+                rows.append((i, name, key, data, PENDING))
+        with self._lock, self._conn:
+            job_id = self._conn.execute(
+                'INSERT INTO tarefas (tipo, estado, criada_em) VALUES (?, ?, ?)', (kind, PENDING, _now())
+            ).lastrowid
+            self._conn.executemany(
+                'INSERT INTO tarefas_arquivos (tarefa, indice, nome, hash, conteudo, estado) VALUES (?, ?, ?, ?, ?, ?)',
+                [(job_id, *row) for row in rows]
+            )
+            self._close_if_finished(job_id)
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancela a tarefa: os arquivos que ainda não começaram não são processados."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE tarefas_arquivos SET estado = ?, conteudo = NULL WHERE tarefa = ? AND estado = ?',
+                (CANCELLED, job_id, PENDING)
+            )
+            self._conn.execute(
+                'UPDATE tarefas SET estado = ?, concluida_em = ? WHERE id = ? AND estado IN (?, ?)',
+                (CANCELLED, _now(), job_id, *ACTIVE)
+            )
+
+    def status(self, job_id):
+        """Estado da tarefa e a contagem de arquivos por estado, ou None se ela não existe."""
+        with self._lock:
+            job = self._conn.execute(
+                'SELECT tipo, estado, criada_em, concluida_em FROM tarefas WHERE id = ?', (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                'SELECT estado, COUNT(*) FROM tarefas_arquivos WHERE tarefa = ? GROUP BY estado', (job_id,)
+            ).fetchall())
+        kind, state, created, finished = job
+        total = sum(counts.values())
+        return {
+            'tipo': kind, 'estado': state, 'criada_em': created, 'concluida_em': finished,
+            'total': total, 'feitos': counts.get(DONE, 0) + counts.get(FAILED, 0),
+            'erros': counts.get(FAILED, 0), 'cancelados': counts.get(CANCELLED, 0),
+        }
+
+    def files(self, job_id):
+        """Arquivos da tarefa, na ordem do envio, com o estado, as linhas e o total de horas de cada um."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT nome, estado, linhas, total_horas, erro FROM tarefas_arquivos '
+                'WHERE tarefa = ? ORDER BY indice',
+                (job_id,)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['Arquivo', 'Situação', 'Linhas', 'Total Horas', 'Erro'])
+
+    def results(self, job_id):
+        """
+        Resultado de cada arquivo concluído: (índice, nome, hash, df, dated, malformed, erro).
+
+        df vem da memória ou, se o app foi reiniciado, da base local; é None
+        se o arquivo deu erro ou se o resultado não foi guardado (ex.: texto
+        de demonstração do OCR).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT indice, nome, hash, estado, erro FROM tarefas_arquivos '
+                'WHERE tarefa = ? AND estado IN (?, ?) ORDER BY indice',
+                (job_id, DONE, FAILED)
+            ).fetchall()
+            kept = self._results.get(job_id, {})
+        store = self._store()
+        results = []
+        for i, name, key, state, error in rows:
+            frames = kept.get(i)
+            if frames is None and state == DONE and store is not None:
+                frames = store.load(key)
+            df, dated, malformed = frames if frames is not None else (None, None, [])
+            results.append((i, name, key, df, dated, malformed, error))
+        return results
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            claimed = self._claim()
+            if claimed is None:
+                self._wake.wait()
+                continue
+            job_id, kind, files = claimed
+            try:
+                self._process(job_id, kind, files)
+            except Exception as e:
+                # Um erro fora do processador (ao gravar, ao somar as horas) não pode
+                # parar a thread nem deixar o bloco preso em processamento
+                self._fail(job_id, files, f"{type(e).__name__}: {e}")
+        with self._lock:
+            self._conn.close()
+
+    def _process(self, job_id, kind, files):
+        try:
+            outcomes = PROCESSORS[kind](
+                [(name, data) for _, name, data in files], self.ocr_backend, self.ocr_cache_dir, self.ocr_mode
+            )
+        except Exception as e:
+            outcomes = [(None, None, [], f"{type(e).__name__}: {e}")] * len(files)
+        self._finish(job_id, kind, files, outcomes)
+
+    def _claim(self):
+        """Marca como em processamento o próximo bloco de arquivos da tarefa mais antiga."""
+        with self._lock, self._conn:
+            job = self._conn.execute(
+                'SELECT t.id, t.tipo FROM tarefas t WHERE t.estado IN (?, ?) AND EXISTS ('
+                'SELECT 1 FROM tarefas_arquivos a WHERE a.tarefa = t.id AND a.estado = ?) ORDER BY t.id LIMIT 1',
+                (*ACTIVE, PENDING)
+            ).fetchone()
+            if job is None:
+                return None
+            job_id, kind = job
+            files = self._conn.execute(
+                'SELECT indice, nome, conteudo FROM tarefas_arquivos WHERE tarefa = ? AND estado = ? '
+                'ORDER BY indice LIMIT ?',
+                (job_id, PENDING, CHUNK_SIZE)
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE tarefas_arquivos SET estado = ? WHERE tarefa = ? AND indice = ?',
+                [(RUNNING, job_id, i) for i, _, _ in files]
+            )
+            self._conn.execute('UPDATE tarefas SET estado = ? WHERE id = ? AND estado = ?', (RUNNING, job_id, PENDING))
+        return job_id, kind, files
+
+    def _finish(self, job_id, kind, files, outcomes):
+        """Guarda os resultados de um bloco e encerra a tarefa quando não sobra arquivo."""
+        store = self._store()
+        updates = []
+        kept = {}
+        for (i, name, data), (df, dated, malformed, error) in zip(files, outcomes):
+            if error is None and store is not None and len(df) and (kind == 'excel' or self._persistent_ocr()):
+                # Mesmas regras do app: texto de demonstração do OCR não vai para a base
+                try:
+                    store.save(content_key(data), name, 'ocr' if kind == 'image' else 'excel', df, malformed)
+                except sqlite3.Error as e:
+                    error = f"Erro ao gravar na base local: {e}"
+            if error is None:
+                kept[i] = (df, dated, malformed)
+                updates.append((DONE, None, len(df), float(df['Horas/Dia'].sum()), job_id, i))
+            else:
+                updates.append((FAILED, error, 0, 0.0, job_id, i))
+        with self._lock, self._conn:
+            self._results.setdefault(job_id, {}).update(kept)
+            self._results.move_to_end(job_id)
+            while len(self._results) > MAX_KEPT_JOBS:
+                self._results.popitem(last=False)
+            self._conn.executemany(
+                'UPDATE tarefas_arquivos SET estado = ?, erro = ?, linhas = ?, total_horas = ?, conteudo = NULL '
+                'WHERE tarefa = ? AND indice = ?',
+                updates
+            )
+            self._close_if_finished(job_id)
+
+    def _fail(self, job_id, files, error):
+        """Marca como erro os arquivos do bloco que ainda estão em processamento."""
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'UPDATE tarefas_arquivos SET estado = ?, erro = ?, linhas = 0, total_horas = 0.0, conteudo = NULL '
+                    'WHERE tarefa = ? AND indice = ? AND estado = ?',
+                    [(FAILED, error, job_id, i, RUNNING) for i, _, _ in files]
+                )
+                self._close_if_finished(job_id)
+        except sqlite3.Error:
+            # Sem conseguir gravar, o bloco fica em processamento e volta para a fila quando o app reinicia
+            pass
+
+    def _close_if_finished(self, job_id):
+        remaining = self._conn.execute(
+            'SELECT COUNT(*) FROM tarefas_arquivos WHERE tarefa = ? AND estado IN (?, ?)', (job_id, *ACTIVE)
+        ).fetchone()[0]
+        if not remaining:
+            self._conn.execute(
+                'UPDATE tarefas SET estado = ?, concluida_em = ? WHERE id = ? AND estado IN (?, ?)',
+                (DONE, _now(), job_id, *ACTIVE)
+            )
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(path, store_path='', ocr_backend=None, ocr_cache_dir='', ocr_mode='imagem'):
+    """
+    Fila compartilhada pelo processo (sobrevive aos reruns do Streamlit).
+
+    path é o SQLite da fila (':memory:' para não guardar entre execuções do
+    app), store_path a base local onde os resultados são gravados e
+    ocr_backend o motor de OCR das imagens (padrão: ocr.get_backend()) e
+    ocr_mode o recorte enviado a ele (grade.MODES).
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None or _queue.path != path:
+            if _queue is not None:
+                # Sem isso a thread e a conexão da fila antiga ficam abertas até o fim do processo
+                _queue.close()
+            _queue = JobQueue(path, store_path, ocr_backend, ocr_cache_dir, ocr_mode)
+        _queue.store_path, _queue.ocr_backend, _queue.ocr_cache_dir = store_path, ocr_backend, ocr_cache_dir
+        _queue.ocr_mode = ocr_mode
+        return _queue
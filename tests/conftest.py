@@ -0,0 +1,94 @@
+"""
+Servidor local que imita o OCR.space, para testar o cliente HTTP de ocr.py
+sem rede.
+
+Cada imagem enviada é um texto 'img-<n>:<modo>' que diz ao servidor como
+responder:
+
+  - 'ok': devolve 'img-<n>' como texto reconhecido;
+  - 'espera<ms>': o mesmo, depois de esperar <ms> milissegundos;
+  - 'indisponivel<k>': responde 503 às primeiras <k> requisições da imagem;
+  - 'erro': responde com IsErroredOnProcessing, como a API faz com uma
+    imagem que não consegue ler;
+  - 'malformado': responde um JSON sem o texto em ParsedResults.
+
+O servidor conta as requisições de cada imagem em `chamadas`.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ocr
+
+_IMAGE = re.compile(rb'img-(\d+):([a-z]+)(\d*)')
+
+
+class FakeOCRServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FakeOCRHandler)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/parse/image"
+
+
+class _FakeOCRHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        index, mode, arg = _IMAGE.search(body).groups()
+        index, mode = int(index), mode.decode()
+        with self.server.lock:
+            self.server.calls[index] += 1
+            call = self.server.calls[index]
+
+        if mode == 'espera':
+            time.sleep(int(arg) / 1000)
+        elif mode == 'indisponivel' and call <= int(arg):
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if mode == 'erro':
+            result = {'IsErroredOnProcessing': True, 'ErrorMessage': ['Imagem ilegível']}
+        elif mode == 'malformado':
+            result = {'IsErroredOnProcessing': False, 'ParsedResults': [{'TextOverlay': None}]}
+        else:
+            result = {'IsErroredOnProcessing': False, 'ParsedResults': [{'ParsedText': f"img-{index}"}]}
+        self._send_json(result)
+
+    def _send_json(self, result):
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente desistiu (timeout) antes da resposta
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_ocr_server(monkeypatch):
+    """Servidor falso em uma porta livre, com a sessão do ocr.py recriada sem espera entre tentativas."""
+    monkeypatch.setattr(ocr, 'BACKOFF_FACTOR', 0)
+    monkeypatch.setattr(ocr, '_session', None)
+    server = FakeOCRServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,96 @@
+"""Agregação incremental (agregacao.IncrementalAggregator) e por pessoa (person_stats) contra o pandas direto."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacao import IncrementalAggregator, person_stats
+
+
+def _file(seed, person, days=40):
+    """Consolidado de um arquivo: dias espalhados por dois meses, horas em quartos de hora (repetem, têm moda)."""
+    rng = np.random.default_rng(seed)
+    data = pd.Timestamp('2024-11-20') + pd.to_timedelta(np.sort(rng.integers(0, 60, days)), unit='D')
+    return pd.DataFrame({
+        'Data': data,
+        'Horas/Dia': rng.integers(0, 40, days) / 4,
+        'Pessoa': person,
+    })
+
+
+@pytest.fixture
+def files():
+    return {'a': _file(1, 'Ana'), 'b': _file(2, 'Bia'), 'c': _file(3, 'Ana', days=5)}
+
+
+def _expected(frames):
+    df = pd.concat(frames, ignore_index=True)
+    horas = df['Horas/Dia']
+    weekly = horas.groupby(df['Data'].dt.to_period('W')).sum()
+    monthly = horas.groupby(df['Data'].dt.to_period('M')).sum()
+    return (horas.mean(), horas.std(), horas.mode().min()), weekly, monthly
+
+
+def _check(aggregator, frames):
+    (mean, std, mode), weekly, monthly = _expected(frames)
+    got_mean, got_std, got_mode = aggregator.daily_stats()
+    assert got_mean == pytest.approx(mean)
+    assert got_std == pytest.approx(std)
+    assert got_mode == mode
+    pd.testing.assert_series_equal(aggregator.weekly_totals(), weekly, check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(aggregator.monthly_totals(), monthly, check_names=False, check_index_type=False)
+    assert aggregator.weekly_stats() == pytest.approx((weekly.mean(), weekly.std()))
+
+
+def test_adding_files_one_at_a_time_matches_pandas(files):
+    aggregator = IncrementalAggregator()
+    added = []
+    for key, df in files.items():
+        aggregator.add(key, df)
+        added.append(df)
+        _check(aggregator, added)
+
+    # O mesmo arquivo de novo não conta duas vezes
+    aggregator.add('a', files['a'])
+    _check(aggregator, added)
+
+
+def test_removing_and_replacing_files_matches_pandas(files):
+    aggregator = IncrementalAggregator()
+    aggregator.sync(files)
+
+    aggregator.remove('b')
+    _check(aggregator, [files['a'], files['c']])
+    assert aggregator.keys() == ['a', 'c']
+
+    # Substituir: as chaves são o hash do conteúdo, então o arquivo novo tem outra chave
+    replacement = _file(4, 'Ana')
+    aggregator.sync({'c': files['c'], 'a2': replacement})
+    assert aggregator.keys() == ['c', 'a2']
+    _check(aggregator, [files['c'], replacement])
+
+    for key in aggregator.keys():
+        aggregator.remove(key)
+    mean, std, mode = aggregator.daily_stats()
+    assert np.isnan(mean) and np.isnan(std) and mode == 0
+    assert aggregator.weekly_totals().empty
+
+
+def test_person_stats_matches_pandas(files):
+    df = pd.concat(files.values(), ignore_index=True)
+
+    stats = person_stats(df)
+
+    assert stats.index.tolist() == ['Ana', 'Bia']
+    for person, rows in df.groupby('Pessoa'):
+        horas = rows['Horas/Dia']
+        weekly = horas.groupby(rows['Data'].dt.to_period('W')).sum()
+        row = stats.loc[person]
+        assert row['Dias'] == len(rows)
+        assert row['Total Horas'] == pytest.approx(horas.sum())
+        assert row['Média Diária'] == pytest.approx(horas.mean())
+        assert row['Desvio Padrão Diário'] == pytest.approx(horas.std())
+        assert row['Moda Diária'] == horas.mode().min()
+        assert row['Semanas'] == len(weekly)
+        assert row['Média Semanal'] == pytest.approx(weekly.mean())
+        assert row['Desvio Padrão Semanal'] == pytest.approx(weekly.std())
+        assert (row['Primeiro Dia'], row['Último Dia']) == (rows['Data'].min(), rows['Data'].max())
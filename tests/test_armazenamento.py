@@ -0,0 +1,159 @@
+"""Base local (armazenamento.TimesheetStore) em um SQLite temporário."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from armazenamento import TimesheetStore
+from calculo_horas import hours_frames
+from registros import HOLIDAY, INVALID, WORKED, make_records
+
+# Esquema da primeira versão da base: datas e horários em texto, sem a coluna pessoa
+LEGACY_SCHEMA = """
+CREATE TABLE arquivos (
+    hash TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    modelo TEXT,
+    assinatura TEXT,
+    colunas TEXT NOT NULL,
+    descartados TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    total_horas REAL NOT NULL,
+    processado_em TEXT NOT NULL
+);
+CREATE TABLE registros (
+    arquivo TEXT NOT NULL REFERENCES arquivos(hash) ON DELETE CASCADE,
+    linha INTEGER NOT NULL,
+    dia TEXT,
+    data TEXT NOT NULL,
+    entrada TEXT NOT NULL,
+    inicio_intervalo TEXT NOT NULL,
+    fim_intervalo TEXT NOT NULL,
+    saida TEXT NOT NULL,
+    horas REAL NOT NULL,
+    PRIMARY KEY (arquivo, linha)
+) WITHOUT ROWID;
+CREATE INDEX registros_dia ON registros (dia);
+"""
+
+
+def _frame(person='Ana'):
+    records = make_records(
+        ['02/12/2024', '03/12/2024', '04/12/2024', 'xx'],
+        ['08:00', 'Feriado', '08:00', '09:00'],
+        ['12:00', '', '', ''],
+        ['13:00', '', '', ''],
+        ['17:30', '', '', '13:00'],
+        person, date_format='%d/%m/%Y',
+    )
+    records.attrs.update(modelo='tradicional', assinatura='abc')
+    return hours_frames(records)[0]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimesheetStore(str(tmp_path / 'base.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_save_and_load_round_trip(store):
+    df = _frame()
+    malformed = [{'Data': '05/12/2024', 'Horários': ['08:00'], 'Motivo': '1 horário(s)'}]
+
+    store.save('h1', 'ana.xlsx', 'excel', df, malformed)
+    loaded, dated, descartados = store.load('h1')
+
+    assert 'h1' in store and 'h2' not in store
+    pd.testing.assert_frame_equal(loaded, df, check_categorical=False)
+    assert loaded.attrs == {'modelo': 'tradicional', 'assinatura': 'abc'}
+    assert descartados == malformed
+    assert loaded['Situação'].tolist() == [WORKED, HOLIDAY, INVALID, WORKED]
+    # Estatísticas: sem o feriado e sem a data inválida
+    assert dated['Data'].dt.strftime('%d/%m/%Y').tolist() == ['02/12/2024', '04/12/2024']
+    assert store.load('h2') is None
+
+
+def test_query_filters_by_day_and_person(store):
+    store.save('h1', 'ana.xlsx', 'excel', _frame('Ana'))
+    store.save('h2', 'bia.xlsx', 'excel', _frame('Bia'))
+
+    everything = store.query()
+    assert everything['Pessoa'].tolist() == ['Ana', 'Bia', 'Ana', 'Bia']
+    assert everything['Arquivo'].tolist() == ['ana.xlsx', 'bia.xlsx', 'ana.xlsx', 'bia.xlsx']
+    assert everything['Horas/Dia'].tolist() == [8.5, 8.5, 0.0, 0.0]
+
+    bia = store.query(start='2024-12-03', end='2024-12-31', person='Bia')
+    assert bia['Data'].tolist() == [pd.Timestamp('2024-12-04')]
+    assert store.date_range() == (pd.Timestamp('2024-12-02'), pd.Timestamp('2024-12-04'))
+
+
+def test_same_file_is_stored_once(store):
+    store.save('h1', 'ana.xlsx', 'excel', _frame('Ana'))
+    # Reenviar o mesmo conteúdo (mesmo hash) não regrava nem duplica as linhas
+    store.save('h1', 'outro_nome.xlsx', 'excel', _frame('Outra'))
+
+    files = store.files()
+    assert files['Nome'].tolist() == ['ana.xlsx']
+    assert files['Linhas'].tolist() == [4]
+    assert store.load('h1')[0]['Pessoa'].tolist() == ['Ana'] * 4
+
+    store.remove('h1')
+    assert 'h1' not in store
+    assert store.query().empty
+
+
+def test_reopen_keeps_rows(tmp_path):
+    path = str(tmp_path / 'base.sqlite3')
+    store = TimesheetStore(path)
+    store.save('h1', 'ana.xlsx', 'excel', _frame())
+    store.close()
+
+    reopened = TimesheetStore(path)
+    try:
+        assert reopened.load('h1')[0]['Horas/Dia'].tolist() == [8.5, 0.0, 0.0, 4.0]
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize('with_person', [False, True])
+def test_opens_base_with_text_schema(tmp_path, with_person):
+    path = str(tmp_path / 'antiga.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    if with_person:
+        # Bases da versão seguinte ganharam a coluna pessoa por ALTER TABLE
+        conn.execute('ALTER TABLE registros ADD COLUMN pessoa TEXT')
+    conn.execute(
+        'INSERT INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ('h1', 'fulano.xlsx', 'excel', None, None, '[]', '[]', 3, 11.5, '2024-12-10T10:00:00')
+    )
+    rows = [
+        ('h1', 0, '2024-12-02', '02/12/2024', '08:00', '12:00', '13:00', '17:30', 7.5),
+        ('h1', 1, '2024-12-03', '03/12/2024', '08:00', '', '', '12:00', 4.0),
+        ('h1', 2, None, 'sem data', '09:00', '', '', '', 0.0),
+    ]
+    if with_person:
+        rows = [row + (name,) for row, name in zip(rows, ['Ana', None, 'Ana'])]
+    conn.executemany(f"INSERT INTO registros VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    conn.commit()
+    conn.close()
+
+    store = TimesheetStore(path)
+    try:
+        df, dated, _ = store.load('h1')
+        assert df['Dia'].tolist()[:2] == [20059, 20060]
+        assert df[['Entrada', 'Início Intervalo', 'Fim Intervalo', 'Saída']].values.tolist() == [
+            [480, 720, 780, 1050], [480, -1, -1, 720], [540, -1, -1, -1],
+        ]
+        assert df['Horas/Dia'].tolist() == [7.5, 4.0, 0.0]
+        assert df['Situação'].tolist() == [WORKED, WORKED, INVALID]
+        # Sem nome gravado vale o nome do arquivo
+        expected = ['Ana', 'fulano', 'Ana'] if with_person else ['fulano'] * 3
+        assert df['Pessoa'].tolist() == expected
+        assert len(dated) == 2
+        columns = {row[1] for row in store._conn.execute('PRAGMA table_info(registros)')}
+        assert 'data' not in columns and 'pessoa' in columns
+    finally:
+        store.close()
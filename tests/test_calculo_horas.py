@@ -0,0 +1,64 @@
+"""Cálculo das horas (calculo_horas): a referência linha a linha e a versão vetorizada."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculo_horas import calculate_hours, calculate_hours_vectorized
+
+COLUMNS = ['Entrada', 'Início Intervalo', 'Fim Intervalo', 'Saída']
+
+# (Entrada, Início Intervalo, Fim Intervalo, Saída, horas)
+CASES = [
+    ('08:00', '12:00', '13:00', '17:00', 8.0),  # o intervalo fica fora dos dois períodos
+    ('08:00', '12:00', '14:30', '18:00', 7.5),
+    ('07:45', '', '', '12:15', 4.5),  # sem intervalo
+    ('08:00', None, None, '16:20', 8.33),
+    ('08:00', '12:00', '', '17:00', 9.0),  # intervalo pela metade: da Entrada à Saída
+    ('08:00', '12:00', '13:00', '', 0.0),  # sem Saída
+    ('', '12:00', '13:00', '17:00', 0.0),  # sem Entrada
+    ('Feriado', '', '', '', 0.0),
+    ('08:00', '12:00', '13:00', 'xx:yy', 0.0),  # Saída ilegível
+    ('09:00', '09:00', '09:00', '09:00', 0.0),
+]
+
+
+def _frame(rows):
+    return pd.DataFrame([row[:4] for row in rows], columns=COLUMNS)
+
+
+@pytest.mark.parametrize('row', CASES, ids=[f"{row[0]}-{row[3]}" for row in CASES])
+def test_calculate_hours(row):
+    assert calculate_hours(pd.Series(row[:4], index=COLUMNS)) == pytest.approx(row[4])
+
+
+def test_break_is_not_subtracted_twice():
+    # Antes: (12 - 8) + (17 - 13) - (13 - 12) = 7
+    assert calculate_hours(pd.Series(['08:00', '12:00', '13:00', '17:00'], index=COLUMNS)) == 8.0
+
+
+def test_vectorized_matches_row_by_row():
+    df = _frame(CASES)
+
+    hours = calculate_hours_vectorized(df)
+
+    assert hours.name == 'Horas/Dia'
+    np.testing.assert_allclose(hours, df.apply(calculate_hours, axis=1).astype(float))
+    np.testing.assert_allclose(hours, [row[4] for row in CASES])
+
+
+def test_vectorized_matches_row_by_row_on_ordered_times():
+    # Horários em ordem no mesmo dia (sem virar a meia-noite), parte sem intervalo
+    rng = np.random.default_rng(7)
+    minutes = np.sort(rng.integers(0, 24 * 60, (2000, 4)), axis=1)
+    text = np.vectorize(lambda m: f"{m // 60:02d}:{m % 60:02d}")(minutes).astype(object)
+    text[rng.random(len(text)) < 0.2, 1:3] = ''
+    df = pd.DataFrame(text, columns=COLUMNS)
+
+    np.testing.assert_allclose(calculate_hours_vectorized(df), df.apply(calculate_hours, axis=1).astype(float))
+
+
+def test_vectorized_without_break_columns():
+    df = pd.DataFrame({'Entrada': ['08:00', '22:00'], 'Saída': ['12:30', '06:00']})
+
+    # O turno da noite vale o período real aqui (calculate_hours não considera a meia-noite)
+    assert calculate_hours_vectorized(df).tolist() == [4.5, 8.0]
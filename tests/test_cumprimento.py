@@ -0,0 +1,103 @@
+"""Acompanhamento da PSC (cumprimento.track_progress) em um consolidado pequeno, com os valores conferidos à mão."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from cumprimento import track_progress
+
+
+@pytest.fixture
+def full_df():
+    # Ana: semana de 02/12 com 10 h, semana de 09/12 sem registro e a de 16/12
+    # incompleta (termina em 18/12, uma quarta); 16/12 vem em duas linhas.
+    # Bia: só a semana de 02/12, que fecha no domingo 08/12.
+    rows = [
+        ('Ana', '2024-12-02', 4.0),
+        ('Ana', '2024-12-03', 4.0),
+        ('Ana', '2024-12-05', 2.0),
+        ('Ana', '2024-12-16', 3.0),
+        ('Ana', '2024-12-16', 1.0),
+        ('Ana', '2024-12-18', 2.0),
+        ('Bia', '2024-12-04', 5.0),
+        ('Bia', '2024-12-08', 3.0),
+    ]
+    return pd.DataFrame({
+        'Data': pd.to_datetime([data for _, data, _ in rows]),
+        'Horas/Dia': [horas for _, _, horas in rows],
+        'Pessoa': pd.Categorical([pessoa for pessoa, _, _ in rows]),
+    })
+
+
+def _weeks(weeks):
+    return [(pessoa, str(semana.start_time.date()), horas, abaixo) for pessoa, semana, horas, abaixo in
+            weeks[['Pessoa', 'Semana', 'Horas', 'Abaixo do Mínimo']].itertuples(index=False)]
+
+
+def test_daily_cumulative_and_rolling_windows(full_df):
+    _, daily, _ = track_progress(full_df)
+
+    assert daily['Pessoa'].tolist() == ['Ana'] * 5 + ['Bia'] * 2
+    assert daily['Data'].dt.strftime('%d/%m').tolist() == [
+        '02/12', '03/12', '05/12', '16/12', '18/12', '04/12', '08/12'
+    ]
+    assert daily['Horas'].tolist() == [4, 4, 2, 4, 2, 5, 3]
+    assert daily['Acumulado'].tolist() == [4, 8, 10, 14, 16, 5, 8]
+    # A janela de 7 dias de 16/12 vai de 10/12 a 16/12 e não pega a semana anterior
+    assert daily['Últimos 7 Dias'].tolist() == [4, 8, 10, 4, 6, 5, 8]
+    assert daily['Últimos 30 Dias'].tolist() == [4, 8, 10, 14, 16, 5, 8]
+
+
+def test_weeks_below_minimum_up_to_each_reference(full_df):
+    _, _, weeks = track_progress(full_df)
+
+    # A semana de 16/12 da Ana não fechou até o último dia dela; a de 09/12, sem registro, vale 0
+    assert _weeks(weeks) == [
+        ('Ana', '2024-12-02', 10.0, False),
+        ('Ana', '2024-12-09', 0.0, True),
+        ('Bia', '2024-12-02', 8.0, False),
+    ]
+
+
+def test_summary_and_forecast(full_df):
+    summary, _, _ = track_progress(full_df, required_hours=20)
+
+    assert summary.index.tolist() == ['Ana', 'Bia']
+    assert summary['Dias'].tolist() == [5, 2]
+    assert summary['Total Horas'].tolist() == [16, 8]
+    assert summary['Últimos 7 Dias'].tolist() == [6, 8]
+    assert summary['Últimos 30 Dias'].tolist() == [16, 8]
+    np.testing.assert_allclose(summary['Ritmo Semanal'], [16 / 30 * 7, 8 / 30 * 7], atol=1e-6)
+    assert summary['Semanas'].tolist() == [2, 1]
+    assert summary['Semanas Abaixo do Mínimo'].tolist() == [1, 0]
+    assert summary['Faltam'].tolist() == [4, 12]
+    assert summary['% Cumprido'].tolist() == [80, 40]
+    assert summary['Concluído Em'].isna().all()
+    # Ana: 4 h a 16/30 h por dia = 7,5 dias depois de 18/12; Bia: 12 h a 8/30 = 45 dias depois de 08/12
+    assert summary['Término Previsto'].dt.strftime('%d/%m/%Y').tolist() == ['26/12/2024', '22/01/2025']
+
+
+def test_completed_hours_stop_the_weeks(full_df):
+    summary, _, weeks = track_progress(full_df, required_hours=10)
+
+    assert summary['Faltam'].tolist() == [0, 2]
+    assert summary['Concluído Em'].iloc[0] == pd.Timestamp('2024-12-05')
+    assert pd.isna(summary['Concluído Em'].iloc[1])
+    assert summary['Término Previsto'].dt.strftime('%d/%m').tolist() == ['05/12', '16/12']
+    # As semanas da Ana param na da conclusão, que não é marcada
+    assert _weeks(weeks)[0] == ('Ana', '2024-12-02', 10.0, False)
+    assert summary['Semanas'].tolist() == [1, 1]
+
+
+def test_as_of_fixes_one_reference_for_everyone(full_df):
+    summary, daily, weeks = track_progress(full_df, as_of='2024-12-15')
+
+    assert daily['Data'].max() == pd.Timestamp('2024-12-08')
+    assert summary['Total Horas'].tolist() == [10, 8]
+    assert summary['Últimos 7 Dias'].tolist() == [0, 0]
+    assert summary['Últimos 30 Dias'].tolist() == [10, 8]
+    assert _weeks(weeks) == [
+        ('Ana', '2024-12-02', 10.0, False),
+        ('Ana', '2024-12-09', 0.0, True),
+        ('Bia', '2024-12-02', 8.0, False),
+        ('Bia', '2024-12-09', 0.0, True),
+    ]
@@ -0,0 +1,34 @@
+"""Gravação do relatório em Excel (exportacao.write_excel) em trechos de WRITE_CHUNK_ROWS linhas."""
+import io
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import exportacao
+
+
+def test_write_excel_chunks_keep_rows_in_order(monkeypatch):
+    monkeypatch.setattr(exportacao, 'WRITE_CHUNK_ROWS', 3)
+    detalhes = pd.DataFrame({
+        'Data': pd.to_datetime(['2024-12-02', None, '2024-12-04', '2024-12-05', '2024-12-06', '2024-12-07', '2024-12-08']),
+        'Entrada': ['08:00', '', '09:00', '08:30', None, '07:45', '08:00'],
+        'Horas/Dia': [8.0, 0.0, 7.5, np.nan, 6.0, 8.25, 4.0],
+        'Semana': pd.Series(pd.to_datetime(['2024-12-02'] * 7)).dt.to_period('W'),
+    })
+    output = io.BytesIO()
+
+    exportacao.write_excel({'Detalhes': detalhes, 'Vazia': detalhes.iloc[:0]}, output)
+
+    workbook = openpyxl.load_workbook(output)
+    rows = list(workbook['Detalhes'].iter_rows(values_only=True))
+    assert rows[0] == ('Data', 'Entrada', 'Horas/Dia', 'Semana')
+    assert [row[0] for row in rows[1:]] == [
+        datetime(2024, 12, 2), None, datetime(2024, 12, 4), datetime(2024, 12, 5),
+        datetime(2024, 12, 6), datetime(2024, 12, 7), datetime(2024, 12, 8),
+    ]
+    assert [row[1] for row in rows[1:]] == ['08:00', None, '09:00', '08:30', None, '07:45', '08:00']
+    assert [row[2] for row in rows[1:]] == [8, 0, 7.5, None, 6, 8.25, 4]
+    assert rows[-1][3] == '2024-12-02/2024-12-08'
+    assert list(workbook['Vazia'].iter_rows(values_only=True)) == [('Data', 'Entrada', 'Horas/Dia', 'Semana')]
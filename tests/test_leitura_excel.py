@@ -0,0 +1,79 @@
+"""Leitura das planilhas (leitura_excel.process_excel_file) a partir de arquivos montados no teste."""
+import io
+
+import openpyxl
+import pandas as pd
+
+import leitura_excel
+from leitura_excel import iter_excel_chunks, process_excel_file
+from registros import INVALID, WORKED
+
+SEPARADO = ['Horário de entrada 1', 'Horário de saída 1', 'Horário de entrada 2', 'Horário de saída 2']
+
+
+def _workbook(header, *rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _dates(df):
+    return pd.to_datetime(df['Dia'], unit='D').dt.strftime('%d/%m/%Y').tolist()
+
+
+def test_separated_layout_reads_date_column():
+    excel = _workbook(
+        ['Data', *SEPARADO],
+        ['02/12/2024', '08:00', '12:00', '13:00', '17:00'],
+        ['05/12/2024', '09:00', '12:00', '13:00', '18:00'],
+    )
+
+    df = process_excel_file(excel)
+
+    assert df.attrs['modelo'] == 'separado'
+    assert _dates(df) == ['02/12/2024', '05/12/2024']
+    assert df['Minutos'].tolist() == [480, 480]
+
+
+def test_separated_layout_without_date_column_uses_placeholders():
+    excel = _workbook(SEPARADO, ['08:00', '12:00', '13:00', '17:00'], ['08:00', '12:00', '13:00', '17:00'])
+
+    assert _dates(process_excel_file(excel)) == ['01/12/2024', '02/12/2024']
+
+
+def test_separated_layout_flags_half_filled_pairs():
+    excel = _workbook(
+        ['Data', *SEPARADO],
+        ['02/12/2024', '08:00', None, '13:00', None],  # só as entradas
+        ['03/12/2024', '08:00', '12:00', None, None],  # um par só
+        ['04/12/2024', '08:00', '12:00', '13:00', None],  # segundo par sem saída
+        ['05/12/2024', '08:00', '12:00', 'xx', '17:00'],  # entrada ilegível
+    )
+
+    df = process_excel_file(excel)
+
+    assert df['Situação'].tolist() == [INVALID, WORKED, INVALID, INVALID]
+    assert df['Minutos'].tolist() == [0, 240, 0, 0]
+
+
+def test_xls_upload_falls_back_to_read_excel(monkeypatch):
+    # Um .xls (OLE2) enviado pelo upload chega como BytesIO, sem extensão
+    upload = io.BytesIO(bytes.fromhex('d0cf11e0a1b11ae1') + bytes(504))
+    read = []
+
+    def read_excel(excel_file):
+        read.append(excel_file.tell())
+        return pd.DataFrame({'Data': ['02/12/2024'], 'Entrada': ['08:00'], 'Saída': ['12:00']})
+
+    monkeypatch.setattr(leitura_excel.pd, 'read_excel', read_excel)
+
+    chunks = list(iter_excel_chunks(upload))
+
+    assert read == [0]
+    assert chunks[0]['Entrada'].tolist() == ['08:00']
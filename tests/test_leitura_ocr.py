@@ -0,0 +1,114 @@
+"""Interpretação do texto do OCR (leitura_ocr.parse_time_data_report e o tokenizador de uma passada)."""
+import pandas as pd
+
+from leitura_ocr import parse_time_data, parse_time_data_report, tokenize
+from registros import HOLIDAY, WORKED
+
+
+def _dates(records):
+    return pd.to_datetime(records['Dia'], unit='D').dt.strftime('%d/%m/%Y').tolist()
+
+
+def _reasons(malformed):
+    return [(day['Data'], day['Motivo']) for day in malformed]
+
+
+def test_tokenize_keeps_text_order():
+    text = "Nome: Ana\n02/12/2024 08:00 12:00 - 13:00/17:00\n3/12/2024 FERIADO\n"
+
+    assert tokenize(text) == ['02/12/2024', '08:00', '12:00', '13:00', '17:00', '3/12/2024', 'FERIADO']
+
+
+def test_missing_time_does_not_shift_later_days():
+    text = (
+        "Nome: Ana Souza\n"
+        "02/12/2024 08:00 12:00 13:00 17:00\n"
+        "03/12/2024 08:00 12:00 17:00\n"  # um horário faltando
+        "04/12/2024 09:00 12:00 13:00 18:00\n"
+        "05/12/2024 08:00 12:30\n"  # sem intervalo
+    )
+
+    records, malformed = parse_time_data_report(text, person='arquivo')
+
+    assert _dates(records) == ['02/12/2024', '04/12/2024', '05/12/2024']
+    assert records['Minutos'].tolist() == [480, 480, 270]
+    assert records['Pessoa'].tolist() == ['Ana Souza'] * 3
+    assert _reasons(malformed) == [('03/12/2024', '3 horário(s): esperados pares de entrada e saída')]
+    assert malformed[0]['Horários'] == ['08:00', '12:00', '17:00']
+
+
+def test_stray_header_date_in_row_order():
+    text = (
+        "FOLHA DE FREQUÊNCIA - emitida em 30/11/2024\n"
+        "Data Entrada Início Fim Saída\n"
+        "02/12/2024 08:00 12:00 13:00 17:00\n"
+        "03/12/2024 09:00 12:00 13:00 18:00\n"
+    )
+
+    records, malformed = parse_time_data_report(text, person='arquivo')
+
+    assert _dates(records) == ['02/12/2024', '03/12/2024']
+    assert records['Pessoa'].tolist() == ['arquivo'] * 2
+    assert _reasons(malformed) == [('30/11/2024', '0 horário(s): esperados pares de entrada e saída')]
+
+
+def test_column_order_text():
+    text = "Data\n02/12/2024\n03/12/2024\nHorários\n08:00\n12:00\n13:00\n17:00\n09:00\n12:00\n13:00\n18:00\n"
+
+    records, malformed = parse_time_data_report(text)
+
+    assert _dates(records) == ['02/12/2024', '03/12/2024']
+    assert records['Minutos'].tolist() == [480, 480]
+    assert malformed == []
+
+
+def test_column_order_text_with_stray_header_date():
+    text = (
+        "Emitido em 30/11/2024\n"
+        "Data\n02/12/2024\n03/12/2024\n"
+        "Entrada Início Fim Saída\n08:00 12:00 13:00 17:00\n09:00 12:00 13:00 18:00\n"
+    )
+
+    records, malformed = parse_time_data_report(text)
+
+    # A data do cabeçalho não fica com os horários de 02/12
+    assert _dates(records) == ['02/12/2024', '03/12/2024']
+    assert records['Entrada'].tolist() == [480, 540]
+    assert _reasons(malformed) == [('30/11/2024', 'data fora da tabela')]
+
+
+def test_column_order_text_with_missing_times():
+    text = "02/12/2024\n03/12/2024\n08:00 12:00 13:00 17:00 09:00 12:00 13:00\n"
+
+    records, malformed = parse_time_data_report(text)
+
+    assert _dates(records) == ['02/12/2024']
+    assert _reasons(malformed) == [('03/12/2024', 'horários insuficientes')]
+
+
+def test_holiday():
+    text = "02/12/2024 08:00 12:00 13:00 17:00\n25/12/2024 Feriado\n26/12/2024 feriado 08:00 12:00\n"
+
+    records = parse_time_data(text)
+
+    assert _dates(records) == ['02/12/2024', '25/12/2024', '26/12/2024']
+    # Feriado com horários conta como dia trabalhado
+    assert records['Situação'].tolist() == [WORKED, HOLIDAY, WORKED]
+    assert records['Minutos'].tolist() == [480, 0, 240]
+
+
+def test_out_of_order_days_are_reported_for_any_punch_count():
+    text = (
+        "01/12/2024 13:59 09:44 19:42 11:33\n"  # quatro horários embaralhados
+        "02/12/2024 22:00 02:00 03:00 06:00\n"  # turno da noite com intervalo
+        "03/12/2024 08:00 12:00 13:00 17:00 18:00 07:00\n"  # dois dias juntos
+    )
+
+    records, malformed = parse_time_data_report(text)
+
+    assert _dates(records) == ['02/12/2024']
+    assert records['Minutos'].tolist() == [420]
+    assert _reasons(malformed) == [
+        ('01/12/2024', '4 horário(s) fora de ordem'),
+        ('03/12/2024', '6 horário(s) fora de ordem'),
+    ]
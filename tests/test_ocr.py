@@ -0,0 +1,77 @@
+"""Motores de OCR: a interface OCRBackend e o cliente do OCR.space contra o servidor falso de conftest.py."""
+import pytest
+import requests
+
+import ocr
+
+
+def _images(*modes):
+    return [f"img-{i}:{mode}".encode() for i, mode in enumerate(modes)]
+
+
+def test_ocr_many_keeps_upload_order(fake_ocr_server):
+    # As primeiras imagens demoram mais: terminam por último, mas voltam na ordem do upload
+    images = _images(*(f"espera{(8 - i) * 30}" for i in range(8)))
+    done = []
+
+    results = ocr.ocr_many(images, 'chave', max_workers=8, url=fake_ocr_server.url,
+                           on_done=lambda i, n: done.append(i))
+
+    assert results == [(f"img-{i}", None) for i in range(8)]
+    assert sorted(done) == list(range(8))
+    assert done != list(range(8))
+
+
+def test_unavailable_is_retried_by_session(fake_ocr_server):
+    text = ocr.ocr_space_api(b'img-0:indisponivel2', 'chave', url=fake_ocr_server.url)
+
+    assert text == 'img-0'
+    # Duas respostas 503 e a terceira tentativa com o texto
+    assert fake_ocr_server.calls[0] == 3
+
+
+def test_unavailable_beyond_retries_is_an_error(fake_ocr_server):
+    [(text, error)] = ocr.ocr_many(_images(f"indisponivel{ocr.RETRIES + 1}"), 'chave', url=fake_ocr_server.url)
+
+    assert text == ''
+    assert isinstance(error, requests.HTTPError)
+    assert fake_ocr_server.calls[0] == ocr.RETRIES + 1
+
+
+def test_timeout_is_reported_per_image(fake_ocr_server):
+    images = _images('ok', 'espera1000', 'ok')
+
+    results = ocr.ocr_many(images, 'chave', url=fake_ocr_server.url, timeout=(1, 0.2))
+
+    assert results[0] == ('img-0', None)
+    assert results[2] == ('img-2', None)
+    text, error = results[1]
+    assert text == ''
+    assert isinstance(error, requests.RequestException)
+
+
+def test_failed_image_does_not_break_the_others(fake_ocr_server):
+    results = ocr.ocr_many(_images('ok', 'erro', 'ok', 'ok'), 'chave', url=fake_ocr_server.url)
+
+    assert [text for text, _ in results] == ['img-0', '', 'img-2', 'img-3']
+    assert [error is None for _, error in results] == [True, False, True, True]
+    assert isinstance(results[1][1], ocr.OCRError)
+    # A imagem com erro de processamento não é reenviada
+    assert fake_ocr_server.calls[1] == 1
+
+
+def test_malformed_response_is_reported_per_image(fake_ocr_server):
+    results = ocr.ocr_many(_images('ok', 'malformado', 'ok'), 'chave', url=fake_ocr_server.url)
+
+    assert [text for text, _ in results] == ['img-0', '', 'img-2']
+    assert [error is None for _, error in results] == [True, False, True]
+    assert isinstance(results[1][1], KeyError)
+
+
+def test_backend_must_implement_recognize():
+    class Incomplete(ocr.OCRBackend):
+        name = 'incompleto'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert ocr.get_backend('demo').recognize(b'') == ocr.DEMO_TEXT
@@ -0,0 +1,73 @@
+"""Conversão das células de horário, batidas irregulares (minutos, offsets) e a situação das linhas compactas."""
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+from registros import (
+    INVALID, MISSING_MINUTES, WORKED, make_records, ordered_days, punches_from_columns, time_to_minutes,
+    worked_minutes
+)
+
+
+def _punches(*days):
+    """Batidas de cada dia em 'HH:MM' (None = ausente), dias com o mesmo número de colunas."""
+    columns = [time_to_minutes(pd.Series(col, dtype=object)) for col in zip(*days)]
+    return punches_from_columns(columns)
+
+
+def test_numeric_cells_outside_day_fraction_are_invalid():
+    # 8 digitado sem os minutos e um número de série de data não são horários
+    numbers = pd.Series([8, 0.5, 45627.5, -0.25, 1.0])
+    mixed = pd.Series([8, '08:00', time(9, 30), 0.75], dtype=object)
+
+    assert time_to_minutes(numbers).tolist() == [MISSING_MINUTES, 720, MISSING_MINUTES, MISSING_MINUTES, MISSING_MINUTES]
+    assert time_to_minutes(mixed).tolist() == [MISSING_MINUTES, 480, 570, 1080]
+
+
+def test_bare_integer_entry_marks_row_invalid():
+    records = make_records(['02/12/2024', '03/12/2024'], [8, '08:00'], [None, None], [None, None], ['12:00', '12:00'])
+
+    assert records['Situação'].tolist() == [INVALID, WORKED]
+    assert records['Minutos'].tolist() == [0, 240]
+    assert records['Entrada'].dtype == np.int16
+
+
+def test_punches_from_columns_drops_missing():
+    minutes, offsets = _punches(['08:00', '12:00', '13:00', '17:00'], ['08:00', None, None, '12:00'])
+
+    assert minutes.tolist() == [480, 720, 780, 1020, 480, 720]
+    assert offsets.tolist() == [0, 4, 6]
+
+
+def test_worked_minutes_overnight_shifts():
+    punches = _punches(
+        ['22:00', '06:00', None, None],  # turno da noite
+        ['22:00', '02:00', '03:00', '06:00'],  # com intervalo depois da meia-noite
+        ['20:00', '23:30', '00:30', '04:00'],  # intervalo atravessando a meia-noite
+        ['08:00', '12:00', '13:00', '17:00'],
+    )
+
+    assert ordered_days(punches).tolist() == [True, True, True, True]
+    assert worked_minutes(punches).tolist() == [480, 420, 420, 480]
+
+
+def test_worked_minutes_out_of_order_days_are_zero():
+    punches = _punches(
+        ['13:59', '09:44', '19:42', '11:33'],  # volta no relógio duas vezes
+        ['08:00', '12:00', '13:00', '07:00'],  # 23 h da primeira à última batida
+        ['06:00', '22:00', None, None],  # dia longo sem passar da meia-noite: vale
+        ['10:00', '09:00', None, None],  # saída antes da entrada, 23 h depois
+    )
+
+    assert ordered_days(punches).tolist() == [False, False, True, False]
+    assert worked_minutes(punches).tolist() == [0, 0, 960, 0]
+
+
+def test_out_of_order_row_is_invalid():
+    records = make_records(
+        ['02/12/2024', '03/12/2024'], ['13:59', '22:00'], ['09:44', '02:00'], ['19:42', '03:00'], ['11:33', '06:00']
+    )
+
+    assert records['Situação'].tolist() == [INVALID, WORKED]
+    assert records['Minutos'].tolist() == [0, 420]
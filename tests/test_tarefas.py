@@ -0,0 +1,86 @@
+"""Fila de tarefas (tarefas.JobQueue): um bloco que falha não pode parar a thread; trocar de fila fecha a anterior."""
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import tarefas
+
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(job_id)
+        if status['estado'] not in tarefas.ACTIVE:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"tarefa {job_id} não terminou: {queue.status(job_id)}")
+
+
+def test_failing_chunk_keeps_worker_running(monkeypatch):
+    def process(files, *args):
+        # Sem a coluna Horas/Dia o erro só aparece ao guardar o bloco (_finish), fora do processador
+        frames = [pd.DataFrame({'Data': [1]}) if data == b'ruim' else pd.DataFrame({'Horas/Dia': [1.5]})
+                  for _, data in files]
+        return [(df, None, [], None) for df in frames]
+
+    monkeypatch.setitem(tarefas.PROCESSORS, 'excel', process)
+    queue = tarefas.JobQueue(':memory:')
+
+    failed = queue.submit('excel', [('a.xlsx', b'ruim'), ('b.xlsx', b'ruim')])
+    status = _wait(queue, failed)
+    assert status['estado'] == tarefas.DONE
+    assert status['erros'] == 2
+    assert queue.files(failed)['Erro'].str.startswith('KeyError').all()
+
+    # A thread continua consumindo a fila
+    ok = queue.submit('excel', [('c.xlsx', b'bom')])
+    status = _wait(queue, ok)
+    assert (status['feitos'], status['erros']) == (1, 0)
+    assert queue.files(ok)['Total Horas'].tolist() == [1.5]
+
+
+def test_new_path_closes_previous_queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(tarefas, '_queue', None)
+    old = tarefas.get_queue(str(tmp_path / 'a.sqlite3'))
+
+    new = tarefas.get_queue(str(tmp_path / 'b.sqlite3'))
+
+    assert new is not old and tarefas.get_queue(str(tmp_path / 'b.sqlite3')) is new
+    assert not old._thread.is_alive()
+    with pytest.raises(sqlite3.ProgrammingError):
+        old.status(1)
+    assert new._thread.is_alive()
+    new.close()
+
+
+def test_close_lets_running_chunk_finish(monkeypatch, tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def process(files, *args):
+        started.set()
+        release.wait(5)
+        return [(pd.DataFrame({'Horas/Dia': [2.0]}), None, [], None) for _ in files]
+
+    monkeypatch.setitem(tarefas.PROCESSORS, 'excel', process)
+    monkeypatch.setattr(tarefas, 'CHUNK_SIZE', 1)
+    path = str(tmp_path / 'fila.sqlite3')
+    queue = tarefas.JobQueue(path)
+    job_id = queue.submit('excel', [('a.xlsx', b'a'), ('b.xlsx', b'b')])
+    assert started.wait(5)
+
+    # O bloco em andamento passa do prazo: a thread termina o bloco, não pega o próximo e fecha a conexão
+    queue.close(timeout=0.05)
+    assert queue._thread.is_alive()
+    release.set()
+    queue._thread.join(5)
+    assert not queue._thread.is_alive()
+
+    reopened = tarefas.JobQueue(path)
+    try:
+        assert reopened.files(job_id)['Situação'].tolist()[0] == tarefas.DONE
+    finally:
+        reopened.close()